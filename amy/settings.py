@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/1.7/ref/settings/
 import os
 import json
 
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 
 
@@ -31,7 +33,7 @@ else:
 SECRET_KEY = os.environ.get('AMY_SECRET_KEY', SECRET_KEY)
 
 
-TEMPLATE_DEBUG = True
+TEMPLATE_DEBUG = DEBUG
 
 ALLOWED_HOSTS = [ 
     'software-carpentry.org',
@@ -54,6 +56,8 @@ INSTALLED_APPS = (
 )
 
 MIDDLEWARE_CLASSES = (
+    # first, so that it sees the queries of every other middleware
+    'workshops.middleware.QueryProfilerMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,13 +83,134 @@ MESSAGE_TAGS = {
 # Database
 # https://docs.djangoproject.com/en/1.7/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# Pick a profile with AMY_DATABASE:
+# - sqlite (default): a local file, in WAL mode so that readers don't block
+#   the writer, with a busy timeout so concurrent writers wait for the lock
+#   instead of failing (see workshops/db.py).
+# - postgresql: a PostgreSQL server (needs the psycopg2 package).
+# - pgbouncer: PostgreSQL behind the pgbouncer connection pooler.  The
+#   pooler keeps the server connections, so Django doesn't.
+# AMY_DB_NAME, AMY_DB_USER, AMY_DB_PASSWORD, AMY_DB_HOST and AMY_DB_PORT
+# override the connection details; AMY_DB_CONN_MAX_AGE how many seconds
+# connections are kept open between requests (0 closes them every time).
+
+DATABASE_PROFILE = os.environ.get('AMY_DATABASE', 'sqlite')
+DATABASE_PROFILES = {
+    'sqlite': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+    },
+    'postgresql': {
+        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'NAME': 'amy',
+        'HOST': 'localhost',
+        'PORT': '5432',
+        'CONN_MAX_AGE': 600,
+    },
+    'pgbouncer': {
+        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'NAME': 'amy',
+        'HOST': 'localhost',
+        'PORT': '6432',
+        'CONN_MAX_AGE': 0,
+    },
+}
+
+DATABASES = {'default': dict(DATABASE_PROFILES[DATABASE_PROFILE])}
+for (_key, _variable) in (('NAME', 'AMY_DB_NAME'),
+                          ('USER', 'AMY_DB_USER'),
+                          ('PASSWORD', 'AMY_DB_PASSWORD'),
+                          ('HOST', 'AMY_DB_HOST'),
+                          ('PORT', 'AMY_DB_PORT')):
+    if _variable in os.environ:
+        DATABASES['default'][_key] = os.environ[_variable]
+if 'AMY_DB_CONN_MAX_AGE' in os.environ:
+    DATABASES['default']['CONN_MAX_AGE'] = \
+        json.loads(os.environ['AMY_DB_CONN_MAX_AGE'])
+
+# SQLite tuning, applied to every new connection.
+SQLITE_JOURNAL_MODE = 'WAL'
+SQLITE_BUSY_TIMEOUT = 20000             # milliseconds
+
+# Cache
+# https://docs.djangoproject.com/en/1.7/topics/cache/
+# Pick a backend with AMY_CACHE (and AMY_CACHE_LOCATION for its address or
+# directory).  The default keeps the cache in each process's memory, which
+# is fine for development; a shared backend (file, memcached, redis) is
+# needed as soon as more than one process serves requests, and by the job
+# worker (`manage.py run_jobs` refuses to start without one).  The redis
+# backend needs the django-redis package.
+
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'amy'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache',
+             os.path.join(BASE_DIR, 'cache')),
+    'memcached': ('django.core.cache.backends.memcached.MemcachedCache',
+                  '127.0.0.1:11211'),
+    'redis': ('django_redis.cache.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'dummy': ('django.core.cache.backends.dummy.DummyCache', ''),
+}
+CACHE_NAME = os.environ.get('AMY_CACHE', 'locmem')
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[CACHE_NAME]
+# whether all processes see the same cache
+CACHE_SHARED = CACHE_NAME not in ('locmem', 'dummy')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('AMY_CACHE_LOCATION', CACHE_LOCATION),
+        'KEY_PREFIX': 'amy',
     }
 }
 
+# Sessions
+# AMY_SESSIONS picks where sessions live: cached_db reads them from the
+# cache and only writes to the database when they change; signed_cookies
+# keeps them in the browser and never touches the database, but needs
+# AMY_SECRET_KEY to stay the same across restarts; db is Django's default.
+# cached_db is the default with a shared cache, db otherwise: with a cache
+# in each process, logging out would only clear the session in one of them.
+# For the same reason cached_db and cache refuse a process-local cache.  Bulk uploads are staged in their own table (see
+# StagedUpload) so sessions stay small either way.  Expired sessions and
+# abandoned uploads are removed by `manage.py sweep_sessions`.
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSIONS = os.environ.get('AMY_SESSIONS',
+                          'cached_db' if CACHE_SHARED else 'db')
+if SESSIONS in ('cached_db', 'cache') and not CACHE_SHARED:
+    raise ImproperlyConfigured(
+        'AMY_SESSIONS={0} needs a cache shared by all processes; '
+        'set AMY_CACHE to file, memcached or redis'.format(SESSIONS))
+SESSION_ENGINE = SESSION_ENGINES[SESSIONS]
+STAGED_UPLOAD_MAX_AGE = 24 * 60 * 60   # seconds
+
+# Background jobs (see workshops/jobs.py)
+# Slow operations are queued and run by `manage.py run_jobs`.  With
+# AMY_JOBS_EAGER=true they run inside the request instead, so no worker is
+# needed (handy for development, not for production).  Failed attempts are
+# retried after JOBS_RETRY_DELAY seconds, doubling each time; jobs running
+# for longer than JOBS_TIMEOUT seconds are assumed to have lost their worker.
+# Links that start jobs reuse one finished less than JOBS_REUSE_AGE seconds
+# ago.  `manage.py prune_jobs` deletes jobs finished more than JOBS_MAX_AGE
+# seconds ago.
+JOBS_EAGER = json.loads(os.environ.get('AMY_JOBS_EAGER', 'false'))
+JOBS_RETRY_DELAY = 60                   # seconds
+JOBS_TIMEOUT = 60 * 60                  # seconds
+JOBS_REUSE_AGE = 5 * 60                 # seconds
+JOBS_MAX_AGE = 30 * 24 * 60 * 60        # seconds
+
+# Distances between airports, precomputed by
+# `manage.py build_airport_distances` (needs numpy); see
+# workshops/distances.py.  Without the file, distances are computed on
+# each request.
+AIRPORT_DISTANCES = os.path.join(BASE_DIR, 'airport-distances.npy')
+
 # Authentication
 
 AUTH_USER_MODEL = 'workshops.Person'
@@ -109,6 +234,22 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# Templates
+# In production (or with AMY_TEMPLATE_CACHE=true) compiled templates are
+# kept in memory by the cached loader, and all templates are compiled when
+# the application starts (see workshops/template_warmup.py) instead of on
+# first use.  Templates edited on disk are then only seen after a restart.
+TEMPLATE_CACHE = json.loads(
+    os.environ.get('AMY_TEMPLATE_CACHE', json.dumps(not DEBUG)))
+TEMPLATE_LOADERS = (
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+)
+if TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = (
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    )
+
 # Warn viewers of invalid template strings
 TEMPLATE_STRING_IF_INVALID = 'XXX-unset-variable-XXX'
 
@@ -118,3 +259,68 @@ LOGIN_REDIRECT_URL = '/workshops/'
 
 # here's where @login_required redirects to:
 LOGIN_URL = '/account/login/'
+
+# Per-request SQL profiling, see workshops/middleware.py.  Budgets are the
+# maximum number of queries a view (by URL name) may run per request.
+# For example, to fail requests that exceed their budget:
+# AMY_QUERY_PROFILING=true AMY_QUERY_BUDGET_ENFORCE=true ./manage.py runserver
+QUERY_PROFILING = json.loads(os.environ.get('AMY_QUERY_PROFILING', 'false'))
+QUERY_BUDGET_ENFORCE = json.loads(
+    os.environ.get('AMY_QUERY_BUDGET_ENFORCE', 'false'))
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGETS = {
+    'index': 6,
+    'all_sites': 6,
+    'site_details': 6,
+    'site_search': 4,
+    'all_airports': 6,
+    'airport_search': 4,
+    'all_persons': 6,
+    'person_search': 4,
+    'person_details': 6,
+    'person_add': 6,
+    'person_edit': 8,
+    'all_events': 8,
+    'event_details': 8,
+    'event_search': 4,
+    'event_add': 6,
+    'event_edit': 8,
+    'event_staff': 8,
+    'all_tasks': 8,
+    'task_add': 6,
+    'task_edit': 8,
+    'all_badges': 6,
+    'badge_details': 8,
+    'instructors': 8,
+    'search': 8,
+    'debrief': 8,
+    'all_jobs': 6,
+    'job_details': 6,
+    'workshops_person_changelist': 6,
+    'workshops_event_changelist': 8,
+    'workshops_task_changelist': 8,
+    'workshops_award_changelist': 8,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'level': 'INFO',
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'workshops.queries': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'workshops.jobs': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
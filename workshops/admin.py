@@ -1,6 +1,126 @@
-from django.contrib import admin
-from workshops.models import Airport
-from workshops.models import Site
+from django.contrib import admin, messages
+from django.contrib.auth.admin import UserAdmin
+from workshops.forms import PersonChangeForm, PersonCreationForm
+from workshops.lookups import persons
+from workshops.models import Airport, Award, Event, Person, Site, Task
+
+# How many people a search in the admin matches at most (more would not fit
+# in the parameters of one `IN (...)` query on SQLite).
+ADMIN_SEARCH_LEN = 100
 
 admin.site.register(Airport)
 admin.site.register(Site)
+
+
+def _person_ids(request, term):
+    '''IDs of the people best matching `term`, from the trigram index.
+
+    If more people match than are returned, the user is told so.
+    '''
+    found = [p.id for p in persons.search(term, limit=ADMIN_SEARCH_LEN + 1)]
+    if len(found) > ADMIN_SEARCH_LEN:
+        messages.warning(request,
+                         'Only the {0} people best matching "{1}" are '
+                         'searched; please refine your search.'
+                         .format(ADMIN_SEARCH_LEN, term))
+    return found[:ADMIN_SEARCH_LEN]
+
+
+def _slug_prefix(term):
+    '''Lookups for events whose slug starts with `term`.
+
+    A range rather than `startswith`, which neither SQLite nor PostgreSQL
+    answer from a plain index.
+    '''
+    return {'slug__gte': term, 'slug__lt': term + '\uffff'}
+
+
+class PersonAdmin(UserAdmin):
+    fieldsets = (
+        (None, {'fields': ('username', 'password')}),
+        ('Personal info', {'fields': ('personal', 'middle', 'family',
+                                      'email', 'gender', 'may_contact')}),
+        ('Contact', {'fields': ('airport', 'github', 'twitter', 'url')}),
+        ('Permissions', {'fields': ('is_superuser', 'groups',
+                                    'user_permissions')}),
+        ('Important dates', {'fields': ('last_login', )}),
+    )
+    add_fieldsets = (
+        (None, {
+            'classes': ('wide', ),
+            'fields': ('username', 'personal', 'family', 'email',
+                       'password1', 'password2'),
+        }),
+    )
+    readonly_fields = ('last_login', )
+    form = PersonChangeForm
+    add_form = PersonCreationForm
+    list_display = ('username', 'personal', 'family', 'email', 'airport')
+    list_select_related = ('airport', )
+    list_filter = ('is_superuser', )
+    raw_id_fields = ('airport', )
+    # searched through the trigram index (see get_search_results)
+    search_fields = ('personal', 'family', 'email', 'github')
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(id__in=_person_ids(request, term)), False
+
+
+class EventAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'site', 'start', 'end', 'published')
+    list_select_related = ('site', )
+    list_filter = ('published', )
+    raw_id_fields = ('site', 'organizer')
+    # searched by slug prefix (see get_search_results)
+    search_fields = ('slug', )
+    date_hierarchy = 'start'
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():      # pending events are known by their ID
+            return queryset.filter(id=term), False
+        return queryset.filter(**_slug_prefix(term)), False
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('event', 'person', 'role')
+    list_select_related = ('event', 'person', 'role')
+    list_filter = ('role', )
+    raw_id_fields = ('event', 'person')
+    # searched by person (trigrams) or event slug prefix
+    search_fields = ('person__personal', 'person__family', 'event__slug')
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        events = Event.objects.filter(**_slug_prefix(term)).values('id')
+        return queryset.filter(person__in=_person_ids(request, term)) | \
+               queryset.filter(event__in=events), False
+
+
+class AwardAdmin(admin.ModelAdmin):
+    list_display = ('person', 'badge', 'awarded', 'event')
+    list_select_related = ('person', 'badge', 'event')
+    list_filter = ('badge', )
+    raw_id_fields = ('person', 'event')
+    # searched by person (see get_search_results)
+    search_fields = ('person__personal', 'person__family')
+    date_hierarchy = 'awarded'
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(person__in=_person_ids(request, term)), False
+
+
+admin.site.register(Person, PersonAdmin)
+admin.site.register(Event, EventAdmin)
+admin.site.register(Task, TaskAdmin)
+admin.site.register(Award, AwardAdmin)
@@ -0,0 +1,20 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+class WorkshopsConfig(AppConfig):
+    name = 'workshops'
+    verbose_name = 'Workshops'
+
+    def ready(self):
+        # connect signal receivers
+        from workshops import signals  # noqa
+        from workshops.db import configure_connection
+        connection_created.connect(configure_connection,
+                                   dispatch_uid='workshops-configure-db')
+
+        # compile templates now rather than during the first requests
+        if getattr(settings, 'TEMPLATE_CACHE', False):
+            from workshops.template_warmup import warm_templates
+            warm_templates()
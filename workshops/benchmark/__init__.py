@@ -0,0 +1,13 @@
+'''Performance benchmarks at production scale.
+
+`workshops.benchmark.data` fills an (empty, throw-away) database with
+synthetic but realistically shaped data using bulk inserts, and
+`workshops.benchmark.timing` times the main pages and the bulk upload
+path against it.  Run both with:
+
+    python manage.py benchmark
+
+which creates a test database, generates data, times everything and
+appends the results to a JSON history file so runs can be compared
+between commits.
+'''
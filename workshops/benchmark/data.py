@@ -0,0 +1,168 @@
+'''Synthetic data generation for benchmarks.'''
+
+import datetime
+import random
+import string
+
+from workshops.models import (
+    Airport, Award, Badge, Event, Person, PersonStats, Qualification, Role,
+    Site, Skill, Tag, Task)
+
+#------------------------------------------------------------
+
+# Production-scale defaults.
+SIZES = {
+    'airports': 5000,
+    'sites': 2000,
+    'people': 100000,
+    'events': 50000,
+    'tasks': 500000,
+}
+
+ROLES = ['instructor', 'helper', 'learner', 'host']
+TAGS = ['SWC', 'DC', 'online', 'TTT', 'LC']
+SKILLS = ['Git', 'Mercurial', 'SQL', 'Python', 'R', 'Shell', 'MATLAB']
+BADGES = ['instructor', 'member', 'creator', 'organizer']
+
+# Shares of tasks per role, roughly as in the real database.
+ROLE_WEIGHTS = [0.1, 0.1, 0.78, 0.02]
+
+# SQLite allows at most 999 variables per statement.
+BATCH_SIZE = 80
+
+FIRST_DATE = datetime.date(2010, 1, 1)
+DAYS = 365 * 8
+
+#------------------------------------------------------------
+
+
+def scaled(sizes=None, scale=1.0):
+    '''Return table sizes, optionally scaled down for quick runs.'''
+    result = dict(SIZES)
+    result.update(sizes or {})
+    return {k: max(1, int(v * scale)) for (k, v) in result.items()}
+
+
+def _word(rnd, length):
+    return ''.join(rnd.choice(string.ascii_lowercase) for i in range(length))
+
+
+def _notes(rnd, paragraphs):
+    return '\n\n'.join(' '.join(_word(rnd, rnd.randint(2, 9))
+                                for i in range(60))
+                       for j in range(paragraphs))
+
+
+def generate(sizes=None, seed=0, notes=1):
+    '''Fill the database with synthetic data and return row counts.
+
+    `sizes` maps table names (see `SIZES`) to row counts; `notes` is the
+    number of paragraphs of notes on each site and event.  The database
+    is expected to be empty.
+    '''
+    sizes = scaled(sizes)
+    rnd = random.Random(seed)
+
+    roles = [Role.objects.create(name=n) for n in ROLES]
+    tags = [Tag.objects.create(name=n, details=n) for n in TAGS]
+    skills = [Skill.objects.create(name=n) for n in SKILLS]
+    badges = [Badge.objects.create(name=n, title=n.title(), criteria='')
+              for n in BADGES]
+
+    Airport.objects.bulk_create(
+        [Airport(iata='{0:05d}'.format(i),
+                 fullname='Airport {0} {1}'.format(_word(rnd, 6), i),
+                 country='Country-{0}'.format(i % 200),
+                 latitude=rnd.uniform(-60, 70),
+                 longitude=rnd.uniform(-180, 180))
+         for i in range(sizes['airports'])],
+        batch_size=BATCH_SIZE)
+    airport_ids = list(Airport.objects.values_list('id', flat=True))
+
+    Site.objects.bulk_create(
+        [Site(domain='site{0}.{1}.edu'.format(i, _word(rnd, 5)),
+              fullname='Site {0} {1}'.format(_word(rnd, 8), i),
+              country='Country-{0}'.format(i % 200),
+              notes=_notes(rnd, notes))
+         for i in range(sizes['sites'])],
+        batch_size=BATCH_SIZE)
+    site_ids = list(Site.objects.values_list('id', flat=True))
+
+    people = []
+    for i in range(sizes['people']):
+        personal, family = _word(rnd, 6).title(), _word(rnd, 8).title()
+        people.append(Person(
+            username='{0}.{1}.{2}'.format(family, personal, i).lower(),
+            personal=personal, family=family,
+            email='{0}.{1}.{2}@example.org'.format(personal, family, i),
+            airport_id=rnd.choice(airport_ids) if rnd.random() < 0.5 else None,
+            github='gh{0}'.format(i) if rnd.random() < 0.3 else None,
+            may_contact=rnd.random() < 0.9))
+        people[-1].normalize()
+    Person.objects.bulk_create(people, batch_size=BATCH_SIZE)
+    person_ids = list(Person.objects.values_list('id', flat=True))
+
+    events = []
+    for i in range(sizes['events']):
+        start = FIRST_DATE + datetime.timedelta(days=rnd.randrange(DAYS))
+        events.append(Event(
+            published=rnd.random() < 0.9,
+            site_id=rnd.choice(site_ids),
+            start=start,
+            end=start + datetime.timedelta(days=rnd.randint(0, 2)),
+            slug='{0}-{1}'.format(start.isoformat(), i),
+            url='https://github.com/event/{0}'.format(i),
+            attendance=rnd.randint(5, 60),
+            admin_fee=0,
+            notes=_notes(rnd, notes)))
+    Event.objects.bulk_create(events, batch_size=BATCH_SIZE)
+    event_ids = list(Event.objects.values_list('id', flat=True))
+
+    Event.tags.through.objects.bulk_create(
+        [Event.tags.through(event_id=e, tag_id=rnd.choice(tags).id)
+         for e in event_ids],
+        batch_size=BATCH_SIZE)
+
+    # Instructors and helpers come from a small pool of people, so some of
+    # them teach a lot (which is what makes N+1 queries hurt).
+    teachers = person_ids[:max(1, len(person_ids) // 20)]
+    seen = set()
+    tasks = []
+    for attempt in range(sizes['tasks'] * 10):
+        if len(tasks) >= sizes['tasks']:
+            break
+        role = _weighted(rnd, roles)
+        pool = teachers if role.name in ('instructor', 'helper') \
+            else person_ids
+        key = (rnd.choice(event_ids), rnd.choice(pool), role.id)
+        if key not in seen:
+            seen.add(key)
+            tasks.append(Task(event_id=key[0], person_id=key[1],
+                              role_id=key[2]))
+    Task.objects.bulk_create(tasks, batch_size=BATCH_SIZE)
+
+    instructor_badge = badges[0]
+    Award.objects.bulk_create(
+        [Award(person_id=p, badge=instructor_badge,
+               awarded=FIRST_DATE + datetime.timedelta(days=rnd.randrange(DAYS)))
+         for p in teachers],
+        batch_size=BATCH_SIZE)
+    Qualification.objects.bulk_create(
+        [Qualification(person_id=p, skill=s)
+         for p in teachers for s in rnd.sample(skills, rnd.randint(1, 3))],
+        batch_size=BATCH_SIZE)
+
+    # bulk_create bypasses the signals maintaining derived tables
+    PersonStats.objects.rebuild()
+
+    return sizes
+
+
+def _weighted(rnd, items):
+    '''Pick one of `items` according to ROLE_WEIGHTS.'''
+    x, total = rnd.random(), 0
+    for (item, weight) in zip(items, ROLE_WEIGHTS):
+        total += weight
+        if x < total:
+            return item
+    return items[-1]
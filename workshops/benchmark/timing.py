@@ -0,0 +1,431 @@
+'''Timing of the main application paths.
+
+Each benchmark is a function registered with `@benchmark(name)`; it gets a
+`Fixture` (a logged-in test client plus sample objects) and performs one
+run of whatever it measures.
+'''
+
+import datetime
+import io
+import json
+import os
+import subprocess
+import time
+from collections import OrderedDict
+
+from django.core.paginator import Paginator
+from django.core.urlresolvers import reverse
+from django.db import transaction
+from django.db.models import Count
+from django.template import Context, Template
+from django.template.loader import get_template
+from django.test import Client
+
+from workshops import jobs
+from workshops.models import (
+    Airport, Badge, Event, Person, Site, Skill, Task)
+from workshops.views import ITEMS_PER_PAGE
+from workshops.util import (
+    upload_person_task_csv, verify_upload_person_task,
+    create_uploaded_persons_tasks)
+
+#------------------------------------------------------------
+
+BENCHMARKS = OrderedDict()
+
+USERNAME = 'benchmark'
+PASSWORD = 'benchmark'
+UPLOAD_ROWS = 200
+RENDERS = 1000          # template renders per run of micro-benchmarks
+
+
+def benchmark(name):
+    '''Register a benchmark function under `name`.'''
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+class Fixture(object):
+    '''Logged-in client and representative objects to benchmark against.'''
+
+    def __init__(self):
+        if not Person.objects.filter(username=USERNAME).exists():
+            Person.objects.create_superuser(
+                username=USERNAME, personal='Bench', family='Mark',
+                email='benchmark@example.org', password=PASSWORD)
+        self.client = Client()
+        assert self.client.login(username=USERNAME, password=PASSWORD)
+
+        # the busiest objects show N+1 problems best
+        self.person = Person.objects.annotate(num=Count('task')) \
+                                    .order_by('-num')[0]
+        self.event = Event.objects.annotate(num=Count('task')) \
+                                  .order_by('-num')[0]
+        self.site = Site.objects.annotate(num=Count('event')) \
+                                .order_by('-num')[0]
+        self.badge = Badge.objects.annotate(num=Count('award')) \
+                                  .order_by('-num')[0]
+        self.airport = Airport.objects.first()
+        self.task = Task.objects.first()
+        self.skill = Skill.objects.first()
+        self.event_date = self.event.start or datetime.date.today()
+        self._list_pages = None
+
+    def list_page(self, name):
+        '''Return a context for rendering the first page of a listing.
+
+        Objects are loaded once, with everything the template needs, so
+        rendering does not touch the database.
+        '''
+        if self._list_pages is None:
+            events = list(Event.objects.for_listing()
+                                       .prefetch_related('tags')
+                                       [:ITEMS_PER_PAGE])
+            for e in events:
+                e.num_instructors = 0
+            self._list_pages = {
+                'all_events': events,
+                'all_persons': list(Person.objects.order_by('family',
+                                                            'personal')
+                                                  [:ITEMS_PER_PAGE]),
+                'all_sites': list(Site.objects.for_listing()
+                                              .order_by('domain')
+                                              [:ITEMS_PER_PAGE]),
+                'all_tasks': list(Task.objects.for_listing()
+                                              [:ITEMS_PER_PAGE]),
+            }
+        page = Paginator(self._list_pages[name], ITEMS_PER_PAGE).page(1)
+        # a timeout of 0 disables fragment caching, which is not measured
+        return {'title': name, 'user': self.person, 'user_can_add': True,
+                'fragment_timeout': 0, 'fragment_generation': '',
+                name: page}
+
+    def get(self, name, *args, **params):
+        return self._check(self.client.get(reverse(name, args=args), params))
+
+    def post(self, name, data, *args):
+        return self._check(self.client.post(reverse(name, args=args), data))
+
+    def _check(self, response):
+        assert response.status_code == 200, \
+            'Got status code {0}'.format(response.status_code)
+        # consume streamed responses, since that is where the work happens
+        if getattr(response, 'streaming', False):
+            for chunk in response.streaming_content:
+                pass
+        return response
+
+#------------------------------------------------------------
+
+@benchmark('all_sites')
+def bench_all_sites(fx):
+    fx.get('all_sites')
+
+
+@benchmark('all_sites_unpaged')
+def bench_all_sites_unpaged(fx):
+    '''Every site on one page: dominated by loading the rows.'''
+    fx.get('all_sites', items_per_page='all')
+
+
+@benchmark('all_airports')
+def bench_all_airports(fx):
+    fx.get('all_airports')
+
+
+@benchmark('all_persons')
+def bench_all_persons(fx):
+    fx.get('all_persons')
+
+
+@benchmark('all_persons_unpaged')
+def bench_all_persons_unpaged(fx):
+    '''Every person on one page, streamed.'''
+    fx.get('all_persons', items_per_page='all')
+
+
+@benchmark('all_events')
+def bench_all_events(fx):
+    fx.get('all_events')
+
+
+@benchmark('all_tasks')
+def bench_all_tasks(fx):
+    fx.get('all_tasks')
+
+
+@benchmark('all_tasks_unpaged')
+def bench_all_tasks_unpaged(fx):
+    '''Every task on one page, streamed.'''
+    fx.get('all_tasks', items_per_page='all')
+
+
+@benchmark('all_badges')
+def bench_all_badges(fx):
+    fx.get('all_badges')
+
+
+@benchmark('site_details')
+def bench_site_details(fx):
+    fx.get('site_details', fx.site.domain)
+
+
+@benchmark('airport_details')
+def bench_airport_details(fx):
+    fx.get('airport_details', fx.airport.iata)
+
+
+@benchmark('person_details')
+def bench_person_details(fx):
+    fx.get('person_details', fx.person.id)
+
+
+@benchmark('event_details')
+def bench_event_details(fx):
+    fx.get('event_details', fx.event.get_ident())
+
+
+@benchmark('task_details')
+def bench_task_details(fx):
+    fx.get('task_details', fx.task.id)
+
+
+@benchmark('badge_details')
+def bench_badge_details(fx):
+    fx.get('badge_details', fx.badge.name)
+
+
+@benchmark('task_edit')
+def bench_task_edit(fx):
+    fx.get('task_edit', fx.task.id)
+
+
+@benchmark('event_add')
+def bench_event_add(fx):
+    fx.get('event_add')
+
+
+@benchmark('person_edit')
+def bench_person_edit(fx):
+    fx.get('person_edit', fx.person.id)
+
+
+@benchmark('search')
+def bench_search(fx):
+    fx.post('search', {'term': 'ab', 'in_sites': 'on', 'in_events': 'on',
+                       'in_persons': 'on'})
+
+
+@benchmark('airport_search')
+def bench_airport_search(fx):
+    fx.get('airport_search', term=fx.airport.iata[:1])
+
+
+@benchmark('person_search')
+def bench_person_search(fx):
+    '''A misspelled name: the last two letters of each part swapped.'''
+    fx.get('person_search', term=' '.join(
+        name[:-2] + name[-1] + name[-2]
+        for name in (fx.person.personal, fx.person.family)))
+
+
+@benchmark('site_search')
+def bench_site_search(fx):
+    fx.get('site_search', term=fx.site.fullname[:4])
+
+
+@benchmark('event_search')
+def bench_event_search(fx):
+    fx.get('event_search', term=fx.event.site.domain[:6])
+
+
+@benchmark('admin_tasks')
+def bench_admin_tasks(fx):
+    fx.get('admin:workshops_task_changelist')
+
+
+@benchmark('admin_tasks_search')
+def bench_admin_tasks_search(fx):
+    fx.get('admin:workshops_task_changelist', q=fx.person.family)
+
+
+@benchmark('admin_awards_by_month')
+def bench_admin_awards_by_month(fx):
+    fx.get('admin:workshops_award_changelist',
+           awarded__year=fx.event_date.year,
+           awarded__month=fx.event_date.month)
+
+
+@benchmark('instructors')
+def bench_instructors(fx):
+    fx.post('instructors', {'airport': fx.airport.iata, 'wanted': 50,
+                            fx.skill.name: 'on'})
+
+
+@benchmark('debrief')
+def bench_debrief(fx):
+    end = fx.event_date + datetime.timedelta(days=30)
+    fx.post('debrief', {'begin_date': fx.event_date.isoformat(),
+                        'end_date': end.isoformat()})
+
+
+@benchmark('export_badges')
+def bench_export_badges(fx):
+    '''Run the export job itself (the view only queues it).'''
+    jobs.export(name='badges')
+
+
+@benchmark('export_instructors')
+def bench_export_instructors(fx):
+    jobs.export(name='instructors')
+
+
+class _Rollback(Exception):
+    pass
+
+
+@benchmark('bulk_upload')
+def bench_bulk_upload(fx):
+    '''Parse, verify and save an upload, then roll it back.'''
+    existing = list(Person.objects.exclude(email=None)
+                                  .values_list('personal', 'family', 'email')
+                                  [:UPLOAD_ROWS // 2])
+    lines = ['personal,middle,family,email,event,role']
+    for (personal, family, email) in existing:
+        lines.append('{0},,{1},{2},{3},helper'.format(
+            personal, family, email, fx.event.slug))
+    for i in range(UPLOAD_ROWS - len(existing)):
+        lines.append('New{0},,Person,new{0}@example.org,{1},learner'
+                     .format(i, fx.event.slug))
+
+    data, _ = upload_person_task_csv(io.StringIO('\n'.join(lines)))
+    verify_upload_person_task(data)
+    # e.g. people who already have that task
+    data = [row for row in data if not row['errors']]
+    try:
+        with transaction.atomic():
+            create_uploaded_persons_tasks(data)
+            raise _Rollback()
+    except _Rollback:
+        pass
+
+# Micro-benchmarks: one run is RENDERS renders of a template, without any
+# request handling or database access.
+
+_BREADCRUMBS = Template('''{% load breadcrumbs %}
+    {% breadcrumb_main_page %}
+    {% breadcrumb_index_all_objects person %}
+    {% breadcrumb_object person %}
+    {% breadcrumb_edit_object person %}''')
+
+_PAGE_CHROME = Template('''{% extends "base.html" %}
+{% block breadcrumbs %}{% endblock %}''')
+
+
+def _render(fx, template):
+    context = Context({'user': fx.person, 'person': fx.person,
+                       'title': 'Benchmark'})
+    for i in range(RENDERS):
+        template.render(context)
+
+
+def _render_list_page(fx, name):
+    '''Load and render the template of a listing (RENDERS / 10 times).
+
+    Loading is included: this is what the cached template loader saves.
+    '''
+    context = fx.list_page(name)
+    for i in range(RENDERS // 10):
+        get_template('workshops/{0}.html'.format(name)).render(
+            Context(context))
+
+
+for _name in ('all_events', 'all_persons', 'all_sites', 'all_tasks'):
+    benchmark('render_' + _name)(
+        lambda fx, name=_name: _render_list_page(fx, name))
+
+
+@benchmark('breadcrumbs')
+def bench_breadcrumbs(fx):
+    _render(fx, _BREADCRUMBS)
+
+
+@benchmark('page_chrome')
+def bench_page_chrome(fx):
+    '''Base templates, including navigation.'''
+    _render(fx, _PAGE_CHROME)
+
+#------------------------------------------------------------
+
+
+def time_one(func, fixture, repeat):
+    '''Run `func` `repeat` times and summarize timings in milliseconds.
+
+    One extra untimed run comes first, so one-off costs like loading
+    templates don't skew the results.
+    '''
+    func(fixture)
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(fixture)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {'min': round(times[0], 2),
+            'median': round(times[len(times) // 2], 2),
+            'max': round(times[-1], 2)}
+
+
+def run(names=None, repeat=3, report=None):
+    '''Run benchmarks (all by default); return results by name.'''
+    fixture = Fixture()
+    results = OrderedDict()
+    for name in (names or BENCHMARKS.keys()):
+        results[name] = time_one(BENCHMARKS[name], fixture, repeat)
+        if report:
+            report(name, results[name])
+    return results
+
+#------------------------------------------------------------
+
+
+def current_commit():
+    '''Return the abbreviated git commit hash, or None outside git.'''
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    '''Load the list of previous benchmark runs.'''
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as reader:
+        return json.load(reader)
+
+
+def save_history(path, history):
+    with open(path, 'w') as writer:
+        json.dump(history, writer, indent=2, sort_keys=True)
+
+
+def make_entry(sizes, results):
+    return {'commit': current_commit(),
+            'date': datetime.datetime.utcnow().isoformat(),
+            'sizes': sizes,
+            'results': results}
+
+
+def compare(previous, current):
+    '''Yield (name, previous median, current median, ratio) per benchmark.'''
+    for (name, stats) in current['results'].items():
+        before = previous['results'].get(name)
+        if before:
+            ratio = stats['median'] / before['median'] \
+                if before['median'] else None
+            yield name, before['median'], stats['median'], ratio
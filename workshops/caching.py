@@ -0,0 +1,111 @@
+'''Cached, explicitly invalidated summaries and page fragments.'''
+
+import uuid
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from workshops.models import Award, Task
+
+#------------------------------------------------------------
+
+SUMMARY_TIMEOUT = 24 * 60 * 60        # seconds; entries are invalidated
+
+
+def _person_summary_key(person_id):
+    return 'person-summary-{0}'.format(person_id)
+
+
+def get_person_summary(person):
+    '''Return awards and tasks of `person`, with tasks grouped by event.
+
+    The result is a dictionary of plain data suitable for caching:
+    'awards' is a list of award descriptions and 'events' a list of
+    dictionaries with the event's name, URL and tasks (id and description)
+    in event order.
+    '''
+    key = _person_summary_key(person.id)
+    summary = cache.get(key)
+    if summary is None:
+        summary = _build_person_summary(person)
+        cache.set(key, summary, SUMMARY_TIMEOUT)
+    return summary
+
+
+def _build_person_summary(person):
+    awards = Award.objects.filter(person=person) \
+                          .select_related('badge', 'event') \
+                          .order_by('awarded', 'id')
+    tasks = Task.objects.filter(person=person) \
+                        .select_related('event', 'role') \
+                        .order_by('event__start', 'event', 'role__name')
+
+    summary = {'awards': [], 'events': []}
+    for a in awards:
+        a.person = person       # saves a query per award in __str__
+        summary['awards'].append(str(a))
+
+    index = 0
+    for t in tasks:
+        t.person = person
+        if not summary['events'] or \
+           summary['events'][-1]['id'] != t.event_id:
+            summary['events'].append({'id': t.event_id,
+                                      'name': str(t.event),
+                                      'url': t.event.get_absolute_url(),
+                                      'tasks': []})
+        summary['events'][-1]['tasks'].append(
+            {'id': t.id, 'index': index, 'name': str(t)})
+        index += 1
+    return summary
+
+
+def invalidate_person_summary(*person_ids):
+    '''Forget cached summaries for the given people.'''
+    cache.delete_many([_person_summary_key(pid)
+                       for pid in set(person_ids) if pid is not None])
+
+#------------------------------------------------------------
+
+# Rendered page fragments, cached with {% cache %} in the templates of
+# read-mostly pages.  Each fragment name has a generation token that is part
+# of every key; fragments for a single object (e.g. one site) can be
+# invalidated by key, and all fragments of a name by a new generation.
+
+FRAGMENT_TIMEOUT = 24 * 60 * 60       # seconds; entries are invalidated
+
+
+def _generation_key(name):
+    return 'fragment-generation-{0}'.format(name)
+
+
+def fragment_generation(name):
+    '''Return the current generation token of fragments called `name`.'''
+    key = _generation_key(name)
+    generation = cache.get(key)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not cache.add(key, generation, timeout=None):
+            generation = cache.get(key, generation)
+    return generation
+
+
+def fragment_context(name):
+    '''Template variables used by {% cache %} for fragment `name`.'''
+    return {'fragment_timeout': FRAGMENT_TIMEOUT,
+            'fragment_generation': fragment_generation(name)}
+
+
+def invalidate_fragments(name, *object_ids):
+    '''Forget cached fragments called `name`.
+
+    With `object_ids`, only fragments for those objects are deleted (their
+    templates must vary on the generation and then the object ID only);
+    otherwise all of them are.
+    '''
+    if object_ids:
+        generation = fragment_generation(name)
+        cache.delete_many([make_template_fragment_key(name, [generation, i])
+                           for i in set(object_ids) if i is not None])
+    else:
+        cache.set(_generation_key(name), uuid.uuid4().hex, timeout=None)
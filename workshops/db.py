@@ -0,0 +1,22 @@
+'''Per-connection database setup.'''
+
+from django.conf import settings
+
+
+def configure_connection(sender, connection, **kwargs):
+    '''Tune SQLite connections as they are opened.
+
+    Connected to `connection_created`.  WAL mode lets readers carry on
+    while an admin is writing, and the busy timeout makes a second writer
+    wait for the lock instead of failing with "database is locked".
+    (In-memory databases, as used by the tests, ignore WAL mode.)
+    '''
+    if connection.vendor != 'sqlite':
+        return
+    cursor = connection.cursor()
+    cursor.execute('PRAGMA busy_timeout = {0:d}'.format(
+        getattr(settings, 'SQLITE_BUSY_TIMEOUT', 5000)))
+    journal_mode = getattr(settings, 'SQLITE_JOURNAL_MODE', None)
+    if journal_mode:
+        cursor.execute('PRAGMA journal_mode = {0}'.format(journal_mode))
+    cursor.close()
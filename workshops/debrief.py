@@ -0,0 +1,74 @@
+'''Who taught when: instructors' tasks at events overlapping a date range.
+
+Finding the events that overlap a range needs both of their dates, so the
+database cannot use one index to answer it.  `event_intervals` keeps the
+dates of all events in memory instead, sorted by start date: an event that
+overlaps [begin, end] starts no later than `end`, and no earlier than
+`begin` minus the length of the longest event, so only that slice of the
+list has to be checked.  The index is rebuilt (in every process) when
+events change, like the reference tables in workshops/lookups.py.
+'''
+
+import bisect
+import datetime
+
+from workshops.lookups import VersionedIndex, roles
+from workshops.models import Event, Task
+
+# More events than this are not listed by ID in the task query (SQLite
+# allows 999 parameters per query); the query filters on dates instead.
+MAX_EVENT_IDS = 500
+
+
+class EventIntervalIndex(VersionedIndex):
+    '''Start and end dates of all events, sorted by start date.
+
+    Events without both dates cannot overlap anything and are left out.
+    '''
+
+    def __init__(self):
+        super(EventIntervalIndex, self).__init__(Event)
+
+    def _rows(self):
+        return list(Event.objects.exclude(start=None).exclude(end=None)
+                                 .order_by('start', 'id')
+                                 .values_list('id', 'start', 'end'))
+
+    def _build(self, rows):
+        self._starts = [start for (_, start, _) in rows]
+        self._longest = max([end - start for (_, start, end) in rows] +
+                            [datetime.timedelta(0)])
+        self._all = rows
+
+    def overlapping(self, begin, end):
+        '''Return the IDs of events overlapping [begin, end], in start
+        order.'''
+        self._load()
+        first = bisect.bisect_left(self._starts, begin - self._longest)
+        last = bisect.bisect_right(self._starts, end)
+        return [event_id
+                for (event_id, _, event_end) in self._all[first:last]
+                if event_end >= begin]
+
+
+event_intervals = EventIntervalIndex()
+
+
+def instructor_tasks(begin, end):
+    '''Select instructors' tasks at events overlapping [begin, end].
+
+    Only people who may be contacted are included.  Raises ValueError if
+    the range is empty.
+    '''
+    if begin > end:
+        raise ValueError('Begin date {0} is after end date {1}'
+                         .format(begin, end))
+    tasks = Task.objects.for_listing().filter(
+        role__in=roles.ids('instructor'),
+        person__may_contact=True)
+    event_ids = event_intervals.overlapping(begin, end)
+    if len(event_ids) <= MAX_EVENT_IDS:
+        tasks = tasks.filter(event__in=event_ids)
+    else:
+        tasks = tasks.filter(event__end__gte=begin, event__start__lte=end)
+    return tasks.order_by('event', 'person', 'role')
@@ -0,0 +1,201 @@
+'''Precomputed distances between airports.
+
+`manage.py build_airport_distances` stores the great-circle distance (in
+km, as float32) between every pair of airports in a .npy file
+(settings.AIRPORT_DISTANCES).  Web processes map the file into memory
+read-only, so they all share one copy through the operating system's page
+cache.  Row 0 of the file holds the airport IDs of the columns (float32
+represents IDs below 2**24 exactly; 0 marks a free slot) and row i + 1 the
+distances from the airport in column i, so that the IDs and distances are
+always replaced together.
+
+When an airport is added, moved or deleted, its row and column are
+rewritten in place; the file has spare slots for new airports and is only
+rebuilt, by a background job, when they run out.  Writers hold an
+exclusive lock on a lock file next to the data file, so two processes
+never claim the same slot.
+
+numpy is optional: without it, or without the file, `airport_distances`
+reports that it has no distances and callers compute them as before.
+'''
+
+import contextlib
+import fcntl
+import os
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from django.conf import settings
+
+from workshops.lookups import VersionedIndex
+from workshops.models import Airport
+
+EARTH_RADIUS = 6373             # km, as in workshops.util.earth_distance
+SPARE_SLOTS = 64                # room for airports added after a build
+
+
+def _distances(rows, columns):
+    '''Distances (km) between (latitude, longitude) pairs; the same
+    formula as `earth_distance`, over arrays.'''
+    rows = numpy.radians(numpy.asarray(rows, dtype=numpy.float64)
+                         .reshape(-1, 2))
+    columns = numpy.radians(numpy.asarray(columns, dtype=numpy.float64)
+                            .reshape(-1, 2))
+    phi1 = (numpy.pi / 2 - rows[:, 0])[:, numpy.newaxis]
+    phi2 = (numpy.pi / 2 - columns[:, 0])[numpy.newaxis, :]
+    theta = rows[:, 1][:, numpy.newaxis] - columns[:, 1][numpy.newaxis, :]
+    c = numpy.sin(phi1) * numpy.sin(phi2) * numpy.cos(theta) + \
+        numpy.cos(phi1) * numpy.cos(phi2)
+    # rounding can push c just past 1 for (nearly) identical points
+    return (numpy.arccos(numpy.clip(c, -1.0, 1.0)) * EARTH_RADIUS) \
+        .astype(numpy.float32)
+
+
+@contextlib.contextmanager
+def _locked(path):
+    '''Hold the write lock of the distance file at `path`.
+
+    The lock is on a separate file, since `build` replaces the data file.
+    '''
+    with open(path + '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def build(path=None, spare=SPARE_SLOTS):
+    '''Compute the distances between all airports and save them to `path`
+    (default settings.AIRPORT_DISTANCES); return the number of airports.'''
+    path = path or settings.AIRPORT_DISTANCES
+    with _locked(path):
+        rows = list(Airport.objects.order_by('id')
+                                   .values_list('id', 'latitude', 'longitude'))
+        size = len(rows) + spare
+        matrix = numpy.zeros((size + 1, size), dtype=numpy.float32)
+        if rows:
+            positions = [(lat, long) for (_, lat, long) in rows]
+            matrix[0, :len(rows)] = [airport_id
+                                     for (airport_id, _, _) in rows]
+            matrix[1:len(rows) + 1, :len(rows)] = \
+                _distances(positions, positions)
+
+        # write a new file and move it into place, so readers never see a
+        # half-written one (and keep the old one for as long as they map it)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as writer:
+            numpy.save(writer, matrix)
+        os.replace(tmp_path, path)
+    airport_distances.invalidate()
+    return len(rows)
+
+
+def _existing_path():
+    path = getattr(settings, 'AIRPORT_DISTANCES', None)
+    if numpy is None or not path or not os.path.exists(path):
+        return None
+    return path
+
+
+def update(airport):
+    '''Recompute the row and column of `airport` (after it was saved).
+
+    If the file has no room left, a job is queued to rebuild it; until
+    then, distances to the airport are unknown (and computed by callers).
+    '''
+    path = _existing_path()
+    if path is None:
+        return
+    with _locked(path):
+        updated = _update(path, airport)
+    if updated:
+        airport_distances.invalidate()
+    else:
+        # imported here as jobs need the models' signal receivers
+        from workshops.jobs import enqueue_once
+        enqueue_once('build_airport_distances')
+
+
+def _update(path, airport):
+    '''Rewrite the slot of `airport` in the file at `path` (locked by the
+    caller); return False if there is no free slot.'''
+    matrix = numpy.load(path, mmap_mode='r+')
+    ids = matrix[0]
+    slots = numpy.flatnonzero(ids == airport.id)
+    if not len(slots):
+        slots = numpy.flatnonzero(ids == 0)
+    if not len(slots):
+        return False
+
+    slot = slots[0]
+    ids[slot] = airport.id
+    positions = {airport_id: (lat, long) for (airport_id, lat, long) in
+                 Airport.objects.values_list('id', 'latitude', 'longitude')}
+    # slots of airports deleted behind our back are freed
+    used = []
+    for i in numpy.flatnonzero(ids):
+        if int(ids[i]) in positions:
+            used.append(i)
+        else:
+            ids[i] = 0
+    used = numpy.array(used)
+    row = _distances([positions[airport.id]],
+                     [positions[int(i)] for i in ids[used]])[0]
+    matrix[slot + 1, used] = row
+    matrix[used + 1, slot] = row
+    matrix.flush()
+    return True
+
+
+def remove(airport_id):
+    '''Free the slot of a deleted airport.'''
+    path = _existing_path()
+    if path is None:
+        return
+    with _locked(path):
+        matrix = numpy.load(path, mmap_mode='r+')
+        matrix[0][matrix[0] == airport_id] = 0
+        matrix.flush()
+    airport_distances.invalidate()
+
+
+class AirportDistances(VersionedIndex):
+    '''Read-only view of the distance file.'''
+
+    def __init__(self):
+        super(AirportDistances, self).__init__(Airport,
+                                               name='AirportDistances')
+
+    def _rows(self):
+        path = _existing_path()
+        if path is None:
+            return None
+        return numpy.load(path, mmap_mode='r')
+
+    def _build(self, matrix):
+        if matrix is None:
+            self._slots, self._matrix = {}, None
+        else:
+            self._slots = {int(airport_id): slot
+                           for (slot, airport_id) in enumerate(matrix[0])
+                           if airport_id}
+            self._matrix = matrix[1:]
+        self._all = ()          # loaded, even if there is nothing
+
+    def between(self, airport_id, other_ids):
+        '''Return the distances (km) from airport `airport_id` to each of
+        `other_ids`, or None if any of them is unknown.'''
+        self._load()
+        try:
+            columns = [self._slots[i] for i in other_ids]
+            row = self._slots[airport_id]
+        except KeyError:
+            return None
+        return self._matrix[row, columns].tolist()
+
+
+airport_distances = AirportDistances()
@@ -1,10 +1,83 @@
 from django import forms
+from django.contrib.auth.forms import ReadOnlyPasswordHashField
+from django.contrib.auth.models import Permission
+from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
+from django.core.urlresolvers import reverse_lazy
+from django.utils.html import format_html
 
-from workshops.models import Skill, Airport
+from workshops.lookups import skills
+from workshops.models import Airport, Event, Person, Site, Task
 
 INSTRUCTOR_SEARCH_LEN = 10   # how many instrutors to return from a search by default
 
 
+class AutocompleteInput(forms.TextInput):
+    '''Text box suggesting values from a JSON search view as the user types.
+
+    Used instead of a <select>, which would list every row of the table.
+    `url_name` names the search view, `results` the list of matches in its
+    response and `value` the field of a match to fill in.  The suggestions
+    go into a <datalist> rendered after the box (see autocomplete.js).
+    '''
+
+    class Media:
+        js = ('autocomplete.js', )
+
+    def __init__(self, url_name, results, value, attrs=None):
+        final_attrs = {
+            'class': 'autocomplete',
+            'autocomplete': 'off',
+            'data-url': reverse_lazy(url_name),
+            'data-results': results,
+            'data-value': value,
+        }
+        final_attrs.update(attrs or {})
+        super(AutocompleteInput, self).__init__(final_attrs)
+
+    def render(self, name, value, attrs=None):
+        attrs = dict(attrs or {})
+        attrs['list'] = '{0}-choices'.format(attrs.get('id', name))
+        return format_html('{0}<datalist id="{1}"></datalist>',
+                           super(AutocompleteInput, self).render(
+                               name, value, attrs),
+                           attrs['list'])
+
+
+class EventChoiceField(forms.ModelChoiceField):
+    '''Pick an event by its slug, or by its ID if it has no slug yet.'''
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('widget',
+                          AutocompleteInput('event_search', 'events', 'ident'))
+        super(EventChoiceField, self).__init__(Event.objects.all(), **kwargs)
+
+    def prepare_value(self, value):
+        if isinstance(value, Event):
+            return value.get_ident()
+        return super(EventChoiceField, self).prepare_value(value)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return Event.get_by_ident(str(value).strip())
+        except (ObjectDoesNotExist, MultipleObjectsReturned):
+            raise forms.ValidationError(self.error_messages['invalid_choice'],
+                                        code='invalid_choice')
+
+
+class AutocompleteModelForm(forms.ModelForm):
+    '''Model form whose text boxes with autocompletion show the related
+    object's username, code etc., not its ID.'''
+
+    def __init__(self, *args, **kwargs):
+        super(AutocompleteModelForm, self).__init__(*args, **kwargs)
+        if self.instance.pk is not None:
+            for (name, field) in self.fields.items():
+                if isinstance(field.widget, AutocompleteInput):
+                    self.initial[name] = getattr(self.instance, name)
+
+
 class InstructorsForm(forms.Form):
     '''Represent instructor matching form.'''
 
@@ -19,16 +92,18 @@ class InstructorsForm(forms.Form):
                                  min_value=-180.0,
                                  max_value=180.0,
                                  required=False)
-    airport = forms.ModelChoiceField(label='airport',
-                                     queryset=Airport.objects.all(),
-                                     to_field_name='iata',
-                                     required=False)
+    # the code typed in is still checked against the database
+    airport = forms.ModelChoiceField(
+        label='airport',
+        queryset=Airport.objects.all(),
+        to_field_name='iata',
+        required=False,
+        widget=AutocompleteInput('airport_search', 'airports', 'iata'))
 
     def __init__(self, *args, **kwargs):
         '''Build checkboxes for skills dynamically.'''
         super(InstructorsForm, self).__init__(*args, **kwargs)
-        skills = Skill.objects.all()
-        for s in skills:
+        for s in skills.all():
             self.fields[s.name] = forms.BooleanField(label=s.name, required=False)
 
     def clean(self):
@@ -75,7 +150,140 @@ class SearchForm(forms.Form):
 class DebriefForm(forms.Form):
     '''Represent general debrief form.'''
 
-    begin_date = forms.CharField(label='Begin date as YYYY-MM-DD',
-                           max_length=10)
-    end_date = forms.CharField(label='End date as YYYY-MD-DD',
-                           max_length=10)
+    begin_date = forms.DateField(label='Begin date as YYYY-MM-DD',
+                                 input_formats=['%Y-%m-%d'])
+    end_date = forms.DateField(label='End date as YYYY-MM-DD',
+                               input_formats=['%Y-%m-%d'])
+
+    def clean(self):
+        cleaned_data = super(DebriefForm, self).clean()
+        begin = cleaned_data.get('begin_date')
+        end = cleaned_data.get('end_date')
+        if begin is not None and end is not None and begin > end:
+            raise forms.ValidationError(
+                'The begin date must not be after the end date')
+        return cleaned_data
+
+
+class TaskForm(AutocompleteModelForm):
+    '''Represent a task, with its event and person picked by
+    autocompletion.'''
+
+    event = EventChoiceField(label='Event')
+    person = forms.ModelChoiceField(
+        label='Person',
+        queryset=Person.objects.all(),
+        to_field_name='username',
+        widget=AutocompleteInput('person_search', 'persons', 'username'))
+
+    class Meta:
+        model = Task
+        fields = ['event', 'person', 'role']
+
+
+class EventForm(AutocompleteModelForm):
+    '''Represent an event, with its sites picked by autocompletion.'''
+
+    site = forms.ModelChoiceField(
+        label='Site',
+        queryset=Site.objects.all(),
+        to_field_name='domain',
+        widget=AutocompleteInput('site_search', 'sites', 'domain'))
+    organizer = forms.ModelChoiceField(
+        label='Organizer',
+        queryset=Site.objects.all(),
+        to_field_name='domain',
+        required=False,
+        widget=AutocompleteInput('site_search', 'sites', 'domain'))
+
+    class Meta:
+        model = Event
+        fields = '__all__'
+
+
+class PersonForm(AutocompleteModelForm):
+    '''Represent a person, with their airport picked by autocompletion.'''
+
+    airport = forms.ModelChoiceField(
+        label='Airport',
+        queryset=Airport.objects.all(),
+        to_field_name='iata',
+        required=False,
+        widget=AutocompleteInput('airport_search', 'airports', 'iata'))
+
+    class Meta:
+        model = Person
+        # passwords are set in the admin, which never shows them
+        fields = [field.name for field in Person._meta.fields
+                  if field.editable and field.name != 'password'] + \
+                 ['user_permissions']
+
+    def __init__(self, *args, **kwargs):
+        super(PersonForm, self).__init__(*args, **kwargs)
+        # each permission's label names its content type
+        self.fields['user_permissions'].queryset = \
+            Permission.objects.select_related('content_type')
+
+    def save(self, commit=True):
+        person = super(PersonForm, self).save(commit=False)
+        if person.pk is None:
+            person.set_unusable_password()
+        if commit:
+            person.save()
+            self.save_m2m()
+        return person
+
+
+class PersonCreationForm(forms.ModelForm):
+    '''Add a person in the admin, with an optional password.'''
+
+    password1 = forms.CharField(label='Password', required=False,
+                                widget=forms.PasswordInput)
+    password2 = forms.CharField(label='Password confirmation', required=False,
+                                widget=forms.PasswordInput,
+                                help_text='Leave both empty for people who '
+                                          'will not log in.')
+
+    class Meta:
+        model = Person
+        fields = ('username', 'personal', 'family', 'email')
+
+    def clean_password2(self):
+        password1 = self.cleaned_data.get('password1')
+        password2 = self.cleaned_data.get('password2')
+        if password1 != password2:
+            raise forms.ValidationError('The two passwords didn\'t match.',
+                                        code='password_mismatch')
+        return password2
+
+    def save(self, commit=True):
+        person = super(PersonCreationForm, self).save(commit=False)
+        # an empty password makes an unusable one
+        person.set_password(self.cleaned_data['password1'] or None)
+        if commit:
+            person.save()
+        return person
+
+
+class PersonChangeForm(forms.ModelForm):
+    '''Change a person in the admin, showing only their password's hash.'''
+
+    password = ReadOnlyPasswordHashField(
+        label='Password',
+        help_text='Raw passwords are not stored, so there is no way to see '
+                  'this person\'s password, but you can change it using '
+                  '<a href="password/">this form</a>.')
+
+    class Meta:
+        model = Person
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        super(PersonChangeForm, self).__init__(*args, **kwargs)
+        # each permission's label names its content type
+        self.fields['user_permissions'].queryset = \
+            Permission.objects.select_related('content_type')
+
+    def clean_password(self):
+        # whatever was posted, keep the stored hash
+        return self.initial['password']
@@ -0,0 +1,354 @@
+'''Background jobs.
+
+Slow operations (bulk uploads, merges, event validation, exports) are not
+run inside the request.  The view calls `enqueue()`, which stores a `Job`
+row, and returns at once; `manage.py run_jobs` claims queued jobs and runs
+them in a pool of threads or processes.  Job functions are registered with
+`@job(name)`; they take the job's (JSON) arguments as keyword arguments and
+return a JSON-serializable result, which may include a 'message' for the
+user.
+
+A job that raises is retried, after an increasing delay, until it has been
+attempted `max_attempts` times.  Raise `PermanentFailure` for failures
+that retrying cannot fix.  Each attempt runs in a transaction, so a failed
+attempt leaves nothing half done.
+
+With `settings.JOBS_EAGER` set (as in the tests), `enqueue()` runs the job
+itself before returning.
+
+Jobs started by links (GET requests) use `enqueue_once()`, so reloading
+the page does not queue the same work again.  Finished jobs are deleted by
+`prune()` (see `manage.py prune_jobs`).
+'''
+
+import datetime
+import json
+import logging
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait)
+
+import requests
+from django.conf import settings
+from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from workshops import distances
+from workshops.check import check_file
+from workshops.models import (
+    Airport, Badge, Event, InstructorCandidate, Job, Person, StagedUpload)
+from workshops.util import (
+    create_uploaded_persons_tasks, merge_model_objects,
+    verify_upload_person_task, InternalError)
+
+logger = logging.getLogger('workshops.jobs')
+
+#------------------------------------------------------------
+
+JobType = namedtuple('JobType', ['func', 'max_attempts', 'template'])
+
+JOBS = {}
+
+
+class PermanentFailure(Exception):
+    '''Raised by job functions when retrying would not help.'''
+    pass
+
+
+def job(name, max_attempts=1, template=None):
+    '''Register a job function under `name`.
+
+    `template` (optional) renders the job's result on its status page.
+    '''
+    def register(func):
+        JOBS[name] = JobType(func, max_attempts, template)
+        return func
+    return register
+
+
+def enqueue(kind, person=None, **arguments):
+    '''Queue a job of the given kind; return the `Job`.'''
+    job = Job.objects.create(kind=kind, person=person,
+                             arguments=_encode(arguments),
+                             max_attempts=JOBS[kind].max_attempts)
+    if getattr(settings, 'JOBS_EAGER', False):
+        # retry at once rather than after a delay
+        while _claim(job.id):
+            job = run(Job.objects.get(id=job.id))
+    return job
+
+
+def enqueue_once(kind, person=None, **arguments):
+    '''Like `enqueue()`, but return an existing job of the same kind and
+    arguments instead, if one is queued, running or finished successfully
+    less than `settings.JOBS_REUSE_AGE` seconds ago.'''
+    recent = timezone.now() - datetime.timedelta(
+        seconds=getattr(settings, 'JOBS_REUSE_AGE', 5 * 60))
+    found = Job.objects.filter(kind=kind, arguments=_encode(arguments)) \
+                       .filter(Q(status__in=[Job.QUEUED, Job.RUNNING]) |
+                               Q(status=Job.DONE, finished__gte=recent)) \
+                       .order_by('-id')[:1]
+    if found:
+        return found[0]
+    return enqueue(kind, person=person, **arguments)
+
+
+def _encode(arguments):
+    # sorted, so that equal arguments are stored as equal text
+    return json.dumps(arguments, sort_keys=True)
+
+#------------------------------------------------------------
+
+
+def _claim(job_id):
+    '''Mark a queued job as running; return False if someone beat us.'''
+    return Job.objects.filter(id=job_id, status=Job.QUEUED) \
+                      .update(status=Job.RUNNING, started=timezone.now(),
+                              attempts=F('attempts') + 1) == 1
+
+
+def claim_next():
+    '''Claim the next job that is due, or return None.
+
+    Claiming is a conditional UPDATE, so several workers (even on several
+    machines) can share a queue without locking rows.
+    '''
+    due = Job.objects.filter(status=Job.QUEUED,
+                             run_after__lte=timezone.now()) \
+                     .order_by('run_after', 'id') \
+                     .values_list('id', flat=True)
+    for job_id in due[:10]:
+        if _claim(job_id):
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def retry_delay(attempts):
+    '''Seconds to wait before the next attempt (doubling each time).'''
+    return getattr(settings, 'JOBS_RETRY_DELAY', 60) * 2 ** (attempts - 1)
+
+
+def run(job):
+    '''Run a claimed job and record the outcome; return the job.'''
+    job_type = JOBS.get(job.kind)
+    try:
+        if job_type is None:
+            raise PermanentFailure('Unknown kind of job: {0}'
+                                   .format(job.kind))
+        with transaction.atomic():
+            result = job_type.func(**job.get_arguments())
+    except Exception as e:
+        now = timezone.now()
+        job.crashed = not isinstance(e, PermanentFailure)
+        # a crash is logged with its traceback
+        job.error = traceback.format_exc() if job.crashed else str(e)
+        if isinstance(e, PermanentFailure) or \
+           job.attempts >= job.max_attempts:
+            job.status, job.finished = Job.FAILED, now
+            logger.error('Job %s failed: %s', job.id, e,
+                         exc_info=job.crashed)
+        else:
+            job.status = Job.QUEUED
+            job.run_after = now + datetime.timedelta(
+                seconds=retry_delay(job.attempts))
+            logger.warning('Job %s failed, will retry: %s', job.id, e,
+                           exc_info=job.crashed)
+    else:
+        job.status, job.finished = Job.DONE, timezone.now()
+        job.result = json.dumps(result)
+        job.error, job.crashed = '', False
+    job.save(update_fields=['status', 'finished', 'run_after', 'result',
+                            'error', 'crashed'])
+    return job
+
+
+def requeue_stale(timeout):
+    '''Requeue jobs left running for longer than `timeout` seconds.
+
+    These were claimed by workers that died.  Jobs that have no attempts
+    left fail instead.
+    '''
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        started__lt=timezone.now() - datetime.timedelta(seconds=timeout))
+    stale.filter(attempts__gte=F('max_attempts')) \
+         .update(status=Job.FAILED, finished=timezone.now(),
+                 error='The worker running this job stopped.',
+                 crashed=False)
+    return stale.update(status=Job.QUEUED)
+
+
+def prune(max_age):
+    '''Delete jobs that finished more than `max_age` seconds ago; return
+    how many.'''
+    old = Job.objects.filter(
+        status__in=[Job.DONE, Job.FAILED],
+        finished__lt=timezone.now() - datetime.timedelta(seconds=max_age))
+    count = old.count()
+    old.delete()
+    return count
+
+#------------------------------------------------------------
+
+
+def _execute(job_id):
+    try:
+        run(Job.objects.get(id=job_id))
+    finally:
+        # threads and processes each have their own connection
+        connection.close()
+
+
+def work(workers=1, mode='thread', once=False, poll=1.0):
+    '''Run queued jobs until interrupted (or, with `once`, until idle).
+
+    `mode` is 'thread' or 'process' for a pool of `workers` threads or
+    processes, or 'inline' to run jobs one at a time in this thread.
+    '''
+    requeue_stale(getattr(settings, 'JOBS_TIMEOUT', 60 * 60))
+    if mode == 'inline':
+        while True:
+            job = claim_next()
+            if job is not None:
+                run(job)
+            elif once:
+                return
+            else:
+                time.sleep(poll)
+
+    if mode == 'process':
+        # Start all processes now, so none inherits an open connection.
+        connection.close()
+        pool = ProcessPoolExecutor(max_workers=workers)
+        pool.submit(int).result()
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+    with pool:
+        running = set()
+        while True:
+            running = {f for f in running if not f.done()}
+            if len(running) < workers:
+                job = claim_next()
+                if job is not None:
+                    running.add(pool.submit(_execute, job.id))
+                    continue
+                if once and not running:
+                    return
+            if running:
+                wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+            else:
+                time.sleep(poll)
+
+#------------------------------------------------------------
+# Jobs.
+
+
+@job('bulk_upload')
+def bulk_upload(person_id, token):
+    '''Save staged bulk upload data.'''
+    data = StagedUpload.objects.load(person_id, token)
+    if data is None:
+        raise PermanentFailure('Could not locate upload data.')
+    if verify_upload_person_task(data):
+        raise PermanentFailure('The upload contains errors; please upload '
+                               'it again and fix them.')
+    try:
+        persons_created, tasks_created = create_uploaded_persons_tasks(data)
+    except (IntegrityError, ObjectDoesNotExist, MultipleObjectsReturned,
+            InternalError) as e:
+        raise PermanentFailure('Error saving data to the database: {0}'
+                               .format(e))
+    StagedUpload.objects.discard(person_id, token)
+    return {'persons': len(persons_created),
+            'tasks': len(tasks_created),
+            'message': 'Successfully uploaded {0} persons and {1} tasks.'
+                       .format(len(persons_created), len(tasks_created))}
+
+
+@job('merge_persons')
+def merge_persons(groups):
+    '''Merge duplicate people; `groups` lists (primary ID, [alias IDs]).'''
+    for (primary_id, alias_ids) in groups:
+        try:
+            primary = Person.objects.get(id=primary_id)
+            aliases = list(Person.objects.filter(id__in=alias_ids))
+            merge_model_objects(primary, aliases)
+        except (TypeError, Person.DoesNotExist) as e:
+            raise PermanentFailure('Merge failed, nothing was changed: {0}'
+                                   .format(e))
+    return {'message': 'Merge success'}
+
+
+@job('validate_event', max_attempts=3,
+     template='workshops/job_validate_event.html')
+def validate_event(event_id, url=None):
+    '''Check the event's home page *or* the specified URL.'''
+    event = Event.objects.get(id=event_id)
+    page_url, error_messages = None, []
+    github_url = event.url if url is None else url
+    if github_url is not None:
+        page_url = github_url.replace('github.com', 'raw.githubusercontent.com').rstrip('/') + '/gh-pages/index.html'
+        response = requests.get(page_url)
+        if response.status_code != 200:
+            error_messages.append('Request for {0} returned status code {1}'.format(page_url, response.status_code))
+        else:
+            valid, error_messages = check_file(page_url, response.text)
+    return {'event': event.get_ident(),
+            'page': page_url,
+            'error_messages': error_messages}
+
+
+@job('refresh_candidates')
+def refresh_candidates(event_id):
+    '''Recompute the instructor candidates of one event.'''
+    event = Event.objects.get(id=event_id)
+    count = InstructorCandidate.objects.refresh(event)
+    return {'message': 'Found {0} instructor candidates for {1}.'
+                       .format(count, event)}
+
+
+@job('build_airport_distances')
+def build_airport_distances():
+    '''Rebuild the precomputed distances between airports.'''
+    count = distances.build()
+    return {'message': 'Computed distances between {0} airports.'
+                       .format(count)}
+
+
+def _export_badges():
+    '''Collect badge data as YAML.'''
+    result = {}
+    for badge in Badge.objects.all():
+        persons = Person.objects.filter(award__badge_id=badge.id)
+        result[badge.name] = [
+            {"user": p.username, "name": p.get_full_name()} for p in persons
+        ]
+    return result
+
+
+def _export_instructors():
+    '''Collect instructor airport locations as YAML.'''
+    # Exclude airports with no instructors, and add the number of instructors per airport
+    airports = Airport.objects.exclude(person=None).annotate(num_persons=Count('person'))
+    return [{'airport' : str(a.fullname),
+             'latlng' : '{0},{1}'.format(a.latitude, a.longitude),
+             'count'  : a.num_persons}
+            for a in airports]
+
+
+EXPORTS = {
+    'badges': ('Badges', _export_badges),
+    'instructors': ('Instructor Locations', _export_instructors),
+}
+
+
+@job('export', template='workshops/job_export.html')
+def export(name):
+    '''Export data for inclusion in main web site.'''
+    title, collect = EXPORTS[name]
+    return {'title': title, 'data': collect()}
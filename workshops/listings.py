@@ -0,0 +1,170 @@
+'''Listings shown in full ("items_per_page=all"), streamed to the browser.
+
+A page of a listing holds a few dozen model instances, but showing every
+person or task at once would build hundreds of thousands of them, each
+with its `_state` and every field, before the first byte is sent.
+Instead, the rows are read with `values_list()` straight from a database
+cursor, CHUNK_ROWS at a time, turned into small `Row` records (with
+`__slots__`, and borrowing the model methods the templates use), and each
+chunk is rendered and sent before the next is read.  Memory use depends
+on the chunk size, not on the size of the table.
+
+The page template renders a `StreamedRows` as a marker where the rows go;
+`render` splits the page there and sends the rows in between.
+'''
+
+from django.db import connections
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import render as render_page
+from django.template import Context, RequestContext
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+from workshops.models import Event, Person, Role, Task
+
+CHUNK_ROWS = 500        # rows read and rendered at a time
+MARKER = '<!-- listing rows -->'
+
+
+class Row(object):
+    '''Lightweight, read-only stand-in for a model instance.'''
+
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for (name, value) in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+
+class PersonRow(Row):
+    __slots__ = ('id', 'username', 'personal', 'middle', 'family', 'email')
+
+    get_full_name = Person.get_full_name
+    get_absolute_url = Person.get_absolute_url
+    __str__ = Person.__str__
+
+
+class EventRow(Row):
+    __slots__ = ('id', 'slug')
+
+    get_ident = Event.get_ident
+    get_absolute_url = Event.get_absolute_url
+    __str__ = Event.__str__
+
+
+class RoleRow(Row):
+    __slots__ = ('id', 'name')
+
+    __str__ = Role.__str__
+
+
+class TaskRow(Row):
+    __slots__ = ('id', 'event', 'person', 'role')
+
+    get_absolute_url = Task.get_absolute_url
+    __str__ = Task.__str__
+
+
+def _prefixed(prefix, fields):
+    return tuple('{0}__{1}'.format(prefix, f) for f in fields)
+
+
+def _task_row(values):
+    event_end = 1 + len(EventRow.__slots__)
+    person_end = event_end + len(PersonRow.__slots__)
+    return TaskRow(values[0],
+                   EventRow(*values[1:event_end]),
+                   PersonRow(*values[event_end:person_end]),
+                   RoleRow(*values[person_end:]))
+
+
+class Listing(object):
+    '''How to read and render the rows of one kind of listing.
+
+    `fields` are passed to `values_list()`, `make_row` turns one tuple of
+    values into a row, and `template` renders a list of rows (as `rows`).
+    '''
+
+    def __init__(self, fields, make_row, template):
+        self.fields = fields
+        self.make_row = make_row
+        self.template = template
+
+
+PERSONS = Listing(PersonRow.__slots__,
+                  lambda values: PersonRow(*values),
+                  'workshops/_person_rows.html')
+
+TASKS = Listing(('id', ) +
+                _prefixed('event', EventRow.__slots__) +
+                _prefixed('person', PersonRow.__slots__) +
+                _prefixed('role', RoleRow.__slots__),
+                _task_row,
+                'workshops/_task_rows.html')
+
+
+def _fetch(queryset, size):
+    '''Yield lists of up to `size` value tuples of `queryset`.
+
+    Django reads all results of a query up front when the database
+    backend can't fetch them in chunks (SQLite), so the query is run on a
+    cursor directly.
+    '''
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    cursor = connections[queryset.db].cursor()
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+class StreamedRows(object):
+    '''All rows of a listing, rendered while the response is sent.'''
+
+    streamed = True
+
+    def __init__(self, listing, queryset):
+        self.listing = listing
+        self.queryset = queryset
+
+    def __bool__(self):
+        return self.queryset.exists()
+
+    def __str__(self):
+        return mark_safe(MARKER)
+
+    def chunks(self):
+        '''Yield the rendered rows, a chunk at a time.'''
+        template = get_template(self.listing.template)
+        make_row = self.listing.make_row
+        values = self.queryset.values_list(*self.listing.fields)
+        for block in _fetch(values, CHUNK_ROWS):
+            yield template.render(Context(
+                {'rows': [make_row(v) for v in block]}))
+
+
+def render(request, template, context):
+    '''Like django.shortcuts.render, but streams the rows of a
+    `StreamedRows` in `context`.'''
+    streamed = [v for v in context.values() if isinstance(v, StreamedRows)]
+    if not streamed:
+        return render_page(request, template, context)
+
+    page = render_to_string(template, context,
+                            context_instance=RequestContext(request))
+    if MARKER not in page:      # nothing to list
+        return HttpResponse(page)
+    (head, tail) = page.split(MARKER, 1)
+
+    def content():
+        yield head
+        for rows in streamed[0].chunks():
+            yield rows
+        yield tail
+
+    return StreamingHttpResponse(content())
@@ -0,0 +1,320 @@
+'''Process-local cache of small reference tables.
+
+Roles, tags, skills and badges are tiny and almost never change, but are
+looked up by name all the time (e.g. "instructor").  Each table is loaded
+once per process and indexed by name and by ID; code can then filter on a
+cached primary key instead of joining on the name column.
+
+Airports are not tiny, but are only ever looked up by code or searched by
+prefix, so `airports` keeps them in memory too, with a sorted index for
+autocompletion.  `qualifications` keeps each person's skills as a bitmask,
+so people with a given combination of skills are found in one pass.
+`persons` indexes the trigrams of everyone's names, email and GitHub
+handle, so misspelled names still find people.
+
+Signal receivers call `invalidate()` when rows change.  So that other
+processes notice too, every table also has a version token in the shared
+Django cache, checked on each lookup.
+'''
+
+import array
+import bisect
+import collections
+import functools
+import heapq
+import itertools
+import operator
+import re
+import uuid
+
+from django.core.cache import cache
+
+from workshops.listings import PersonRow
+from workshops.models import (
+    Airport, Badge, Person, Qualification, Role, Skill, Tag)
+
+
+class VersionedIndex(object):
+    '''In-memory index over the rows of a model, rebuilt when they change.
+
+    Subclasses say which rows to load (`_rows()`) and how to index them
+    (`_build()`), which must set `_all`.
+    '''
+
+    def __init__(self, model, name=None):
+        self.model = model
+        self.version_key = 'lookups-version-{0}'.format(
+            name or model.__name__)
+        self._version = None
+        self._all = None
+
+    def _current_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(self.version_key, version, timeout=None):
+                version = cache.get(self.version_key, version)
+        return version
+
+    def _rows(self):
+        return list(self.model.objects.order_by('id'))
+
+    def _load(self, force=False):
+        version = self._current_version()
+        if force or self._all is None or version != self._version:
+            self._build(self._rows())
+            self._version = version
+
+    def _build(self, rows):
+        raise NotImplementedError
+
+    def invalidate(self, **kwargs):
+        '''Forget the cached index (in all processes).
+
+        The signature matches Django signal receivers.
+        '''
+        cache.set(self.version_key, uuid.uuid4().hex, timeout=None)
+        self._all = None
+
+
+class ReferenceCache(VersionedIndex):
+    '''Name and ID index over all rows of a small model.'''
+
+    def __init__(self, model, name_field='name'):
+        super(ReferenceCache, self).__init__(model)
+        self.name_field = name_field
+        self._by_id = None
+        self._by_name = None
+        # (name, id) of lookups that missed after a reload of this version
+        self._missing = set()
+
+    def _build(self, rows):
+        self._missing = set()
+        self._by_name = {}
+        for row in rows:
+            self._by_name.setdefault(getattr(row, self.name_field),
+                                     []).append(row)
+        self._by_id = {row.id: row for row in rows}
+        self._all = rows
+
+    def all(self):
+        '''Return all rows, in ID order.'''
+        self._load()
+        return list(self._all)
+
+    def _lookup(self, name, id):
+        if id is not None:
+            return [self._by_id[id]] if id in self._by_id else []
+        return self._by_name.get(name, [])
+
+    def _find(self, name, id):
+        # A miss reloads the table once per version, in case the row was
+        # added by a process whose invalidation we could not see.
+        self._load()
+        found = self._lookup(name, id)
+        if not found and (name, id) not in self._missing:
+            self._load(force=True)
+            found = self._lookup(name, id)
+            if not found:
+                self._missing.add((name, id))
+        return found
+
+    def get(self, name=None, id=None):
+        '''Return the row with the given name or ID.
+
+        Raises the model's DoesNotExist or MultipleObjectsReturned just like
+        `Model.objects.get()`.
+        '''
+        found = self._find(name, id)
+        if not found:
+            raise self.model.DoesNotExist(
+                '{0} matching {1} does not exist'.format(
+                    self.model.__name__, name if id is None else id))
+        if len(found) > 1:
+            raise self.model.MultipleObjectsReturned(
+                'More than one {0} named {1}'.format(self.model.__name__,
+                                                     name))
+        return found[0]
+
+    def ids(self, name):
+        '''Return the IDs of all rows called `name` (usually just one).
+
+        Use as `filter(role__in=roles.ids('instructor'))`: the result is
+        the same as filtering on the name, without joining on it.  An empty
+        list matches nothing, as a missing name would have.
+        '''
+        return [row.id for row in self._find(name, None)]
+
+
+class AirportIndex(ReferenceCache):
+    '''Airports by IATA code, with prefix search on code and name.'''
+
+    def __init__(self):
+        super(AirportIndex, self).__init__(Airport, name_field='iata')
+
+    def _build(self, rows):
+        super(AirportIndex, self)._build(rows)
+        # sorted (key, position) pairs, searched with bisect
+        self._by_code = sorted((row.iata.lower(), i)
+                               for (i, row) in enumerate(rows))
+        self._by_fullname = sorted((row.fullname.lower(), i)
+                                   for (i, row) in enumerate(rows))
+
+    def _prefixed(self, index, prefix):
+        for pos in range(bisect.bisect_left(index, (prefix, )), len(index)):
+            (key, i) = index[pos]
+            if not key.startswith(prefix):
+                break
+            yield self._all[i]
+
+    def search(self, prefix, limit=10):
+        '''Return up to `limit` airports whose code or name starts with
+        `prefix` (ignoring case); code matches come first.'''
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        self._load()
+        found = []
+        for airport in itertools.chain(
+                self._prefixed(self._by_code, prefix),
+                self._prefixed(self._by_fullname, prefix)):
+            if len(found) == limit:
+                break
+            if airport not in found:
+                found.append(airport)
+        return found
+
+
+class QualificationIndex(VersionedIndex):
+    '''Skills of every qualified person as a bitmask.
+
+    Bit N of a mask stands for the skill with ID N; skill IDs are small, so
+    masks are too.
+    '''
+
+    def __init__(self):
+        super(QualificationIndex, self).__init__(Qualification)
+
+    def _rows(self):
+        return list(Qualification.objects.order_by('person', 'skill')
+                                         .values_list('person', 'skill'))
+
+    def _build(self, rows):
+        masks = {}
+        for (person_id, skill_id) in rows:
+            masks[person_id] = masks.get(person_id, 0) | (1 << skill_id)
+        self._person_ids = sorted(masks)
+        self._masks = [masks[p] for p in self._person_ids]
+        self._all = rows
+
+    @staticmethod
+    def mask(skills):
+        '''Return the mask of the given skills (objects or IDs).'''
+        return functools.reduce(
+            operator.or_,
+            (1 << getattr(s, 'id', s) for s in skills), 0)
+
+    def person_ids(self, skills):
+        '''Return the set of IDs of people qualified in all of `skills`.
+
+        With no skills, that is everyone with at least one qualification.
+        '''
+        wanted = self.mask(skills)
+        self._load()
+        return {person_id
+                for (person_id, mask) in zip(self._person_ids, self._masks)
+                if mask & wanted == wanted}
+
+
+WORD = re.compile(r'\w+')
+
+
+def trigrams(text):
+    '''Return the set of trigrams of the words in `text`, ignoring case.
+
+    As in PostgreSQL's pg_trgm, words are padded with two spaces in front
+    (and at least one behind), so that beginnings of words weigh more.
+    '''
+    padded = '  {0} '.format('  '.join(WORD.findall(text.lower())))
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PersonIndex(VersionedIndex):
+    '''Trigram index over persons' names, email and GitHub handle.
+
+    Each trigram maps to the (sorted) positions of the people whose text
+    contains it.  A search counts, for every person, how many of the
+    query's trigrams they share, so a typo only costs the few trigrams it
+    touches.
+    '''
+
+    # Loaded for each person (the fields of PersonRow, then GitHub); a
+    # person's other fields can change without a rebuild.
+    FIELDS = ('id', 'username', 'personal', 'middle', 'family', 'email',
+              'github')
+    SEARCHED = ('personal', 'family', 'email', 'github')
+    MIN_SIMILARITY = 0.4    # share of the query's trigrams a match must have
+    COMMON = 0.05           # trigrams of a larger share of people ...
+    COMMON_MIN = 100        # ... (and of more people than this) are skipped
+
+    def __init__(self):
+        super(PersonIndex, self).__init__(Person)
+
+    def _rows(self):
+        return list(Person.objects.order_by('id').values_list(*self.FIELDS))
+
+    def _build(self, rows):
+        searched = [self.FIELDS.index(f) for f in self.SEARCHED]
+        postings = collections.defaultdict(list)
+        sizes = array.array('I')
+        for (position, row) in enumerate(rows):
+            found = trigrams(' '.join(row[i] for i in searched if row[i]))
+            for trigram in found:
+                postings[trigram].append(position)
+            sizes.append(len(found))
+        self._postings = {trigram: array.array('I', positions)
+                          for (trigram, positions) in postings.items()}
+        self._sizes = sizes
+        self._all = rows
+
+    def search(self, term, limit=10):
+        '''Return up to `limit` persons matching `term`, best first.
+
+        Persons are returned as `listings.PersonRow` records.  The more of
+        the query's trigrams someone shares, the better the match; among
+        equal matches, people with less text (so a larger share of it
+        matching) come first.  Trigrams most people have (such as those of
+        "example.org") say little and take long to count, so they are
+        skipped unless there is nothing else to go on.
+        '''
+        wanted = trigrams(term)
+        if not wanted:
+            return []
+        self._load()
+        known = [self._postings[trigram] for trigram in wanted
+                 if trigram in self._postings]
+        common = max(self.COMMON * len(self._all), self.COMMON_MIN)
+        counted = [p for p in known if len(p) <= common] or known
+        shared = collections.Counter()
+        for positions in counted:
+            shared.update(positions)
+        # trigrams nobody has (typos) still count as misses
+        least = self.MIN_SIMILARITY * \
+            (len(counted) + len(wanted) - len(known))
+        best = heapq.nsmallest(
+            limit,
+            ((-count, self._sizes[position], position)
+             for (position, count) in shared.items() if count >= least))
+        return [PersonRow(*self._all[position][:-1])
+                for (_, _, position) in best]
+
+
+roles = ReferenceCache(Role)
+tags = ReferenceCache(Tag)
+skills = ReferenceCache(Skill)
+badges = ReferenceCache(Badge)
+airports = AirportIndex()
+qualifications = QualificationIndex()
+persons = PersonIndex()
+
+ALL = (roles, tags, skills, badges, airports, qualifications)
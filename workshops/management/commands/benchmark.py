@@ -0,0 +1,68 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from workshops.benchmark import data, timing
+
+class Command(BaseCommand):
+    args = '[benchmark_name ...]'
+    help = ('Generate synthetic data in a throw-away test database and time '
+            'the main application paths (all benchmarks if none named).')
+
+    option_list = BaseCommand.option_list + tuple(
+        make_option('--{0}'.format(table), type='int', default=size,
+                    help='Number of {0} (default {1})'.format(table, size))
+        for (table, size) in data.SIZES.items()
+    ) + (
+        make_option('--scale', type='float', default=1.0,
+                    help='Multiply all table sizes, e.g. 0.01 for a quick run'),
+        make_option('--notes', type='int', default=1,
+                    help='Paragraphs of notes per site and event'),
+        make_option('--repeat', type='int', default=3,
+                    help='Number of timed runs per benchmark'),
+        make_option('--seed', type='int', default=0),
+        make_option('--history', default='benchmark-history.json',
+                    help='JSON file to append results to ("" for none)'),
+    )
+
+    def handle(self, *args, **options):
+        unknown = [n for n in args if n not in timing.BENCHMARKS]
+        if unknown:
+            raise CommandError('Unknown benchmark(s): {0} (choose from {1})'
+                               .format(', '.join(unknown),
+                                       ', '.join(timing.BENCHMARKS)))
+
+        sizes = data.scaled({t: options[t] for t in data.SIZES},
+                            options['scale'])
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        try:
+            print('Generating {0}'.format(', '.join(
+                '{0} {1}'.format(n, t) for (t, n) in sorted(sizes.items()))))
+            data.generate(sizes, seed=options['seed'], notes=options['notes'])
+            print('{0:20} {1:>10} {2:>10} {3:>10}'
+                  .format('benchmark', 'min ms', 'median ms', 'max ms'))
+            results = timing.run(
+                args, repeat=options['repeat'],
+                report=lambda name, r: print(
+                    '{0:20} {1[min]:10.1f} {1[median]:10.1f} {1[max]:10.1f}'
+                    .format(name, r)))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        entry = timing.make_entry(sizes, results)
+        if options['history']:
+            history = timing.load_history(options['history'])
+            if history:
+                print('\nCompared with {0} ({1}):'.format(
+                    history[-1]['commit'], history[-1]['date']))
+                for (name, before, after, ratio) in \
+                        timing.compare(history[-1], entry):
+                    print('{0:20} {1:10.1f} -> {2:10.1f} ms  x{3:.2f}'
+                          .format(name, before, after, ratio or 0))
+            history.append(entry)
+            timing.save_history(options['history'], history)
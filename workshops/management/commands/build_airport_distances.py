@@ -0,0 +1,27 @@
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from workshops import distances
+
+class Command(BaseCommand):
+    args = 'no arguments'
+    help = 'Precompute the distances between all airports (needs numpy).'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--output', default=None,
+                    help='File to write (default settings.AIRPORT_DISTANCES)'),
+        make_option('--spare', type='int', default=distances.SPARE_SLOTS,
+                    help='Room for airports added later (default {0})'
+                         .format(distances.SPARE_SLOTS)),
+    )
+
+    def handle(self, *args, **options):
+        if distances.numpy is None:
+            raise CommandError('numpy is not installed')
+        path = options['output'] or settings.AIRPORT_DISTANCES
+        if not path:
+            raise CommandError('No output file (set AIRPORT_DISTANCES)')
+        count = distances.build(path, spare=options['spare'])
+        print('Wrote distances between {0} airports to {1}'
+              .format(count, path))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from workshops.models import InstructorCandidate
+
+class Command(BaseCommand):
+    args = 'no arguments'
+    help = ('Rank instructor candidates for all upcoming events '
+            '(meant to be run nightly, e.g. from cron).')
+
+    def handle(self, *args, **options):
+        count = InstructorCandidate.objects.refresh_upcoming()
+        print('Ranked instructor candidates for {0} upcoming events'
+              .format(count))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from workshops.models import Qualification
+
+class Command(BaseCommand):
+    args = 'no arguments'
+    help = 'Delete repeated qualifications (the same skill for the same person).'
+
+    def handle(self, *args, **options):
+        print('Deleted {0} repeated qualifications'
+              .format(Qualification.objects.dedupe()))
@@ -0,0 +1,21 @@
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from workshops import jobs
+
+class Command(BaseCommand):
+    args = 'no arguments'
+    help = 'Delete background jobs that finished long ago.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--max-age', type='int', default=None,
+                    help='Delete jobs finished more than this many seconds '
+                         'ago (default settings.JOBS_MAX_AGE)'),
+    )
+
+    def handle(self, *args, **options):
+        max_age = options['max_age']
+        if max_age is None:
+            max_age = settings.JOBS_MAX_AGE
+        print('Deleted {0} finished jobs'.format(jobs.prune(max_age)))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from workshops.models import SiteAirport
+
+class Command(BaseCommand):
+    args = 'no arguments'
+    help = 'Recompute the nearest airports of every site.'
+
+    def handle(self, *args, **options):
+        SiteAirport.objects.rebuild()
+        print('Found nearest airports for {0} sites'
+              .format(SiteAirport.objects.values('site').distinct().count()))
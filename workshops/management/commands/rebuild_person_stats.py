@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from workshops.models import PersonStats
+
+class Command(BaseCommand):
+    args = 'no arguments'
+    help = 'Recompute the per-person teaching statistics table.'
+
+    def handle(self, *args, **options):
+        PersonStats.objects.rebuild()
+        print('Rebuilt statistics for {0} persons'
+              .format(PersonStats.objects.count()))
@@ -0,0 +1,26 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from workshops.reports import REPORTS, get_report
+
+class Command(BaseCommand):
+    args = '[report_name ...]'
+    help = 'Print statistical reports as CSV (all reports if none named).'
+
+    def handle(self, *args, **options):
+        names = args or list(REPORTS.keys())
+        unknown = [n for n in names if n not in REPORTS]
+        if unknown:
+            raise CommandError('Unknown report(s): {0} (choose from {1})'
+                               .format(', '.join(unknown),
+                                       ', '.join(REPORTS.keys())))
+
+        writer = csv.writer(sys.stdout)
+        for (i, name) in enumerate(names):
+            if i:
+                print()
+            report = REPORTS[name]
+            print(report.title)
+            writer.writerow(report.header)
+            writer.writerows(get_report(name))
@@ -0,0 +1,41 @@
+from optparse import make_option
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from workshops import jobs
+
+# Caches the web processes cannot see into: invalidations made by jobs
+# (version tokens, fragment generations) would never reach them.
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+class Command(BaseCommand):
+    args = 'no arguments'
+    help = 'Run queued background jobs until interrupted.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--workers', type='int', default=4,
+                    help='Number of jobs run at the same time (default 4)'),
+        make_option('--mode', choices=['thread', 'process', 'inline'],
+                    default='thread',
+                    help='Run jobs in a pool of threads (the default) or '
+                         'processes, or one at a time in this process'),
+        make_option('--once', action='store_true', default=False,
+                    help='Stop when no jobs are left instead of waiting'),
+        make_option('--poll', type='float', default=1.0,
+                    help='Seconds between checks for new jobs (default 1)'),
+    )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+        if isinstance(caches['default'], PROCESS_LOCAL_CACHES):
+            raise CommandError(
+                'The worker needs a cache shared with the web processes; '
+                'set AMY_CACHE to file, memcached or redis')
+        try:
+            jobs.work(workers=options['workers'], mode=options['mode'],
+                      once=options['once'], poll=options['poll'])
+        except KeyboardInterrupt:
+            pass
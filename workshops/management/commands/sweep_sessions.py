@@ -0,0 +1,24 @@
+import datetime
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from workshops.models import StagedUpload
+
+class Command(BaseCommand):
+    args = 'no arguments'
+    help = 'Delete expired sessions and abandoned bulk uploads.'
+
+    def handle(self, *args, **options):
+        engine = import_module(settings.SESSION_ENGINE)
+        try:
+            engine.SessionStore.clear_expired()
+        except NotImplementedError:
+            print('Session engine {0} cleans up after itself'
+                  .format(settings.SESSION_ENGINE))
+        else:
+            print('Deleted expired sessions')
+
+        max_age = datetime.timedelta(seconds=settings.STAGED_UPLOAD_MAX_AGE)
+        print('Deleted {0} abandoned uploads'
+              .format(StagedUpload.objects.sweep(max_age)))
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from workshops.template_warmup import warm_templates
+
+class Command(BaseCommand):
+    args = 'no arguments'
+    help = 'Compile all templates, reporting any that do not compile.'
+
+    def handle(self, *args, **options):
+        compiled, errors = warm_templates()
+        for name in sorted(errors):
+            print('{0}: {1}'.format(name, errors[name]))
+        cached = 'cached' if settings.TEMPLATE_CACHE else 'not cached'
+        print('Compiled {0} templates ({1})'.format(len(compiled), cached))
+        if errors:
+            raise CommandError('{0} templates did not compile'
+                               .format(len(errors)))
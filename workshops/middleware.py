@@ -0,0 +1,117 @@
+'''Per-request SQL profiling.
+
+`QueryProfilerMiddleware` records how many queries each request runs, how
+long they took, which queries were repeated (the tell-tale sign of an N+1
+problem) and how long the whole view took.  One JSON line per request goes
+to the "workshops.queries" logger.  Requests exceeding the per-view budget
+in `settings.QUERY_BUDGETS` are logged as warnings and, if
+`settings.QUERY_BUDGET_ENFORCE` is set, fail with `QueryBudgetExceeded`.
+
+Enable with `settings.QUERY_PROFILING` (environment: AMY_QUERY_PROFILING).
+'''
+
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger('workshops.queries')
+
+# Patterns used to turn SQL into a fingerprint by erasing literal values.
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_VALUE_LIST = re.compile(r'\((?:\s*\?\s*,)*\s*\?\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    '''Raised when a view runs more queries than its budget allows.'''
+    pass
+
+
+def fingerprint(sql):
+    '''Reduce SQL to its shape, so queries differing only in values match.'''
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _VALUE_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def get_query_budget(url_name):
+    '''Return the query budget for a named URL, or None if unlimited.'''
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return budgets.get(url_name, getattr(settings, 'QUERY_BUDGET_DEFAULT',
+                                         None))
+
+
+def profile_queries(queries):
+    '''Summarize a list of queries as recorded in `connection.queries`.'''
+    fingerprints = Counter(fingerprint(q['sql']) for q in queries)
+    return {
+        'queries': len(queries),
+        'sql_ms': round(sum(float(q['time']) for q in queries) * 1000, 1),
+        'duplicates': {sql: n for (sql, n) in fingerprints.items() if n > 1},
+    }
+
+
+class QueryProfilerMiddleware(object):
+    '''Record SQL statistics for every request.'''
+
+    def __init__(self):
+        if not getattr(settings, 'QUERY_PROFILING', False):
+            raise MiddlewareNotUsed()
+
+    def process_request(self, request):
+        # connection.queries is reset at the start of every request, but is
+        # only filled in when DEBUG is on unless we ask for it explicitly.
+        request._profiler = {
+            'debug_cursor': connection.use_debug_cursor,
+            'first_query': len(connection.queries),
+            'start': time.time(),
+            'view_start': None,
+        }
+        connection.use_debug_cursor = True
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, '_profiler'):
+            request._profiler['view_start'] = time.time()
+
+    def process_response(self, request, response):
+        state = getattr(request, '_profiler', None)
+        if state is None:
+            return response
+        del request._profiler
+        connection.use_debug_cursor = state['debug_cursor']
+
+        now = time.time()
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.url_name if match else None
+        record = {
+            'view': url_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round((now - state['start']) * 1000, 1),
+            'view_ms': round((now - (state['view_start'] or state['start']))
+                             * 1000, 1),
+        }
+        record.update(profile_queries(
+            connection.queries[state['first_query']:]))
+
+        budget = get_query_budget(url_name)
+        if budget is not None and record['queries'] > budget:
+            record['budget'] = budget
+            logger.warning(json.dumps(record, sort_keys=True))
+            if getattr(settings, 'QUERY_BUDGET_ENFORCE', False):
+                raise QueryBudgetExceeded(
+                    'View {0} ran {1} queries, budget is {2}'
+                    .format(url_name, record['queries'], budget))
+        else:
+            logger.info(json.dumps(record, sort_keys=True))
+
+        return response
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.db.models import Count, Max, Min
+from django.conf import settings
+
+
+def populate_person_stats(apps, schema_editor):
+    '''Fill PersonStats for existing people.
+
+    Historical models have no custom managers, so this mirrors
+    PersonStatsManager.rebuild().
+    '''
+    Person = apps.get_model('workshops', 'Person')
+    PersonStats = apps.get_model('workshops', 'PersonStats')
+    Task = apps.get_model('workshops', 'Task')
+    Award = apps.get_model('workshops', 'Award')
+
+    stats = {pid: PersonStats(person_id=pid)
+             for pid in Person.objects.values_list('id', flat=True)}
+
+    taught = Task.objects.filter(role__name='instructor') \
+                         .values('person') \
+                         .annotate(num=Count('id'),
+                                   first=Min('event__start'),
+                                   last=Max('event__start')) \
+                         .order_by()
+    for row in taught:
+        s = stats[row['person']]
+        s.times_taught, s.first_taught, s.last_taught = \
+            row['num'], row['first'], row['last']
+
+    helped = Task.objects.filter(role__name='helper') \
+                         .values('person') \
+                         .annotate(num=Count('id')) \
+                         .order_by()
+    for row in helped:
+        stats[row['person']].times_helped = row['num']
+
+    badges = {}
+    for (pid, name) in Award.objects.order_by('badge__name') \
+                                    .values_list('person', 'badge__name'):
+        names = badges.setdefault(pid, [])
+        if name not in names:
+            names.append(name)
+    for (pid, names) in badges.items():
+        stats[pid].badges = ', '.join(names)
+
+    PersonStats.objects.bulk_create(stats.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshops', '0004_merge'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersonStats',
+            fields=[
+                ('person', models.OneToOneField(primary_key=True, serialize=False, related_name='stats', to=settings.AUTH_USER_MODEL)),
+                ('times_taught', models.IntegerField(default=0)),
+                ('times_helped', models.IntegerField(default=0)),
+                ('first_taught', models.DateField(blank=True, null=True)),
+                ('last_taught', models.DateField(blank=True, null=True)),
+                ('badges', models.CharField(max_length=100, blank=True, default='')),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.RunPython(populate_person_stats),
+    ]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.db.models import Count, Min
+
+
+def dedupe_qualifications(apps, schema_editor):
+    '''Delete repeated (person, skill) rows before making them unique.
+
+    Historical models have no custom managers, so this mirrors
+    QualificationManager.dedupe().
+    '''
+    Qualification = apps.get_model('workshops', 'Qualification')
+    repeated = Qualification.objects.values('person', 'skill') \
+                                    .annotate(first=Min('id'),
+                                              count=Count('id')) \
+                                    .order_by() \
+                                    .filter(count__gt=1)
+    for row in repeated:
+        Qualification.objects.filter(person=row['person'],
+                                     skill=row['skill']) \
+                             .exclude(id=row['first']) \
+                             .delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshops', '0008_event_dates_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_qualifications),
+        migrations.AlterUniqueTogether(
+            name='qualification',
+            unique_together=set([('person', 'skill')]),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshops', '0009_qualification_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteAirport',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', primary_key=True, serialize=False, auto_created=True)),
+                ('rank', models.IntegerField()),
+                ('distance', models.FloatField()),
+                ('airport', models.ForeignKey(related_name='+', to='workshops.Airport')),
+                ('site', models.ForeignKey(related_name='nearest_airports', to='workshops.Site')),
+            ],
+            options={
+                'ordering': ('site', 'rank'),
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='siteairport',
+            unique_together=set([('site', 'rank')]),
+        ),
+        migrations.AddField(
+            model_name='site',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='site',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+            preserve_default=True,
+        ),
+    ]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshops', '0010_site_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstructorCandidate',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', primary_key=True, serialize=False, auto_created=True)),
+                ('rank', models.IntegerField()),
+                ('score', models.FloatField()),
+                ('distance', models.FloatField()),
+                ('recent_load', models.IntegerField()),
+                ('computed', models.DateTimeField(auto_now_add=True)),
+                ('event', models.ForeignKey(related_name='candidates', to='workshops.Event')),
+                ('person', models.ForeignKey(related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('event', 'rank'),
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='instructorcandidate',
+            unique_together=set([('event', 'rank')]),
+        ),
+    ]
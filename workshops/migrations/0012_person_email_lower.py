@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def fill_email_lower(apps, schema_editor):
+    '''Store the lowercased email of existing persons.
+
+    Lowercased in Python rather than with SQL's LOWER(), which only folds
+    ASCII letters in SQLite, so that the values match Person.normalize().
+    '''
+    Person = apps.get_model('workshops', 'Person')
+    for (person_id, email) in Person.objects.exclude(email=None) \
+                                            .values_list('id', 'email'):
+        Person.objects.filter(id=person_id) \
+                      .update(email_lower=email.lower() or None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshops', '0011_instructorcandidate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='email_lower',
+            field=models.CharField(max_length=100, blank=True, null=True, db_index=True, editable=False),
+            preserve_default=True,
+        ),
+        migrations.RunPython(fill_email_lower),
+    ]
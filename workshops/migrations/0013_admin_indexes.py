@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshops', '0012_person_email_lower'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='award',
+            name='awarded',
+            field=models.DateField(db_index=True),
+            preserve_default=True,
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='slug',
+            field=models.CharField(max_length=100, blank=True, null=True, db_index=True),
+            preserve_default=True,
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshops', '0013_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='personstats',
+            name='badges',
+            field=models.TextField(blank=True, default=''),
+            preserve_default=True,
+        ),
+    ]
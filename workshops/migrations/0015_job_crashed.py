@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def mark_crashed(apps, schema_editor):
+    '''Flag jobs whose error is a traceback, as they were told apart before.'''
+    Job = apps.get_model('workshops', 'Job')
+    Job.objects.filter(error__startswith='Traceback').update(crashed=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshops', '0014_personstats_badges_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='crashed',
+            field=models.BooleanField(default=False),
+            preserve_default=True,
+        ),
+        migrations.RunPython(mark_crashed),
+    ]
@@ -1,12 +1,17 @@
 import datetime
+import heapq
+import json
 import re
+import uuid
+import zlib
 
 from django.contrib.auth.models import (
     AbstractBaseUser, BaseUserManager, PermissionsMixin)
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.urlresolvers import reverse
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
 
 #------------------------------------------------------------
 
@@ -17,14 +22,48 @@ STR_REG_KEY =  20         # length of Eventbrite registration key
 
 #------------------------------------------------------------
 
+NOTES_PREVIEW = 40      # characters of notes shown in listings
+
+
+class SiteQuerySet(models.query.QuerySet):
+
+    LISTING_FIELDS = ('id', 'domain', 'fullname')
+
+    def for_listing(self):
+        '''Return a queryset of sites for listings.
+
+        Instead of their (possibly long) notes, sites get `notes_preview`:
+        enough of the notes for `truncatechars:NOTES_PREVIEW`.
+        '''
+        notes = '{0}.notes'.format(Site._meta.db_table)
+        return self.only(*self.LISTING_FIELDS) \
+                   .extra(select={'notes_preview': 'substr({0}, 1, %s)'
+                                                   .format(notes)},
+                          select_params=(NOTES_PREVIEW + 1, ))
+
+
+class SiteManager(models.Manager):
+    '''A custom manager which is essentially a proxy for SiteQuerySet'''
+
+    def get_queryset(self):
+        return SiteQuerySet(self.model, using=self._db)
+
+    def for_listing(self):
+        return self.get_queryset().for_listing()
+
+
 class Site(models.Model):
     '''Represent a site where workshops are hosted.'''
 
     domain     = models.CharField(max_length=STR_LONG, unique=True)
     fullname   = models.CharField(max_length=STR_LONG, unique=True)
     country    = models.CharField(max_length=STR_LONG, null=True)
+    latitude   = models.FloatField(null=True, blank=True)
+    longitude  = models.FloatField(null=True, blank=True)
     notes      = models.TextField(default="", blank=True)
 
+    objects = SiteManager()
+
     def __str__(self):
         return self.domain
 
@@ -50,6 +89,11 @@ class Airport(models.Model):
 
 #------------------------------------------------------------
 
+def email_key(email):
+    '''Return the form of `email` stored in Person.email_lower.'''
+    return email.lower() if email else None
+
+
 class PersonManager(BaseUserManager):
     """
     Create users and superusers from command line.
@@ -59,6 +103,16 @@ class PersonManager(BaseUserManager):
       $ python manage.py createsuperuser
     """
 
+    def get_by_email(self, email):
+        '''Return the person with `email`, ignoring case.
+
+        Looks up the indexed `email_lower` column rather than comparing
+        case-insensitively, which can't use an index.  That column is not
+        unique: older records whose emails differ only in case raise
+        MultipleObjectsReturned.
+        '''
+        return self.get(email_lower=email_key(email))
+
     def create_user(self, username, personal, family, email, password=None):
         """
         Create and save a normal (not-super) user.
@@ -104,6 +158,9 @@ class Person(AbstractBaseUser, PermissionsMixin):
     middle      = models.CharField(max_length=STR_LONG, null=True, blank=True)
     family      = models.CharField(max_length=STR_LONG)
     email       = models.CharField(max_length=STR_LONG, unique=True, null=True, blank=True)
+    # lowercased `email`, kept up to date by normalize()
+    email_lower = models.CharField(max_length=STR_LONG, null=True, blank=True,
+                                   db_index=True, editable=False)
     gender      = models.CharField(max_length=1, choices=GENDER_CHOICES, null=True, blank=True)
     may_contact = models.BooleanField(default=True)
     airport     = models.ForeignKey(Airport, null=True, blank=True)
@@ -149,13 +206,19 @@ class Person(AbstractBaseUser, PermissionsMixin):
         """
         return self.is_superuser
 
-    def save(self, *args, **kwargs):
+    def normalize(self):
+        '''Prepare fields for saving; called by save(), and to be called
+        before bulk_create() (which doesn't call save()).'''
         # save empty string as NULL to the database - otherwise there are
         # issues with UNIQUE constraint failing
         self.middle = self.middle or None
         self.email = self.email or None
         self.github = self.github or None
         self.twitter = self.twitter or None
+        self.email_lower = email_key(self.email)
+
+    def save(self, *args, **kwargs):
+        self.normalize()
         super().save(*args, **kwargs)
 
 
@@ -227,6 +290,20 @@ class EventQuerySet(models.query.QuerySet):
 
         return self.filter(published=False)
 
+    LISTING_FIELDS = (
+        'id', 'published', 'site', 'start', 'end', 'slug', 'url',
+        'reg_key', 'attendance', 'admin_fee', 'fee_paid',
+        'site__id', 'site__domain',
+    )
+
+    def for_listing(self):
+        '''Return a queryset of events (with their sites) for listings.
+
+        Only the columns rendered in listings are selected; notes (which
+        can be long) are not.
+        '''
+        return self.select_related('site').only(*self.LISTING_FIELDS)
+
 
 class EventManager(models.Manager):
     '''A custom manager which is essentially a proxy for EventQuerySet'''
@@ -251,6 +328,9 @@ class EventManager(models.Manager):
     def unpublished_events(self):
         return self.get_queryset().unpublished_events()
 
+    def for_listing(self):
+        return self.get_queryset().for_listing()
+
 class Event(models.Model):
     '''Represent a single event.'''
 
@@ -260,7 +340,7 @@ class Event(models.Model):
     organizer  = models.ForeignKey(Site, related_name='organizer', null=True, blank=True)
     start      = models.DateField(null=True, blank=True)
     end        = models.DateField(null=True, blank=True)
-    slug       = models.CharField(max_length=STR_LONG, null=True, blank=True)
+    slug       = models.CharField(max_length=STR_LONG, null=True, blank=True, db_index=True)
     url        = models.CharField(max_length=STR_LONG, unique=True, null=True, blank=True)
     reg_key    = models.CharField(max_length=STR_REG_KEY, null=True, blank=True)
     attendance = models.IntegerField(null=True, blank=True)
@@ -270,6 +350,8 @@ class Event(models.Model):
 
     class Meta:
         ordering = ('-start', )
+        # for date range queries (see workshops/debrief.py)
+        index_together = [['start', 'end']]
 
     # Set the custom manager
     objects = EventManager()
@@ -325,6 +407,39 @@ class Role(models.Model):
 
 #------------------------------------------------------------
 
+class TaskQuerySet(models.query.QuerySet):
+    '''Handles building task listings.'''
+
+    # Everything Task.__str__ and the task listings need.
+    LISTING_FIELDS = (
+        'id', 'event', 'person', 'role',
+        'event__id', 'event__slug', 'event__start', 'event__end',
+        'person__id', 'person__username', 'person__personal',
+        'person__middle', 'person__family', 'person__email',
+        'role__id', 'role__name',
+    )
+
+    def for_listing(self):
+        '''Return a queryset joining events, persons and roles.
+
+        Only the columns rendered in listings are selected, so displaying
+        a task costs no further queries and no unused (possibly large)
+        columns are loaded.
+        '''
+        return self.select_related('event', 'person', 'role') \
+                   .only(*self.LISTING_FIELDS)
+
+
+class TaskManager(models.Manager):
+    '''A custom manager which is essentially a proxy for TaskQuerySet'''
+
+    def get_queryset(self):
+        return TaskQuerySet(self.model, using=self._db)
+
+    def for_listing(self):
+        return self.get_queryset().for_listing()
+
+
 class Task(models.Model):
     '''Represent who did what at events.'''
 
@@ -332,6 +447,8 @@ class Task(models.Model):
     person     = models.ForeignKey(Person)
     role       = models.ForeignKey(Role)
 
+    objects = TaskManager()
+
     class Meta:
         unique_together = ("event", "person", "role")
 
@@ -353,12 +470,36 @@ class Skill(models.Model):
 
 #------------------------------------------------------------
 
+class QualificationManager(models.Manager):
+
+    def dedupe(self):
+        '''Delete repeated (person, skill) rows, keeping the oldest of
+        each; return how many were deleted.'''
+        repeated = self.values('person', 'skill') \
+                       .annotate(first=models.Min('id'),
+                                 count=models.Count('id')) \
+                       .order_by() \
+                       .filter(count__gt=1)
+        deleted = 0
+        for row in repeated:
+            extra = self.filter(person=row['person'], skill=row['skill']) \
+                        .exclude(id=row['first'])
+            deleted += extra.count()
+            extra.delete()
+        return deleted
+
+
 class Qualification(models.Model):
     '''What is someone qualified to teach?'''
 
     person     = models.ForeignKey(Person)
     skill      = models.ForeignKey(Skill)
 
+    objects = QualificationManager()
+
+    class Meta:
+        unique_together = ('person', 'skill')
+
     def __str__(self):
         return '{0}/{1}'.format(self.person, self.skill)
 
@@ -381,8 +522,449 @@ class Award(models.Model):
 
     person     = models.ForeignKey(Person)
     badge      = models.ForeignKey(Badge)
-    awarded    = models.DateField()
+    awarded    = models.DateField(db_index=True)
     event      = models.ForeignKey(Event, null=True, blank=True)
 
     def __str__(self):
         return '{0}/{1}/{2}/{3}'.format(self.person, self.badge, self.awarded, self.event)
+
+#------------------------------------------------------------
+
+class PersonStatsManager(models.Manager):
+    '''Keep per-person teaching statistics up to date.'''
+
+    EMPTY = {'times_taught': 0, 'times_helped': 0,
+             'first_taught': None, 'last_taught': None, 'badges': ''}
+
+    def _compute(self, tasks, awards):
+        '''Aggregate teaching statistics per person.
+
+        Return a dictionary mapping person IDs to field values; `tasks` and
+        `awards` are querysets restricting which rows are considered.
+        '''
+        # imported here as the lookups module needs these models
+        from workshops.lookups import roles
+
+        stats = {}
+
+        def entry(person_id):
+            return stats.setdefault(person_id, dict(self.EMPTY))
+
+        taught = tasks.filter(role__in=roles.ids('instructor')) \
+                      .values('person') \
+                      .annotate(num=Count('id'),
+                                first=Min('event__start'),
+                                last=Max('event__start')) \
+                      .order_by()
+        for row in taught:
+            e = entry(row['person'])
+            e['times_taught'] = row['num']
+            e['first_taught'] = row['first']
+            e['last_taught'] = row['last']
+
+        helped = tasks.filter(role__in=roles.ids('helper')) \
+                      .values('person') \
+                      .annotate(num=Count('id')) \
+                      .order_by()
+        for row in helped:
+            entry(row['person'])['times_helped'] = row['num']
+
+        badges = {}
+        for (person_id, name) in awards.order_by('badge__name') \
+                                       .values_list('person', 'badge__name'):
+            names = badges.setdefault(person_id, [])
+            if name not in names:
+                names.append(name)
+        for (person_id, names) in badges.items():
+            entry(person_id)['badges'] = ', '.join(names)
+
+        return stats
+
+    def update_for(self, *person_ids):
+        '''Recompute statistics for the given people only.'''
+        person_ids = [pid for pid in set(person_ids) if pid is not None]
+        if not person_ids:
+            return
+        stats = self._compute(
+            Task.objects.filter(person_id__in=person_ids),
+            Award.objects.filter(person_id__in=person_ids))
+        missing = [pid for pid in person_ids
+                   if not self.filter(person_id=pid)
+                              .update(**stats.get(pid, self.EMPTY))]
+        # People saved without signals (bulk_create, loaddata) have no row
+        # yet.  Only people who still exist get one, so that cascading
+        # deletes cannot resurrect a row.
+        if missing:
+            self.bulk_create([
+                PersonStats(person_id=pid, **stats.get(pid, self.EMPTY))
+                for pid in Person.objects.filter(id__in=missing)
+                                         .values_list('id', flat=True)])
+
+    def rebuild(self):
+        '''Recompute statistics for everyone from scratch.'''
+        stats = self._compute(Task.objects.all(), Award.objects.all())
+        self.all().delete()
+        self.bulk_create([PersonStats(person_id=pid, **stats.get(pid, {}))
+                          for pid in Person.objects.values_list('id',
+                                                                flat=True)])
+
+
+class PersonStats(models.Model):
+    '''Materialized teaching statistics for a single person.
+
+    Maintained incrementally by signal receivers in `workshops.signals`;
+    `manage.py rebuild_person_stats` recomputes the whole table.
+    '''
+
+    person       = models.OneToOneField(Person, primary_key=True,
+                                        related_name='stats')
+    times_taught = models.IntegerField(default=0)
+    times_helped = models.IntegerField(default=0)
+    first_taught = models.DateField(null=True, blank=True)
+    last_taught  = models.DateField(null=True, blank=True)
+    # names of all badges, so unbounded
+    badges       = models.TextField(default='', blank=True)
+
+    objects = PersonStatsManager()
+
+    def __str__(self):
+        return '{0}: taught {1}, helped {2}'.format(
+            self.person_id, self.times_taught, self.times_helped)
+
+#------------------------------------------------------------
+
+NEAREST_AIRPORTS = 10   # how many airports are remembered for each site
+
+
+class SiteAirportManager(models.Manager):
+    '''Keep the nearest airports of each site up to date.'''
+
+    # sites per query, to stay below SQLite's limit on query parameters
+    CHUNK = 500
+
+    def _nearest(self, site, airports):
+        '''Rows for the airports nearest to `site`; `airports` holds
+        (id, latitude, longitude) of every airport.'''
+        # imported here as the util module needs these models
+        from workshops.util import earth_distance
+
+        loc = (site.latitude, site.longitude)
+        nearest = heapq.nsmallest(
+            NEAREST_AIRPORTS,
+            ((earth_distance(loc, (lat, long)), airport_id)
+             for (airport_id, lat, long) in airports))
+        return [SiteAirport(site_id=site.id, airport_id=airport_id,
+                            rank=rank, distance=distance)
+                for (rank, (distance, airport_id)) in enumerate(nearest)]
+
+    def update_for(self, *site_ids):
+        '''Recompute the nearest airports of the given sites only.'''
+        site_ids = sorted(sid for sid in set(site_ids) if sid is not None)
+        if not site_ids:
+            return
+        airports = list(Airport.objects.values_list('id', 'latitude',
+                                                    'longitude'))
+        for start in range(0, len(site_ids), self.CHUNK):
+            chunk = site_ids[start:start + self.CHUNK]
+            self.filter(site_id__in=chunk).delete()
+            rows = []
+            for site in Site.objects.filter(id__in=chunk) \
+                                    .exclude(latitude=None) \
+                                    .exclude(longitude=None):
+                rows.extend(self._nearest(site, airports))
+            self.bulk_create(rows)
+
+    def airport_changed(self, airport):
+        '''Update the sites whose nearest airports `airport` (just added or
+        moved) is or was among.'''
+        # imported here as the util module needs these models
+        from workshops.util import earth_distance
+
+        affected = set(self.filter(airport=airport)
+                           .values_list('site_id', flat=True))
+        farthest = {row['site']: (row['num'], row['farthest'])
+                    for row in self.values('site')
+                                   .annotate(num=Count('id'),
+                                             farthest=Max('distance'))
+                                   .order_by()}
+        loc = (airport.latitude, airport.longitude)
+        for (site_id, lat, long) in Site.objects.exclude(latitude=None) \
+                                                .exclude(longitude=None) \
+                                                .values_list('id', 'latitude',
+                                                             'longitude'):
+            num, distance = farthest.get(site_id, (0, None))
+            if num < NEAREST_AIRPORTS or \
+               earth_distance(loc, (lat, long)) < distance:
+                affected.add(site_id)
+        self.update_for(*affected)
+
+    def rebuild(self):
+        '''Recompute the nearest airports of all sites from scratch.'''
+        self.all().delete()
+        self.update_for(*Site.objects.exclude(latitude=None)
+                                     .exclude(longitude=None)
+                                     .values_list('id', flat=True))
+
+
+class SiteAirport(models.Model):
+    '''One of the airports nearest to a site, with its rank (0 is nearest).
+
+    Maintained by signal receivers in `workshops.signals`;
+    `manage.py rebuild_nearest_airports` recomputes the whole table.
+    '''
+
+    site     = models.ForeignKey(Site, related_name='nearest_airports')
+    airport  = models.ForeignKey(Airport, related_name='+')
+    rank     = models.IntegerField()
+    distance = models.FloatField()      # km
+
+    objects = SiteAirportManager()
+
+    class Meta:
+        ordering = ('site', 'rank')
+        unique_together = ('site', 'rank')
+
+    def __str__(self):
+        return '{0}: {1} ({2:.0f} km)'.format(self.site_id, self.airport_id,
+                                               self.distance)
+
+#------------------------------------------------------------
+
+CANDIDATES_PER_EVENT = 10   # how many candidates are stored per event
+RECENT_TEACHING_DAYS = 365  # teaching in this period counts as load
+
+# Candidates are ranked by a penalty (lower is better): distance in units
+# of DISTANCE_SCALE km, plus LOAD_WEIGHT per recent workshop taught, minus
+# SKILL_WEIGHT times the fraction of all skills the person is qualified in.
+DISTANCE_SCALE = 500.0
+LOAD_WEIGHT = 0.5
+SKILL_WEIGHT = 1.0
+
+
+class InstructorCandidateManager(models.Manager):
+    '''Rank possible instructors for upcoming events.'''
+
+    def _rank(self, event):
+        # imported here as the lookups module needs these models
+        from workshops.lookups import qualifications, roles, skills
+
+        distances = dict(SiteAirport.objects.filter(site=event.site_id)
+                                            .values_list('airport', 'distance'))
+        taken = set(Task.objects.filter(event=event)
+                                .values_list('person', flat=True))
+        qualified = qualifications.person_ids([])
+        pool = [p for p in Person.objects.filter(airport__in=list(distances),
+                                                 may_contact=True)
+                                         .values_list('id', 'airport')
+                if p[0] in qualified and p[0] not in taken]
+        if not pool:
+            return []
+
+        recent = Task.objects.filter(role__in=roles.ids('instructor'),
+                                     person__airport__in=list(distances),
+                                     person__may_contact=True)
+        if event.start is not None:
+            since = event.start - datetime.timedelta(days=RECENT_TEACHING_DAYS)
+            recent = recent.filter(event__start__gte=since,
+                                   event__start__lt=event.start)
+        load = dict(recent.values('person')
+                          .annotate(num=Count('id'))
+                          .order_by()
+                          .values_list('person', 'num'))
+        num_skills = len(skills.all()) or 1
+        skill_counts = dict(
+            Qualification.objects.filter(person__airport__in=list(distances))
+                                 .values('person')
+                                 .annotate(num=Count('id'))
+                                 .order_by()
+                                 .values_list('person', 'num'))
+
+        ranked = []
+        for (person_id, airport_id) in pool:
+            distance = distances[airport_id]
+            score = distance / DISTANCE_SCALE + \
+                LOAD_WEIGHT * load.get(person_id, 0) - \
+                SKILL_WEIGHT * skill_counts.get(person_id, 0) / num_skills
+            ranked.append((score, distance, load.get(person_id, 0),
+                           person_id))
+        return heapq.nsmallest(CANDIDATES_PER_EVENT, ranked)
+
+    def refresh(self, event):
+        '''Recompute the candidates for `event`; return how many there
+        are.'''
+        ranked = self._rank(event)
+        # in one transaction, so readers never see the event without
+        # candidates; locking the event makes concurrent refreshes of it
+        # wait for each other rather than clash on (event, rank)
+        with transaction.atomic():
+            list(Event.objects.select_for_update().filter(id=event.id)
+                                                  .values_list('id'))
+            self.filter(event=event).delete()
+            self.bulk_create([
+                InstructorCandidate(event=event, person_id=person_id,
+                                    rank=rank, score=score,
+                                    distance=distance, recent_load=load)
+                for (rank, (score, distance, load, person_id))
+                in enumerate(ranked)])
+        return len(ranked)
+
+    def refresh_upcoming(self):
+        '''Recompute the candidates for all upcoming events (and forget
+        those of past ones); return the number of events.'''
+        upcoming = Event.objects.upcoming_events()
+        # a subquery, as there may be more events than SQLite takes
+        # parameters
+        self.exclude(event__in=upcoming.values('id')).delete()
+        for event in upcoming:
+            self.refresh(event)
+        return len(upcoming)
+
+
+class InstructorCandidate(models.Model):
+    '''A possible instructor for an upcoming event, with their rank.
+
+    Computed nightly by `manage.py compute_candidates`, and on request for
+    single events.
+    '''
+
+    event       = models.ForeignKey(Event, related_name='candidates')
+    person      = models.ForeignKey(Person, related_name='+')
+    rank        = models.IntegerField()
+    score       = models.FloatField()
+    distance    = models.FloatField()       # km
+    recent_load = models.IntegerField()     # workshops taught recently
+    computed    = models.DateTimeField(auto_now_add=True)
+
+    objects = InstructorCandidateManager()
+
+    class Meta:
+        ordering = ('event', 'rank')
+        unique_together = ('event', 'rank')
+
+    def __str__(self):
+        return '{0} #{1}: {2}'.format(self.event_id, self.rank,
+                                      self.person_id)
+
+#------------------------------------------------------------
+
+class StagedUploadManager(models.Manager):
+    '''Store and retrieve bulk upload data awaiting confirmation.'''
+
+    def stage(self, person, data):
+        '''Store `data` (JSON-serializable) for `person`; return its token.'''
+        upload = self.model(token=uuid.uuid4().hex, person=person)
+        upload.data = data
+        upload.save()
+        return upload.token
+
+    def load(self, person, token):
+        '''Return the data staged by `person` under `token`, or None.'''
+        try:
+            return self.get(person=person, token=token).data
+        except self.model.DoesNotExist:
+            return None
+
+    def replace(self, person, token, data):
+        '''Overwrite staged data; return False if there is none.'''
+        return bool(self.filter(person=person, token=token)
+                        .update(payload=self.model.compress(data),
+                                updated=timezone.now()))
+
+    def discard(self, person, token):
+        self.filter(person=person, token=token).delete()
+
+    def sweep(self, max_age):
+        '''Delete uploads not touched for `max_age` (a timedelta).
+
+        Return the number deleted.
+        '''
+        stale = self.filter(updated__lt=timezone.now() - max_age)
+        count = stale.count()
+        stale.delete()
+        return count
+
+
+class StagedUpload(models.Model):
+    '''Bulk upload data between upload and confirmation.
+
+    Uploads can be large, so rather than keeping them in the session (and
+    rewriting them with it) they are stored here, compressed, and the
+    session only holds the token.
+    '''
+
+    token   = models.CharField(max_length=STR_MED, unique=True)
+    person  = models.ForeignKey(Person, related_name='+')
+    updated = models.DateTimeField(auto_now=True)
+    payload = models.BinaryField()
+
+    objects = StagedUploadManager()
+
+    @staticmethod
+    def compress(data):
+        return zlib.compress(json.dumps(data).encode('utf-8'))
+
+    @property
+    def data(self):
+        return json.loads(zlib.decompress(self.payload).decode('utf-8'))
+
+    @data.setter
+    def data(self, value):
+        self.payload = self.compress(value)
+
+    def __str__(self):
+        return '{0} ({1})'.format(self.token, self.person_id)
+
+#------------------------------------------------------------
+
+class Job(models.Model):
+    '''Background work, queued by views and run by `manage.py run_jobs`.
+
+    See `workshops.jobs` for how jobs are defined, queued and run.
+    '''
+
+    QUEUED  = 'queued'
+    RUNNING = 'running'
+    DONE    = 'done'
+    FAILED  = 'failed'
+    STATUS_CHOICES = ((QUEUED, 'Queued'),
+                      (RUNNING, 'Running'),
+                      (DONE, 'Done'),
+                      (FAILED, 'Failed'))
+
+    kind         = models.CharField(max_length=STR_MED)
+    arguments    = models.TextField(default='{}')    # JSON
+    person       = models.ForeignKey(Person, null=True, blank=True,
+                                     on_delete=models.SET_NULL,
+                                     related_name='+')
+    status       = models.CharField(max_length=STR_SHORT,
+                                    choices=STATUS_CHOICES, default=QUEUED)
+    attempts     = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=1)
+    run_after    = models.DateTimeField(default=timezone.now)
+    created      = models.DateTimeField(auto_now_add=True)
+    started      = models.DateTimeField(null=True, blank=True)
+    finished     = models.DateTimeField(null=True, blank=True)
+    result       = models.TextField(null=True, blank=True)  # JSON
+    error        = models.TextField(default='', blank=True)
+    # whether the last attempt raised an unexpected exception, whose
+    # traceback is then in `error`
+    crashed      = models.BooleanField(default=False)
+
+    class Meta:
+        index_together = [['status', 'run_after']]
+
+    def __str__(self):
+        return '{0} #{1} ({2})'.format(self.kind, self.id, self.status)
+
+    def get_absolute_url(self):
+        return reverse('job_details', args=[self.id])
+
+    def get_arguments(self):
+        return json.loads(self.arguments)
+
+    def get_result(self):
+        return None if self.result is None else json.loads(self.result)
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
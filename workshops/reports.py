@@ -0,0 +1,175 @@
+'''Statistical reports over the workshop database.
+
+These used to be ad-hoc SQL queries in the Makefile.  Each report is a
+function returning a list of rows (tuples); results are cached and keyed
+by the current data version, so any change to workshop data makes the
+next request recompute the report.
+'''
+
+import datetime
+import uuid
+from collections import OrderedDict, namedtuple
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from workshops.lookups import badges, roles
+from workshops.models import Event, Person, PersonStats
+
+#------------------------------------------------------------
+
+DATA_VERSION_KEY = 'workshops-data-version'
+REPORT_CACHE_TIMEOUT = 60 * 60        # seconds
+
+# Instructors who taught at least this many times since this date count
+# as Software Carpentry Foundation members.
+MEMBER_MIN_TAUGHT = 2
+MEMBER_SINCE = datetime.date(2013, 1, 1)
+
+#------------------------------------------------------------
+
+
+def get_data_version():
+    '''Return a token that changes whenever workshop data changes.'''
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        # another process may have beaten us to it; use whatever is there
+        if not cache.add(DATA_VERSION_KEY, version, timeout=None):
+            version = cache.get(DATA_VERSION_KEY, version)
+    return version
+
+
+def bump_data_version(**kwargs):
+    '''Invalidate everything keyed by the data version.
+
+    The signature matches Django signal receivers so this can be connected
+    directly to `post_save` and friends.
+    '''
+    cache.set(DATA_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+#------------------------------------------------------------
+
+
+def _person_name(personal, family, email):
+    return '{0} {1} <{2}>'.format(personal, family, email)
+
+
+def enrolment():
+    '''Reported and identified enrolment per workshop.'''
+    return list(
+        Event.objects.filter(task__role__in=roles.ids('learner'))
+                     .annotate(identified=Count('task'))
+                     .order_by('slug')
+                     .values_list('slug', 'attendance', 'identified'))
+
+
+def cumulative_workshops():
+    '''Cumulative number of workshops by start date.
+
+    The database groups events by start date in one ordered pass; the
+    running total is accumulated here instead of with a self-join.
+    '''
+    per_day = Event.objects.filter(start__isnull=False) \
+                           .values('start') \
+                           .annotate(num=Count('id')) \
+                           .order_by('start') \
+                           .values_list('start', 'num')
+    result = []
+    total = 0
+    for start, num in per_day:
+        total += num
+        result.append((start, total))
+    return result
+
+
+def _instructor_counts():
+    return PersonStats.objects.filter(times_taught__gt=0) \
+                              .order_by('-times_taught', 'person__family',
+                                        'person__personal') \
+                              .values_list('times_taught', 'person__personal',
+                                           'person__family', 'person__email')
+
+
+def workshops_per_instructor():
+    '''Total number of workshops taught by each instructor.'''
+    return [(num, _person_name(personal, family, email))
+            for (num, personal, family, email) in _instructor_counts()]
+
+
+def instructors_by_times_taught():
+    '''Number of instructors who have taught a given number of times.'''
+    return list(PersonStats.objects.filter(times_taught__gt=0)
+                                   .values('times_taught')
+                                   .annotate(num=Count('person'))
+                                   .order_by('-times_taught')
+                                   .values_list('times_taught', 'num'))
+
+
+def instructors_never_taught():
+    '''Badged instructors who have never taught.'''
+    persons = Person.objects.filter(award__badge__in=badges.ids('instructor'),
+                                    stats__times_taught=0) \
+                            .distinct() \
+                            .order_by('family', 'personal') \
+                            .values_list('personal', 'family', 'email')
+    return [(_person_name(*p), ) for p in persons]
+
+
+def members(since=MEMBER_SINCE, min_taught=MEMBER_MIN_TAUGHT):
+    '''Who qualifies as a Software Carpentry Foundation member?
+
+    Members are people who taught at least `min_taught` workshops starting
+    on or after `since`, plus everyone holding the "member" badge.
+    '''
+    taught = Person.objects.filter(task__role__in=roles.ids('instructor'),
+                                   task__event__start__gte=since) \
+                           .annotate(num_taught=Count('task')) \
+                           .filter(num_taught__gte=min_taught) \
+                           .values_list('id', 'personal', 'family', 'email')
+    badged = Person.objects.filter(award__badge__in=badges.ids('member')) \
+                           .values_list('id', 'personal', 'family', 'email')
+    found = OrderedDict()
+    for (pid, personal, family, email) in list(taught) + list(badged):
+        found[pid] = _person_name(personal, family, email)
+    return [(name, ) for name in sorted(found.values())]
+
+#------------------------------------------------------------
+
+Report = namedtuple('Report', ['title', 'header', 'compute'])
+
+REPORTS = OrderedDict([
+    ('enrolment', Report('Reported workshop enrolment per workshop',
+                         ('workshop', 'reported', 'identified'),
+                         enrolment)),
+    ('cumulative', Report('Cumulative workshops by date',
+                          ('date', 'total'),
+                          cumulative_workshops)),
+    ('taught', Report('Total number of workshops taught by instructor',
+                      ('count', 'person'),
+                      workshops_per_instructor)),
+    ('taught-histogram', Report('Number of instructors who have taught '
+                                'number of times',
+                                ('count', 'number'),
+                                instructors_by_times_taught)),
+    ('never-taught', Report('Instructors who have never taught',
+                            ('person', ),
+                            instructors_never_taught)),
+    ('members', Report('Who qualifies as a SCF member?',
+                       ('person', ),
+                       members)),
+])
+
+
+def get_report(name):
+    '''Return cached rows for report `name`, computing them if needed.
+
+    Raises KeyError for unknown reports.
+    '''
+    report = REPORTS[name]
+    key = 'report-{0}-{1}'.format(name, get_data_version())
+    rows = cache.get(key)
+    if rows is None:
+        rows = report.compute()
+        cache.set(key, rows, REPORT_CACHE_TIMEOUT)
+    return rows
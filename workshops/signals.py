@@ -0,0 +1,258 @@
+'''Signal receivers keeping derived data in step with the models.'''
+
+from django.apps import apps
+from django.db.models.signals import (
+    pre_save, post_save, pre_delete, post_delete, m2m_changed)
+
+from workshops.models import (
+    Airport, Award, Badge, Event, Job, Person, PersonStats, Role, Site,
+    SiteAirport, StagedUpload, Tag, Task)
+from workshops.caching import invalidate_fragments, invalidate_person_summary
+from workshops import lookups
+from workshops.debrief import event_intervals
+from workshops import distances
+from workshops.reports import bump_data_version
+
+#------------------------------------------------------------
+
+def _login_only(update_fields):
+    '''Whether a save is a login, which saves only `last_login`.'''
+    return update_fields is not None and set(update_fields) == {'last_login'}
+
+
+def _data_saved(sender, update_fields=None, **kwargs):
+    # last_login is in no report
+    if not _login_only(update_fields):
+        bump_data_version()
+
+
+# Any change to workshop data invalidates cached reports.
+for model in apps.get_app_config('workshops').get_models():
+    if model in (Job, StagedUpload):    # not workshop data
+        continue
+    post_save.connect(_data_saved, sender=model,
+                      dispatch_uid='data-version-save-{0}'.format(model.__name__))
+    post_delete.connect(bump_data_version, sender=model,
+                        dispatch_uid='data-version-delete-{0}'.format(model.__name__))
+m2m_changed.connect(bump_data_version, dispatch_uid='data-version-m2m')
+
+#------------------------------------------------------------
+
+# Cached reference tables.  These receivers are connected first so that
+# receivers below (e.g. for a renamed role) already see the change.
+for lookup in lookups.ALL:
+    post_save.connect(lookup.invalidate, sender=lookup.model,
+                      dispatch_uid='lookups-save-{0}'.format(lookup.model.__name__))
+    post_delete.connect(lookup.invalidate, sender=lookup.model,
+                        dispatch_uid='lookups-delete-{0}'.format(lookup.model.__name__))
+post_save.connect(event_intervals.invalidate, sender=Event,
+                  dispatch_uid='event-intervals-save')
+post_delete.connect(event_intervals.invalidate, sender=Event,
+                    dispatch_uid='event-intervals-delete')
+
+
+def _person_index_saved(sender, update_fields=None, **kwargs):
+    # logging in saves only last_login, which is not in the index
+    if update_fields is None or \
+       set(update_fields) & set(lookups.PersonIndex.FIELDS):
+        lookups.persons.invalidate()
+
+
+post_save.connect(_person_index_saved, sender=Person,
+                  dispatch_uid='person-index-save')
+post_delete.connect(lookups.persons.invalidate, sender=Person,
+                    dispatch_uid='person-index-delete')
+
+#------------------------------------------------------------
+
+# Per-person teaching statistics and cached summaries.  Tasks and awards
+# can be moved from one person to another (edits, merges), so remember who
+# they belonged to.
+
+def _person_changed(*person_ids):
+    PersonStats.objects.update_for(*person_ids)
+    invalidate_person_summary(*person_ids)
+
+
+def _remember_person(sender, instance, **kwargs):
+    instance._stats_person_ids = {instance.person_id}
+    if instance.pk is not None:
+        instance._stats_person_ids.update(
+            sender.objects.filter(pk=instance.pk)
+                          .values_list('person_id', flat=True))
+
+
+def _task_or_award_changed(sender, instance, **kwargs):
+    _person_changed(*getattr(instance, '_stats_person_ids',
+                             {instance.person_id}))
+
+
+def _person_saved(sender, instance, created, raw=False, update_fields=None,
+                  **kwargs):
+    if raw or _login_only(update_fields):
+        return
+    if created:
+        PersonStats.objects.get_or_create(person=instance)
+    # names appear in the cached task and award descriptions (and a new
+    # person may reuse the ID of one whose creation was rolled back)
+    invalidate_person_summary(instance.id)
+
+
+def _event_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _person_changed(
+            *instance.task_set.values_list('person_id', flat=True))
+        invalidate_person_summary(
+            *instance.award_set.values_list('person_id', flat=True))
+
+
+def _badge_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _person_changed(
+            *instance.award_set.values_list('person_id', flat=True))
+
+
+def _role_saved(sender, instance, created, raw=False, **kwargs):
+    # a brand new role has no tasks yet; renaming one can change everyone
+    if not created and not raw:
+        PersonStats.objects.rebuild()
+        invalidate_person_summary(
+            *instance.task_set.values_list('person_id', flat=True))
+
+
+post_save.connect(_person_saved, sender=Person,
+                  dispatch_uid='person-data-person')
+for model in (Task, Award):
+    pre_save.connect(_remember_person, sender=model,
+                     dispatch_uid='person-data-pre-{0}'.format(model.__name__))
+    post_save.connect(_task_or_award_changed, sender=model,
+                      dispatch_uid='person-data-save-{0}'.format(model.__name__))
+    post_delete.connect(_task_or_award_changed, sender=model,
+                        dispatch_uid='person-data-delete-{0}'.format(model.__name__))
+post_save.connect(_event_saved, sender=Event,
+                  dispatch_uid='person-data-event')
+post_save.connect(_badge_saved, sender=Badge,
+                  dispatch_uid='person-data-badge')
+post_save.connect(_role_saved, sender=Role,
+                  dispatch_uid='person-data-role')
+
+#------------------------------------------------------------
+
+# Cached page fragments.  Site pages list the site's events and their tags;
+# events can move from one site to another.
+
+def _site_changed(sender, instance, **kwargs):
+    invalidate_fragments('all_sites')
+    invalidate_fragments('site_details', instance.id)
+
+
+def _airport_changed(sender, instance, **kwargs):
+    invalidate_fragments('all_airports')
+    invalidate_fragments('airport_details', instance.id)
+
+
+def _remember_site(sender, instance, **kwargs):
+    instance._fragment_site_ids = {instance.site_id}
+    if instance.pk is not None:
+        instance._fragment_site_ids.update(
+            Event.objects.filter(pk=instance.pk)
+                         .values_list('site_id', flat=True))
+
+
+def _event_changed(sender, instance, **kwargs):
+    invalidate_fragments('site_details',
+                         *getattr(instance, '_fragment_site_ids',
+                                  {instance.site_id}))
+
+
+def _event_tags_changed(sender, instance, reverse, **kwargs):
+    if reverse:
+        # tags were added to or removed from events, through the tag
+        invalidate_fragments('site_details')
+    else:
+        invalidate_fragments('site_details', instance.site_id)
+
+
+def _tag_changed(sender, **kwargs):
+    invalidate_fragments('site_details')
+
+
+for (model, receiver) in ((Site, _site_changed),
+                          (Airport, _airport_changed),
+                          (Event, _event_changed),
+                          (Tag, _tag_changed)):
+    post_save.connect(receiver, sender=model,
+                      dispatch_uid='fragments-save-{0}'.format(model.__name__))
+    post_delete.connect(receiver, sender=model,
+                        dispatch_uid='fragments-delete-{0}'.format(model.__name__))
+pre_save.connect(_remember_site, sender=Event,
+                 dispatch_uid='fragments-pre-Event')
+m2m_changed.connect(_event_tags_changed, sender=Event.tags.through,
+                    dispatch_uid='fragments-event-tags')
+
+#------------------------------------------------------------
+
+# Precomputed distances between airports (if they have been built).
+
+def _airport_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        distances.update(instance)
+
+
+def _airport_deleted(sender, instance, **kwargs):
+    distances.remove(instance.id)
+
+
+post_save.connect(_airport_saved, sender=Airport,
+                  dispatch_uid='distances-save')
+post_delete.connect(_airport_deleted, sender=Airport,
+                    dispatch_uid='distances-delete')
+
+#------------------------------------------------------------
+
+# Nearest airports of each site.  Only changes of location matter.
+
+def _location(instance):
+    return (instance.latitude, instance.longitude)
+
+
+def _remember_location(sender, instance, **kwargs):
+    instance._old_location = None
+    if instance.pk is not None:
+        instance._old_location = sender.objects.filter(pk=instance.pk) \
+            .values_list('latitude', 'longitude').first()
+
+
+def _site_located(sender, instance, created, raw=False, **kwargs):
+    if not raw and (created or
+                    getattr(instance, '_old_location', None) != _location(instance)):
+        SiteAirport.objects.update_for(instance.id)
+
+
+def _airport_located(sender, instance, created, raw=False, **kwargs):
+    if not raw and (created or
+                    getattr(instance, '_old_location', None) != _location(instance)):
+        SiteAirport.objects.airport_changed(instance)
+
+
+def _remember_airport_sites(sender, instance, **kwargs):
+    instance._nearest_site_ids = list(
+        SiteAirport.objects.filter(airport=instance)
+                           .values_list('site_id', flat=True))
+
+
+def _airport_removed(sender, instance, **kwargs):
+    SiteAirport.objects.update_for(*getattr(instance, '_nearest_site_ids', []))
+
+
+for model in (Site, Airport):
+    pre_save.connect(_remember_location, sender=model,
+                     dispatch_uid='nearest-pre-{0}'.format(model.__name__))
+post_save.connect(_site_located, sender=Site,
+                  dispatch_uid='nearest-save-Site')
+post_save.connect(_airport_located, sender=Airport,
+                  dispatch_uid='nearest-save-Airport')
+pre_delete.connect(_remember_airport_sites, sender=Airport,
+                   dispatch_uid='nearest-pre-delete-Airport')
+post_delete.connect(_airport_removed, sender=Airport,
+                    dispatch_uid='nearest-delete-Airport')
@@ -0,0 +1,23 @@
+// Suggest values as the user types into a text box with class
+// "autocomplete", instead of listing every row of a table in a <select>.
+// The box's data-url points at a JSON search view, data-results names the
+// list of matches in its response and data-value the field of a match to
+// fill in.  Suggestions go into the <datalist> named by the box's list
+// attribute.
+$(function() {
+    $(document).on('input', 'input.autocomplete', function() {
+        var box = $(this);
+        var term = box.val();
+        var choices = $('#' + box.attr('list'));
+        if (!term) {
+            return;
+        }
+        $.getJSON(box.data('url'), {term: term}, function(data) {
+            choices.empty();
+            $.each(data[box.data('results')], function(i, found) {
+                $('<option>').val(found[box.data('value')]).text(found.label)
+                             .appendTo(choices);
+            });
+        });
+    });
+});
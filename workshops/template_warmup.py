@@ -0,0 +1,60 @@
+'''Compile templates ahead of time.
+
+With the cached template loader (see TEMPLATE_CACHE in the settings) every
+template is read and compiled once per process, the first time it is used.
+`warm_templates()` does that for all templates up front, so the first
+requests served by a new process are not slower than the rest, and broken
+templates are found at startup rather than by a user.
+'''
+
+import logging
+import os
+
+from django.conf import settings
+from django.template import TemplateSyntaxError
+from django.template.loader import get_template
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_SUFFIXES = ('.html', '.txt')
+
+
+def template_dirs():
+    '''Directories searched by the filesystem and app directories loaders.'''
+    from django.template.loaders.app_directories import app_template_dirs
+    return list(settings.TEMPLATE_DIRS) + list(app_template_dirs)
+
+
+def find_templates():
+    '''Yield the names of all templates, as passed to get_template().
+
+    A name found in several directories is yielded once, as only the first
+    one is ever used.
+    '''
+    seen = set()
+    for root in template_dirs():
+        for (path, dirs, files) in os.walk(root):
+            dirs.sort()
+            for filename in sorted(files):
+                if not filename.endswith(TEMPLATE_SUFFIXES):
+                    continue
+                name = os.path.relpath(os.path.join(path, filename), root)
+                name = name.replace(os.sep, '/')
+                if name not in seen:
+                    seen.add(name)
+                    yield name
+
+
+def warm_templates():
+    '''Compile every template; return (names compiled, {name: error}).'''
+    compiled = []
+    errors = {}
+    for name in find_templates():
+        try:
+            get_template(name)
+        except TemplateSyntaxError as e:
+            errors[name] = str(e)
+            logger.error('Cannot compile template %s: %s', name, e)
+        else:
+            compiled.append(name)
+    return compiled, errors
@@ -1,7 +1,8 @@
+import functools
 import logging
 
 from django import template
-from django.core.urlresolvers import reverse
+from django.core.urlresolvers import get_script_prefix, get_urlconf, reverse
 from django.utils.encoding import force_text
 from django.utils.html import escape
 
@@ -27,8 +28,7 @@ def breadcrumb_url(title, url_name):
     Example usage:
         {% breadcrumb_url "Title of breadcrumb" url_name %}
     '''
-    url = reverse(url_name)
-    return create_crumb(title, url)
+    return url_crumb(title, url_name)
 
 
 @register.simple_tag
@@ -50,11 +50,14 @@ def breadcrumb_index_all_objects(model):
         {% breadcrumb_index_all_objects model %}
         {% breadcrumb_index_all_objects person %}
     '''
+    return url_crumb(*_index_all_objects_title_and_url(
+        model._meta.concrete_model))
+
+
+@functools.lru_cache(maxsize=None)
+def _index_all_objects_title_and_url(model):
     plural = force_text(model._meta.verbose_name_plural)
-    title = 'All {}'.format(plural)
-    url_name = 'all_{}'.format(plural)
-    url = reverse(url_name)
-    return create_crumb(title, url)
+    return 'All {}'.format(plural), 'all_{}'.format(plural)
 
 
 @register.simple_tag
@@ -105,9 +108,22 @@ def breadcrumb_main_page():
     Example usage:
         {% breadcrumb_main_page %}
     '''
-    title = 'Amy'
-    url = reverse('index')
-    return create_crumb(title, url)
+    return url_crumb('Amy', 'index')
+
+
+def url_crumb(title, url_name):
+    '''
+    Breadcrumb linking to a named URL.  There are only a few of these, and
+    they are on every page, so the HTML is memoized.  The URL depends on the
+    script prefix and URLconf of the current thread, so these are part of
+    the key.
+    '''
+    return _url_crumb(title, url_name, get_script_prefix(), get_urlconf())
+
+
+@functools.lru_cache(maxsize=256)
+def _url_crumb(title, url_name, script_prefix, urlconf):
+    return create_crumb(title, reverse(url_name, urlconf=urlconf))
 
 
 def create_crumb(title, url=None, active=False):
@@ -8,9 +8,13 @@ import xml.etree.ElementTree as ET
 
 from django.conf import settings
 from django.contrib.auth.models import Group, Permission
-from django.core.urlresolvers import reverse
+from django.core.cache import cache
+from django.core.urlresolvers import resolve, reverse
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
 
+from ..middleware import get_query_budget, profile_queries
 from ..models import \
     Airport, \
     Award, \
@@ -21,6 +25,33 @@ from ..models import \
     Skill
 
 
+class QueryBudgetMixin(object):
+    '''Assert that views stay within their query budgets.
+
+    Budgets come from `settings.QUERY_BUDGETS`, keyed by URL name (see
+    workshops/middleware.py), unless given explicitly.
+    '''
+
+    def assertQueryBudget(self, url, budget=None, method='get', data=None):
+        '''Request `url` and check how many queries it ran.'''
+        if budget is None:
+            url_name = resolve(url).url_name
+            budget = get_query_budget(url_name)
+            assert budget is not None, \
+                'No query budget configured for {0}'.format(url_name)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = getattr(self.client, method)(url, data or {})
+
+        profile = profile_queries(captured.captured_queries)
+        assert profile['queries'] <= budget, \
+            '{0} ran {1} queries, budget is {2}; repeated queries:\n{3}' \
+            .format(url, profile['queries'], budget,
+                    '\n'.join('{0}x {1}'.format(n, sql)
+                              for (sql, n) in profile['duplicates'].items()))
+        return response
+
+
 class TestBase(TestCase):
     '''Base class for Amy test cases.'''
 
@@ -29,6 +60,20 @@ class TestBase(TestCase):
     def setUp(self):
         '''Create standard objects.'''
 
+        # cached lookups, summaries and fragments refer to IDs, which are
+        # reused once a test's transaction is rolled back
+        cache.clear()
+
+        # run background jobs inside the request, as if a worker were idle
+        eager_jobs = override_settings(JOBS_EAGER=True)
+        eager_jobs.enable()
+        self.addCleanup(eager_jobs.disable)
+
+        # precomputed distances (if any) are for the real airports
+        no_distances = override_settings(AIRPORT_DISTANCES=None)
+        no_distances.enable()
+        self.addCleanup(no_distances.disable)
+
         self._setUpSites()
         self._setUpAirports()
         self._setUpSkills()
@@ -262,7 +307,8 @@ class TestBase(TestCase):
         '''Extract form data from page.'''
         form = self._get_1(doc, ".//form", 'expected one form in page')
 
-        inputs = dict([(i.attrib['name'], i.attrib.get('value', None))
+        # like browsers, send empty text boxes as empty strings
+        inputs = dict([(i.attrib['name'], i.attrib.get('value', ''))
                        for i in form.findall(".//input[@type='text']")])
         
         hidden = dict([(i.attrib['name'], i.attrib.get('value', None))
@@ -0,0 +1,128 @@
+import datetime
+from unittest.mock import patch
+
+from django.contrib.messages import get_messages
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from ..models import Award, Badge, Event, Person, Role, Task
+from .base import TestBase, QueryBudgetMixin
+
+
+class TestAdmin(QueryBudgetMixin, TestBase):
+    '''Test cases for the admin changelists.'''
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+        self.role = Role.objects.create(name='instructor')
+        self.badge = Badge.objects.create(name='instructor',
+                                          title='Software Carpentry Instructor',
+                                          criteria='Worked hard for this')
+        self._populate(5)
+
+    def _populate(self, count):
+        '''Add `count` events, each with a new person teaching and awarded
+        a badge there.'''
+        first = Event.objects.count()
+        for i in range(first, first + count):
+            start = datetime.date(2015, 1, 1) + datetime.timedelta(days=i)
+            event = Event.objects.create(site=self.site_alpha, start=start,
+                                         slug='{0}-alpha'.format(start))
+            person = Person.objects.create(
+                username='person{0}'.format(i), personal='Person',
+                family='Number{0}'.format(i),
+                email='person{0}@example.org'.format(i),
+                airport=self.airport_0_0)
+            Task.objects.create(event=event, person=person, role=self.role)
+            Award.objects.create(event=event, person=person,
+                                 badge=self.badge, awarded=start)
+
+    def _changelist(self, model, **params):
+        url = reverse('admin:workshops_{0}_changelist'.format(model))
+        return self.assertQueryBudget(url, data=params)
+
+    def _found(self, model, **params):
+        return list(self._changelist(model, **params)
+                        .context['cl'].result_list)
+
+    def _count_queries(self, model):
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse(
+                'admin:workshops_{0}_changelist'.format(model)))
+        return len(captured.captured_queries)
+
+    def test_changelists_within_budget(self):
+        for model in ('person', 'event', 'task', 'award'):
+            self._changelist(model)
+            self._changelist(model, q='Number1')
+            self._changelist(model, q='2015-01')
+        self._changelist('event', start__year='2015')
+        self._changelist('award', awarded__year='2015',
+                         awarded__month='1')
+
+    def test_queries_do_not_grow_with_rows(self):
+        models = ('person', 'event', 'task', 'award')
+        before = [self._count_queries(m) for m in models]
+        self._populate(20)
+        self.assertEqual([self._count_queries(m) for m in models], before)
+
+    def test_search_persons_by_trigrams(self):
+        found = self._found('person', q='Nmuber3')
+        self.assertEqual(found[0].username, 'person3')
+
+    def test_search_events_by_slug_prefix(self):
+        found = self._found('event', q='2015-01-02')
+        self.assertEqual([e.slug for e in found], ['2015-01-02-alpha'])
+        pending = Event.objects.create(site=self.site_beta)
+        self.assertEqual(self._found('event', q=str(pending.id)), [pending])
+
+    def test_search_tasks_by_person_or_event(self):
+        by_event = self._found('task', q='2015-01-03')
+        self.assertEqual([t.person.username for t in by_event], ['person2'])
+        by_person = self._found('task', q='Number4')
+        self.assertIn('person4', [t.person.username for t in by_person])
+
+    def test_awards_by_date(self):
+        found = self._found('award', awarded__year='2015',
+                            awarded__month='1', awarded__day='2')
+        self.assertEqual([a.person.username for a in found], ['person1'])
+
+    def test_password_hash_is_read_only(self):
+        person = Person.objects.get(username='person1')
+        person.set_password('secret')
+        person.save()
+        url = reverse('admin:workshops_person_change', args=[person.id])
+        response = self.client.get(url)
+        self.assertNotContains(response, 'name="password"')
+        self.assertContains(response, 'href="password/"')
+        self.assertEqual(self.client.get(url + 'password/').status_code, 200)
+
+        # a posted password is ignored
+        data = dict(response.context['adminform'].form.initial,
+                    username='person1', password='plain', airport='',
+                    groups=[], user_permissions=[])
+        data = {k: v for (k, v) in data.items() if v is not None}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        person = Person.objects.get(id=person.id)
+        self.assertTrue(person.check_password('secret'))
+
+    def test_add_person_without_password(self):
+        response = self.client.post(
+            reverse('admin:workshops_person_add'),
+            {'username': 'newbie', 'personal': 'New', 'family': 'Person',
+             'email': 'newbie@example.org'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Person.objects.get(username='newbie')
+                               .has_usable_password())
+
+    def test_capped_search_is_reported(self):
+        with patch('workshops.admin.ADMIN_SEARCH_LEN', 2):
+            response = self._changelist('person', q='Number')
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+        self.assertIn('Only the 2 people best matching',
+                      ' '.join(str(m) for m in
+                               get_messages(response.wsgi_request)))
+        response = self._changelist('person', q='Number')
+        self.assertEqual(list(get_messages(response.wsgi_request)), [])
@@ -0,0 +1,90 @@
+import datetime
+import json
+
+from django.core.urlresolvers import reverse
+from ..models import Event, Role, Site, Tag, Task
+from .base import TestBase, QueryBudgetMixin
+
+
+class TestAutocomplete(QueryBudgetMixin, TestBase):
+    '''Test cases for picking related objects by autocompletion.'''
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+        self.event = Event.objects.create(site=self.site_alpha,
+                                          slug='2015-01-01-alpha',
+                                          start=datetime.date(2015, 1, 1))
+        self.pending = Event.objects.create(site=self.site_beta)
+        self.role = Role.objects.create(name='instructor')
+        self.task = Task.objects.create(event=self.event, person=self.ron,
+                                        role=self.role)
+
+    def _search(self, name, term):
+        response = self.assertQueryBudget(reverse(name), data={'term': term})
+        return json.loads(response.content.decode('utf-8'))
+
+    def test_site_search(self):
+        found = self._search('site_search', 'ALPHA')['sites']
+        self.assertEqual([s['domain'] for s in found], ['alpha.edu'])
+        self.assertEqual(self._search('site_search', '')['sites'], [])
+
+    def test_event_search(self):
+        found = self._search('event_search', 'alpha')['events']
+        self.assertEqual([e['ident'] for e in found], ['2015-01-01-alpha'])
+        # pending events have no slug yet, only an ID
+        found = self._search('event_search', self.pending.id)['events']
+        self.assertIn(str(self.pending.id), [e['ident'] for e in found])
+
+    def test_forms_do_not_list_related_tables(self):
+        for i in range(20):
+            Site.objects.create(domain='site{0}.edu'.format(i),
+                                fullname='Site {0}'.format(i))
+        for (name, args) in (('task_add', []),
+                             ('task_edit', [self.task.id]),
+                             ('event_add', []),
+                             ('event_edit', [self.event.id]),
+                             ('person_add', []),
+                             ('person_edit', [self.ron.id])):
+            response = self.assertQueryBudget(reverse(name, args=args))
+            self.assertContains(response, 'class="autocomplete"')
+            self.assertNotContains(response, 'site0.edu')
+            self.assertNotContains(response, self.hermione.username)
+
+    def test_edit_shows_identifiers(self):
+        response = self.client.get(reverse('task_edit', args=[self.task.id]))
+        self.assertContains(response, 'value="2015-01-01-alpha"')
+        self.assertContains(response, 'value="{0}"'.format(self.ron.username))
+        response = self.client.get(reverse('event_edit',
+                                           args=[self.event.id]))
+        self.assertContains(response, 'value="alpha.edu"')
+        response = self.client.get(reverse('person_edit', args=[self.ron.id]))
+        self.assertContains(response, 'value="{0}"'.format(
+            self.ron.airport.iata))
+
+    def test_task_by_event_ident(self):
+        url = reverse('task_edit', args=[self.task.id])
+        data = {'event': self.pending.id, 'person': self.ron.username,
+                'role': self.role.id}
+        self.assertEqual(self.client.post(url, data).status_code, 302)
+        self.assertEqual(Task.objects.get(id=self.task.id).event,
+                         self.pending)
+
+        data['event'] = '2015-01-01-alpha'
+        self.assertEqual(self.client.post(url, data).status_code, 302)
+        self.assertEqual(Task.objects.get(id=self.task.id).event, self.event)
+
+        data['event'] = '2015-01-01-nowhere'
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('event', response.context['form'].errors)
+
+    def test_event_organizer_by_domain(self):
+        response = self.client.post(
+            reverse('event_edit', args=[self.event.id]),
+            {'site': 'alpha.edu', 'organizer': 'beta.com',
+             'slug': self.event.slug, 'start': '2015-01-01',
+             'tags': [Tag.objects.create(name='SWC').id]})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Event.objects.get(id=self.event.id).organizer,
+                         self.site_beta)
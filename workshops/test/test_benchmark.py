@@ -0,0 +1,34 @@
+from django.test import TestCase
+from ..benchmark import data, timing
+from ..models import Airport, Event, Person, PersonStats, Site, Task
+
+
+class TestBenchmark(TestCase):
+    '''Test cases for the benchmark data generator and timing harness.'''
+
+    SIZES = {'airports': 10, 'sites': 5, 'people': 40, 'events': 20,
+             'tasks': 100}
+
+    def test_generate(self):
+        sizes = data.generate(self.SIZES)
+        self.assertEqual(sizes, self.SIZES)
+        self.assertEqual(Airport.objects.count(), 10)
+        self.assertEqual(Site.objects.count(), 5)
+        self.assertEqual(Person.objects.count(), 40)
+        self.assertEqual(Event.objects.count(), 20)
+        self.assertEqual(Task.objects.count(), 100)
+        self.assertEqual(PersonStats.objects.count(), 40)
+
+    def test_scaled(self):
+        sizes = data.scaled({'people': 1000}, scale=0.1)
+        self.assertEqual(sizes['people'], 100)
+        self.assertEqual(sizes['tasks'], data.SIZES['tasks'] // 10)
+
+    def test_run_and_compare(self):
+        data.generate(self.SIZES)
+        results = timing.run(['all_events', 'person_details'], repeat=1)
+        self.assertEqual(list(results), ['all_events', 'person_details'])
+        entry = timing.make_entry(self.SIZES, results)
+        rows = list(timing.compare(entry, entry))
+        self.assertEqual([r[0] for r in rows], ['all_events', 'person_details'])
+        self.assertTrue(all(r[3] == 1.0 for r in rows))
@@ -0,0 +1,43 @@
+from django.core.urlresolvers import reverse, set_script_prefix
+from django.template import Context, Template
+from django.test import TestCase
+from ..models import Person
+from ..templatetags import breadcrumbs
+
+
+class TestBreadcrumbs(TestCase):
+    '''Test cases for memoized breadcrumbs.'''
+
+    def _render(self, source, **context):
+        return Template('{% load breadcrumbs %}' + source) \
+            .render(Context(context))
+
+    def test_crumbs(self):
+        self.assertEqual(self._render('{% breadcrumb_main_page %}'),
+                         '<li><a href="{0}">Amy</a></li>'
+                         .format(reverse('index')))
+        self.assertEqual(
+            self._render('{% breadcrumb_index_all_objects model %}',
+                         model=Person),
+            '<li><a href="{0}">All persons</a></li>'
+            .format(reverse('all_persons')))
+
+    def test_memoized(self):
+        breadcrumbs._url_crumb.cache_clear()
+        for i in range(3):
+            self._render('{% breadcrumb_main_page %}'
+                         '{% breadcrumb_url "All Reports" "all_reports" %}')
+        info = breadcrumbs._url_crumb.cache_info()
+        self.assertEqual(info.misses, 2)
+        self.assertEqual(info.hits, 4)
+
+    def test_script_prefix_respected(self):
+        url = reverse('index')
+        try:
+            set_script_prefix('/amy/')
+            self.assertIn('href="/amy{0}"'.format(url),
+                          self._render('{% breadcrumb_main_page %}'))
+        finally:
+            set_script_prefix('/')
+        self.assertIn('href="{0}"'.format(url),
+                      self._render('{% breadcrumb_main_page %}'))
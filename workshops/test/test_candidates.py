@@ -0,0 +1,103 @@
+import datetime
+from unittest.mock import patch
+
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from ..models import Event, InstructorCandidate, Job, Role, Task
+from .base import TestBase, QueryBudgetMixin
+
+
+class TestInstructorCandidates(QueryBudgetMixin, TestBase):
+    '''Test cases for precomputed instructor candidates.'''
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+        self.instructor_role = Role.objects.create(name='instructor')
+        self.site_alpha.latitude, self.site_alpha.longitude = 0.0, 40.0
+        self.site_alpha.save()
+        self.today = datetime.date.today()
+        start = self.today + datetime.timedelta(days=30)
+        self.event = Event.objects.create(
+            site=self.site_alpha, slug='{0}-alpha'.format(start), start=start)
+
+    def _ranked(self, event=None):
+        return [c.person.personal for c in
+                InstructorCandidate.objects.filter(event=event or self.event)
+                                           .select_related('person')]
+
+    def _teach(self, person, times):
+        for i in range(times):
+            event = Event.objects.create(
+                site=self.site_beta, slug='past-{0}-{1}'.format(person.id, i),
+                start=self.today - datetime.timedelta(days=10 + i))
+            Task.objects.create(event=event, person=person,
+                                role=self.instructor_role)
+
+    def test_ranked_by_distance_and_skills(self):
+        self.assertEqual(InstructorCandidate.objects.refresh(self.event), 2)
+        # Ron may not be contacted
+        self.assertEqual(self._ranked(), ['Harry', 'Hermione'])
+
+    def test_recent_teaching_counts_against(self):
+        self._teach(self.harry, 20)
+        InstructorCandidate.objects.refresh(self.event)
+        self.assertEqual(self._ranked(), ['Hermione', 'Harry'])
+        harry = InstructorCandidate.objects.get(event=self.event,
+                                                person=self.harry)
+        self.assertEqual(harry.recent_load, 20)
+
+    def test_people_already_teaching_are_left_out(self):
+        Task.objects.create(event=self.event, person=self.harry,
+                            role=self.instructor_role)
+        InstructorCandidate.objects.refresh(self.event)
+        self.assertEqual(self._ranked(), ['Hermione'])
+
+    def test_refresh_upcoming(self):
+        start = self.today - datetime.timedelta(days=30)
+        past = Event.objects.create(
+            site=self.site_alpha, slug='{0}-alpha'.format(start), start=start)
+        InstructorCandidate.objects.refresh(past)
+        self.assertEqual(InstructorCandidate.objects.refresh_upcoming(), 1)
+        self.assertEqual(self._ranked(past), [])
+        self.assertEqual(self._ranked(), ['Harry', 'Hermione'])
+
+    def test_failed_refresh_keeps_candidates(self):
+        InstructorCandidate.objects.refresh(self.event)
+        with patch.object(InstructorCandidate.objects, 'bulk_create',
+                          side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                InstructorCandidate.objects.refresh(self.event)
+        self.assertEqual(self._ranked(), ['Harry', 'Hermione'])
+
+    def test_refresh_upcoming_does_not_list_event_ids(self):
+        with CaptureQueriesContext(connection) as captured:
+            InstructorCandidate.objects.refresh_upcoming()
+        stale = [q['sql'] for q in captured.captured_queries
+                 if '"workshops_instructorcandidate"."event_id" IN' in
+                    q['sql']]
+        self.assertTrue(stale)
+        for sql in stale:
+            self.assertIn('"event_id" IN (SELECT', sql)
+
+    def test_event_page_shows_candidates(self):
+        InstructorCandidate.objects.refresh(self.event)
+        response = self.assertQueryBudget(self.event.get_absolute_url())
+        self.assertEqual(
+            [c.person.personal for c in response.context['candidates']],
+            ['Harry', 'Hermione'])
+        self.assertContains(response, 'candidate_row', count=2)
+
+    def test_refresh_from_event_page(self):
+        url = reverse('event_candidates_refresh', args=[self.event.slug])
+        response = self.client.post(url)
+        self.assertRedirects(response, self.event.get_absolute_url())
+        self.assertEqual(Job.objects.get().kind, 'refresh_candidates')
+        self.assertEqual(self._ranked(), ['Harry', 'Hermione'])
+
+        # a second click reuses the job
+        self.client.post(url)
+        self.assertEqual(Job.objects.count(), 1)
+
+        self.assertEqual(self.client.get(url).status_code, 405)
@@ -0,0 +1,61 @@
+import os
+import runpy
+import tempfile
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase
+
+import amy.settings
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite-specific settings')
+class TestSQLiteConnection(TestCase):
+    '''Test cases for per-connection SQLite tuning.'''
+
+    def _pragma(self, conn, name):
+        cursor = conn.cursor()
+        cursor.execute('PRAGMA {0}'.format(name))
+        return cursor.fetchone()[0]
+
+    def test_busy_timeout(self):
+        self.assertEqual(self._pragma(connection, 'busy_timeout'), 20000)
+
+    def test_file_database_uses_wal(self):
+        handle, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        settings_dict = dict(connection.settings_dict, NAME=path)
+        conn = connections['default'].__class__(settings_dict,
+                                                alias='wal-test')
+        try:
+            self.assertEqual(self._pragma(conn, 'journal_mode'), 'wal')
+        finally:
+            conn.close()
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+
+class TestSessionSettings(SimpleTestCase):
+    '''Sessions must not live in a cache each process has its own of.'''
+
+    def _load(self, **environ):
+        with patch.dict(os.environ, environ):
+            for name in ('AMY_CACHE', 'AMY_SESSIONS'):
+                if name not in environ:
+                    os.environ.pop(name, None)
+            return runpy.run_path(amy.settings.__file__)
+
+    def test_default_follows_cache(self):
+        self.assertEqual(self._load()['SESSION_ENGINE'],
+                         'django.contrib.sessions.backends.db')
+        self.assertEqual(self._load(AMY_CACHE='file')['SESSION_ENGINE'],
+                         'django.contrib.sessions.backends.cached_db')
+
+    def test_cached_sessions_need_shared_cache(self):
+        for sessions in ('cached_db', 'cache'):
+            with self.assertRaises(ImproperlyConfigured):
+                self._load(AMY_CACHE='locmem', AMY_SESSIONS=sessions)
+        self._load(AMY_CACHE='memcached', AMY_SESSIONS='cache')
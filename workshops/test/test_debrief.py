@@ -0,0 +1,131 @@
+import datetime
+from unittest.mock import patch
+
+from django.core.urlresolvers import reverse
+from ..debrief import event_intervals, instructor_tasks
+from ..models import Event, Role, Task
+from .base import TestBase, QueryBudgetMixin
+
+
+class TestDebrief(QueryBudgetMixin, TestBase):
+    '''Test cases for the debrief listing.'''
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+
+        instructor = Role.objects.create(name='instructor')
+        learner = Role.objects.create(name='learner')
+        self.inside = Event.objects.create(site=self.site_alpha,
+                                           slug='2014-03-01-inside',
+                                           start=datetime.date(2014, 3, 1),
+                                           end=datetime.date(2014, 3, 2))
+        self.outside = Event.objects.create(site=self.site_beta,
+                                            slug='2014-09-01-outside',
+                                            start=datetime.date(2014, 9, 1),
+                                            end=datetime.date(2014, 9, 2))
+        Task.objects.create(event=self.inside, person=self.hermione,
+                            role=instructor)
+        Task.objects.create(event=self.inside, person=self.harry,
+                            role=instructor)
+        Task.objects.create(event=self.inside, person=self.spiderman,
+                            role=learner)
+        # Ron may not be contacted
+        Task.objects.create(event=self.inside, person=self.ron,
+                            role=instructor)
+        Task.objects.create(event=self.outside, person=self.ron,
+                            role=instructor)
+
+        self.range = {'begin_date': '2014-02-01', 'end_date': '2014-04-01'}
+
+    def test_debrief_lists_contactable_instructors(self):
+        response = self.client.post(reverse('debrief'), self.range)
+        self.assertEqual(response.status_code, 200)
+        tasks = response.context['all_tasks']
+        self.assertEqual({t.person for t in tasks},
+                         {self.hermione, self.harry})
+
+    def test_debrief_csv(self):
+        data = dict(self.range, csv='Download CSV')
+        response = self.client.post(reverse('debrief'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['content-type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode('utf-8') \
+                   .splitlines()
+        self.assertEqual(lines[0], 'event,start,end,personal,middle,family,email')
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(all(l.startswith('2014-03-01-inside,') for l in lines[1:]))
+
+    def test_debrief_query_budget(self):
+        self.assertQueryBudget(reverse('debrief'), method='post',
+                               data=self.range)
+
+    def test_debrief_rejects_bad_dates(self):
+        for data in ({'begin_date': '2014-02-30', 'end_date': '2014-04-01'},
+                     {'begin_date': 'last week', 'end_date': '2014-04-01'},
+                     {'begin_date': '2014-04-01', 'end_date': '2014-02-01'}):
+            response = self.client.post(reverse('debrief'), data)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.context['form'].is_valid())
+            self.assertIsNone(response.context['all_tasks'])
+
+
+class TestEventIntervals(TestBase):
+    '''Test cases for finding events that overlap a date range.'''
+
+    def setUp(self):
+        super().setUp()
+        self.events = {}
+        for (slug, start, end) in (('short', (2014, 3, 1), (2014, 3, 2)),
+                                   ('long', (2014, 1, 1), (2014, 6, 30)),
+                                   ('later', (2014, 9, 1), (2014, 9, 2)),
+                                   ('undated', None, None)):
+            self.events[slug] = Event.objects.create(
+                site=self.site_alpha, slug=slug,
+                start=start and datetime.date(*start),
+                end=end and datetime.date(*end))
+
+    def _overlapping(self, begin, end):
+        return {Event.objects.get(id=i).slug
+                for i in event_intervals.overlapping(datetime.date(*begin),
+                                                     datetime.date(*end))}
+
+    def test_overlapping(self):
+        self.assertEqual(self._overlapping((2014, 3, 2), (2014, 3, 2)),
+                         {'short', 'long'})
+        self.assertEqual(self._overlapping((2014, 4, 1), (2014, 8, 31)),
+                         {'long'})
+        self.assertEqual(self._overlapping((2014, 6, 30), (2014, 9, 1)),
+                         {'long', 'later'})
+        self.assertEqual(self._overlapping((2015, 1, 1), (2015, 12, 31)),
+                         set())
+
+    def test_index_follows_changes(self):
+        self.assertEqual(self._overlapping((2014, 9, 2), (2014, 9, 30)),
+                         {'later'})
+        later = self.events['later']
+        later.end = datetime.date(2014, 9, 1)
+        later.save()
+        self.assertEqual(self._overlapping((2014, 9, 2), (2014, 9, 30)),
+                         set())
+        self.events['long'].delete()
+        self.assertEqual(self._overlapping((2014, 4, 1), (2014, 8, 31)),
+                         set())
+
+    def test_many_events_filter_on_dates(self):
+        instructor = Role.objects.create(name='instructor')
+        for event in self.events.values():
+            Task.objects.create(event=event, person=self.hermione,
+                                role=instructor)
+        begin, end = datetime.date(2014, 3, 1), datetime.date(2014, 9, 1)
+        expected = list(instructor_tasks(begin, end))
+        self.assertEqual({t.event.slug for t in expected},
+                         {'short', 'long', 'later'})
+        with patch('workshops.debrief.MAX_EVENT_IDS', 1):
+            self.assertEqual(list(instructor_tasks(begin, end)), expected)
+
+    def test_empty_range(self):
+        with self.assertRaises(ValueError):
+            instructor_tasks(datetime.date(2014, 2, 1),
+                             datetime.date(2014, 1, 1))
@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+
+from .. import distances
+from ..distances import airport_distances
+from ..models import Airport, Job
+from ..util import earth_distance
+from .base import TestBase
+
+
+@skipIf(distances.numpy is None, 'numpy is not installed')
+class TestAirportDistances(TestBase):
+    '''Test cases for precomputed distances between airports.'''
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.path = os.path.join(tmp_dir, 'distances.npy')
+        use_file = override_settings(AIRPORT_DISTANCES=self.path)
+        use_file.enable()
+        self.addCleanup(use_file.disable)
+
+    def _expected(self, airport, others):
+        return [earth_distance((airport.latitude, airport.longitude),
+                               (a.latitude, a.longitude)) for a in others]
+
+    def assertDistances(self, airport, others):
+        found = airport_distances.between(airport.id, [a.id for a in others])
+        for (f, e) in zip(found, self._expected(airport, others)):
+            self.assertAlmostEqual(f, e, delta=0.5)
+
+    def test_no_file(self):
+        self.assertIsNone(airport_distances.between(self.airport_0_0.id,
+                                                    [self.airport_0_50.id]))
+
+    def test_build(self):
+        self.assertEqual(distances.build(), 4)
+        airports = list(Airport.objects.all())
+        for airport in airports:
+            self.assertDistances(airport, airports)
+        self.assertEqual(airport_distances.between(self.airport_0_0.id,
+                                                   [self.airport_0_0.id]),
+                         [0.0])
+
+    def test_unknown_airport(self):
+        distances.build()
+        self.assertIsNone(airport_distances.between(self.airport_0_0.id,
+                                                    [0]))
+
+    def test_moved_airport_is_updated(self):
+        distances.build()
+        self.airport_0_50.latitude = 10.0
+        self.airport_0_50.save()
+        airports = list(Airport.objects.all())
+        self.assertDistances(self.airport_0_50, airports)
+        self.assertDistances(self.airport_0_0, airports)
+
+    def test_new_airport_uses_spare_slot(self):
+        distances.build(spare=1)
+        size = os.path.getsize(self.path)
+        first = Airport.objects.create(iata='EEE', fullname='Airport 20x20',
+                                       country='Egypt',
+                                       latitude=20.0, longitude=20.0)
+        self.assertEqual(os.path.getsize(self.path), size)
+        self.assertDistances(first, list(Airport.objects.all()))
+
+        # no room left: a job rebuilds the file (at once, in tests)
+        second = Airport.objects.create(iata='FFF', fullname='Airport 30x30',
+                                        country='France',
+                                        latitude=30.0, longitude=30.0)
+        rebuild = Job.objects.get(kind='build_airport_distances')
+        self.assertEqual(rebuild.status, Job.DONE)
+        self.assertGreater(os.path.getsize(self.path), size)
+        self.assertDistances(second, list(Airport.objects.all()))
+
+    def test_writers_hold_lock(self):
+        distances.build()
+        with patch('workshops.distances.fcntl.flock') as flock:
+            self.airport_0_50.latitude = 10.0
+            self.airport_0_50.save()
+            self.airport_50_100.delete()
+        self.assertEqual([c[0][1] for c in flock.call_args_list],
+                         [distances.fcntl.LOCK_EX, distances.fcntl.LOCK_UN] * 2)
+        self.assertTrue(os.path.exists(self.path + '.lock'))
+
+    def test_deleted_airport_is_removed(self):
+        distances.build()
+        airport_id = self.airport_50_100.id
+        self.airport_50_100.delete()
+        self.assertIsNone(airport_distances.between(self.airport_0_0.id,
+                                                    [airport_id]))
+
+    def test_instructor_search_uses_file(self):
+        distances.build()
+        with patch('workshops.views.earth_distance') as computed:
+            response = self.client.post(reverse('instructors'),
+                                        {'airport': self.airport_0_0.iata,
+                                         'wanted': 2})
+        self.assertFalse(computed.called)
+        self.assertEqual([p.personal for p in response.context['persons']],
+                         ['Hermione', 'Harry'])
@@ -200,7 +200,7 @@ class TestEventViews(TestBase):
             reverse('event_add'),
             {
                 'published': False,
-                'site': site.id,
+                'site': site.domain,
                 'tags': [tag.id],
             })
         if response.status_code == 302:
@@ -225,7 +225,7 @@ class TestEventViews(TestBase):
         url = reverse('event_add')
         data = {
                 'published': False,
-                'site': site.id,
+                'site': site.domain,
                 'tags': [tag.id],
             }
         response = self.client.post(url, data)
@@ -0,0 +1,107 @@
+import datetime
+from unittest.mock import patch
+
+from django.core.urlresolvers import reverse
+from ..models import Airport, Event, SiteAirport
+from .base import TestBase, QueryBudgetMixin
+
+
+class TestNearestAirports(TestBase):
+    '''Test cases for the precomputed nearest airports of sites.'''
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch('workshops.models.NEAREST_AIRPORTS', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _nearest(self, site):
+        return list(SiteAirport.objects.filter(site=site)
+                                       .values_list('airport__iata', flat=True))
+
+    def _locate(self, site, latitude, longitude):
+        site.latitude, site.longitude = latitude, longitude
+        site.save()
+
+    def test_site_without_location(self):
+        self.assertEqual(self._nearest(self.site_alpha), [])
+
+    def test_located_site(self):
+        self._locate(self.site_alpha, 1.0, 1.0)
+        self.assertEqual(self._nearest(self.site_alpha), ['AAA', 'BBB'])
+        self._locate(self.site_alpha, 52.0, 102.0)
+        self.assertEqual(self._nearest(self.site_alpha), ['CCC', 'DDD'])
+
+    def test_other_changes_do_not_recompute(self):
+        self._locate(self.site_alpha, 1.0, 1.0)
+        self.site_alpha.notes = 'Changed'
+        with self.assertNumQueries(2):  # the old location, then the update
+            self.site_alpha.save()
+
+    def test_new_and_moved_airports(self):
+        self._locate(self.site_alpha, 1.0, 1.0)
+        self._locate(self.site_beta, 52.0, 102.0)
+
+        Airport.objects.create(iata='EEE', fullname='Airport 1x2',
+                               country='Estonia', latitude=1.0, longitude=2.0)
+        self.assertEqual(self._nearest(self.site_alpha), ['EEE', 'AAA'])
+        self.assertEqual(self._nearest(self.site_beta), ['CCC', 'DDD'])
+
+        self.airport_0_0.latitude, self.airport_0_0.longitude = 51.0, 101.0
+        self.airport_0_0.save()
+        self.assertEqual(self._nearest(self.site_alpha), ['EEE', 'BBB'])
+        self.assertEqual(self._nearest(self.site_beta), ['AAA', 'CCC'])
+
+    def test_deleted_airport(self):
+        self._locate(self.site_alpha, 1.0, 1.0)
+        self.airport_0_0.delete()
+        self.assertEqual(self._nearest(self.site_alpha), ['BBB', 'CCC'])
+
+    def test_rebuild(self):
+        self._locate(self.site_alpha, 1.0, 1.0)
+        SiteAirport.objects.all().delete()
+        SiteAirport.objects.rebuild()
+        self.assertEqual(self._nearest(self.site_alpha), ['AAA', 'BBB'])
+
+
+class TestEventStaff(QueryBudgetMixin, TestBase):
+    '''Test cases for finding instructors near an event.'''
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+        self.site_alpha.latitude, self.site_alpha.longitude = 0.0, 40.0
+        self.site_alpha.save()
+        self.event = Event.objects.create(site=self.site_alpha,
+                                          slug='2015-01-01-alpha',
+                                          start=datetime.date(2015, 1, 1))
+        self.url = reverse('event_staff', args=[self.event.get_ident()])
+
+    def _names(self, response):
+        return [p.personal for (_, p) in response.context['persons']]
+
+    def test_nearest_first(self):
+        response = self.client.get(self.url)
+        self.assertEqual(self._names(response), ['Harry', 'Hermione', 'Ron'])
+
+    def test_filter_by_skill(self):
+        response = self.client.get(self.url, {'skill': ['Git']})
+        self.assertEqual(self._names(response), ['Hermione', 'Ron'])
+        response = self.client.get(self.url, {'skill': ['Git', 'SQL']})
+        self.assertEqual(self._names(response), ['Hermione'])
+
+    def test_site_without_location(self):
+        event = Event.objects.create(site=self.site_beta,
+                                     slug='2015-02-01-beta',
+                                     start=datetime.date(2015, 2, 1))
+        response = self.client.get(reverse('event_staff',
+                                           args=[event.get_ident()]))
+        self.assertFalse(response.context['located'])
+        self.assertContains(response, 'is not known')
+
+    def test_linked_from_event(self):
+        response = self.client.get(self.event.get_absolute_url())
+        self.assertContains(response, self.url)
+
+    def test_query_budget(self):
+        self.assertQueryBudget(self.url)
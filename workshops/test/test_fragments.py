@@ -0,0 +1,75 @@
+import datetime
+
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from ..models import Event, Site, Tag
+from .base import TestBase
+
+
+class TestFragmentCaching(TestBase):
+    '''Test cases for cached fragments of read-mostly pages.'''
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+
+    def _content(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode('utf-8')
+
+    def test_cached_pages_skip_queries(self):
+        url = reverse('all_airports')
+        self._content(url)
+        with CaptureQueriesContext(connection) as queries:
+            self._content(url)
+        self.assertFalse([q for q in queries.captured_queries
+                          if 'workshops_airport' in q['sql']])
+
+    def test_all_sites_follows_changes(self):
+        url = reverse('all_sites')
+        self.assertIn('Alpha Site', self._content(url))
+        self.site_alpha.fullname = 'Renamed Site'
+        self.site_alpha.save()
+        content = self._content(url)
+        self.assertIn('Renamed Site', content)
+        self.assertNotIn('Alpha Site', content)
+        Site.objects.create(domain='gamma.edu', fullname='Gamma Site')
+        self.assertIn('Gamma Site', self._content(url))
+
+    def test_all_sites_varies_on_page_size(self):
+        url = reverse('all_sites')
+        count = Site.objects.count()
+        self.assertIn('Page 1 of {0}.'.format(count),
+                      self._content(url + '?items_per_page=1'))
+        self.assertIn('Page 1 of 1.', self._content(url))
+
+    def test_site_details_follows_events_and_tags(self):
+        url = reverse('site_details', args=[self.site_alpha.domain])
+        self.assertNotIn('2015-01-01-cached', self._content(url))
+        event = Event.objects.create(site=self.site_alpha,
+                                     slug='2015-01-01-cached',
+                                     start=datetime.date(2015, 1, 1))
+        self.assertIn('2015-01-01-cached', self._content(url))
+
+        tag = Tag.objects.create(name='SWC', details='')
+        event.tags.add(tag)
+        self.assertIn('SWC', self._content(url))
+        tag.name = 'DC'
+        tag.save()
+        self.assertIn('DC', self._content(url))
+
+        event.site = self.site_beta
+        event.save()
+        self.assertNotIn('2015-01-01-cached', self._content(url))
+
+    def test_airport_pages_follow_changes(self):
+        details = reverse('airport_details', args=[self.airport_0_0.iata])
+        listing = reverse('all_airports')
+        self._content(details)
+        self._content(listing)
+        self.airport_0_0.fullname = 'Renamed Airport'
+        self.airport_0_0.save()
+        self.assertIn('Renamed Airport', self._content(details))
+        self.assertIn('Renamed Airport', self._content(listing))
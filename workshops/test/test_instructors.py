@@ -1,4 +1,7 @@
+import json
+
 from django.core.urlresolvers import reverse
+from ..models import Airport
 from .base import TestBase
 
 
@@ -83,6 +86,22 @@ class TestLocateInstructors(TestBase):
                           'Expected 1 matching instructor')
         self._check_person(row, 0, 'Hermione', 'Granger')
 
+    def test_airports_not_listed_in_form(self):
+        response = self.client.get(reverse('instructors'))
+        doc = self._check_status_code_and_parse(response, 200)
+        self._get_1(doc, ".//input[@name='airport']",
+                    'Expected a text box for the airport')
+        self._get_N(doc, ".//select[@name='airport']",
+                    'Expected no list of airports', expected=0)
+
+    def test_unknown_airport_rejected(self):
+        response = self.client.post(reverse('instructors'),
+                                    {'airport' : 'XXX',
+                                     'wanted' : 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('airport', response.context['form'].errors)
+        self.assertIsNone(response.context['persons'])
+
     def _check_person(self, row, which, personal_name, family_name):
         personal_node = self._get_1(row, ".//td[@id='instructor_personal_{0}']".format(which),
                                     'Expected a first name')
@@ -90,3 +109,38 @@ class TestLocateInstructors(TestBase):
                                   'Expected a last name')
         assert (personal_node.text == personal_name) and (family_node.text == family_name), \
             'Expected instructor to be Hermione Granger, not "{0} {1}"'.format(personal_node.text, family_node.text)
+
+
+class TestAirportSearch(TestBase):
+    '''Test cases for airport autocompletion.'''
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+        Airport.objects.create(iata='LHR', fullname='London Heathrow',
+                               country='GB', latitude=51.5, longitude=-0.5)
+        Airport.objects.create(iata='LGW', fullname='London Gatwick',
+                               country='GB', latitude=51.1, longitude=-0.2)
+        Airport.objects.create(iata='LON', fullname='Alternative London',
+                               country='GB', latitude=51.0, longitude=0.0)
+
+    def _search(self, term):
+        response = self.client.get(reverse('airport_search'), {'term': term})
+        self.assertEqual(response.status_code, 200)
+        return [a['iata'] for a in
+                json.loads(response.content.decode('utf-8'))['airports']]
+
+    def test_code_prefix(self):
+        self.assertEqual(self._search('lh'), ['LHR'])
+
+    def test_code_matches_before_name_matches(self):
+        self.assertEqual(self._search('lon'), ['LON', 'LGW', 'LHR'])
+
+    def test_no_match(self):
+        self.assertEqual(self._search('zzz'), [])
+        self.assertEqual(self._search(''), [])
+
+    def test_follows_changes(self):
+        self.assertEqual(self._search('lh'), ['LHR'])
+        Airport.objects.filter(iata='LHR').delete()
+        self.assertEqual(self._search('lh'), [])
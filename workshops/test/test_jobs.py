@@ -0,0 +1,210 @@
+import datetime
+
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.urlresolvers import reverse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from .. import jobs, views
+from ..models import Event, Job
+from .base import TestBase
+
+
+class TestJobs(TestBase):
+    '''Test cases for the background job queue.'''
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+        self.calls = []
+
+        def flaky(fail_times):
+            self.calls.append(fail_times)
+            if len(self.calls) <= fail_times:
+                raise ValueError('Attempt {0} failed'.format(len(self.calls)))
+            return {'message': 'Done after {0}'.format(len(self.calls))}
+
+        def hopeless():
+            self.calls.append(None)
+            raise jobs.PermanentFailure('Cannot be done')
+
+        jobs.job('test_flaky', max_attempts=3)(flaky)
+        jobs.job('test_hopeless', max_attempts=3)(hopeless)
+        self.addCleanup(jobs.JOBS.pop, 'test_flaky')
+        self.addCleanup(jobs.JOBS.pop, 'test_hopeless')
+
+    def test_eager_job_runs_at_once(self):
+        job = jobs.enqueue('test_flaky', fail_times=0)
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.get_result(), {'message': 'Done after 1'})
+
+    def test_failed_attempts_are_retried(self):
+        with self.assertLogs('workshops.jobs', 'WARNING'):
+            job = jobs.enqueue('test_flaky', fail_times=2)
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 3)
+        self.assertEqual(job.error, '')
+
+    def test_job_fails_when_attempts_run_out(self):
+        with self.assertLogs('workshops.jobs', 'WARNING') as logs:
+            job = jobs.enqueue('test_flaky', fail_times=5)
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(len(self.calls), 3)
+        self.assertTrue(job.crashed)
+        self.assertIn('Attempt 3 failed', job.error)
+        # the traceback is logged too
+        self.assertIn('Traceback', logs.output[-1])
+
+    def test_permanent_failure_is_not_retried(self):
+        with self.assertLogs('workshops.jobs', 'ERROR'):
+            job = jobs.enqueue('test_hopeless')
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.error, 'Cannot be done')
+        self.assertFalse(job.crashed)
+
+    @override_settings(JOBS_EAGER=False, JOBS_RETRY_DELAY=0)
+    def test_inline_worker(self):
+        job = jobs.enqueue('test_flaky', fail_times=1)
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(self.calls, [])
+
+        with self.assertLogs('workshops.jobs', 'WARNING'):
+            jobs.work(mode='inline', once=True)
+
+        job = Job.objects.get(id=job.id)
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 2)
+
+    def test_worker_needs_shared_cache(self):
+        # the tests use a cache in local memory
+        with self.assertRaises(CommandError):
+            call_command('run_jobs', once=True)
+
+    @override_settings(JOBS_EAGER=False)
+    def test_retry_waits(self):
+        job = jobs.enqueue('test_flaky', fail_times=1)
+        with self.assertLogs('workshops.jobs', 'WARNING'):
+            jobs.work(mode='inline', once=True)
+        job = Job.objects.get(id=job.id)
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIsNone(jobs.claim_next())
+
+    @override_settings(JOBS_EAGER=False)
+    def test_job_is_claimed_once(self):
+        job = jobs.enqueue('test_flaky', fail_times=0)
+        self.assertEqual(jobs.claim_next().id, job.id)
+        self.assertIsNone(jobs.claim_next())
+
+    @override_settings(JOBS_EAGER=False)
+    def test_stale_jobs_are_requeued(self):
+        job = jobs.enqueue('test_flaky', fail_times=0)
+        hopeless = jobs.enqueue('test_hopeless')
+        Job.objects.update(status=Job.RUNNING, attempts=3,
+                           started=timezone.now() - datetime.timedelta(hours=2))
+        Job.objects.filter(id=job.id).update(attempts=1)
+
+        self.assertEqual(jobs.requeue_stale(60 * 60), 1)
+        self.assertEqual(Job.objects.get(id=job.id).status, Job.QUEUED)
+        self.assertEqual(Job.objects.get(id=hopeless.id).status, Job.FAILED)
+
+    def test_unknown_kind_fails(self):
+        job = Job.objects.create(kind='no_such_job')
+        self.assertTrue(jobs._claim(job.id))
+        with self.assertLogs('workshops.jobs', 'ERROR'):
+            job = jobs.run(Job.objects.get(id=job.id))
+        self.assertEqual(job.status, Job.FAILED)
+
+    @override_settings(JOBS_EAGER=False)
+    def test_enqueue_once_reuses_jobs(self):
+        job = jobs.enqueue_once('test_flaky', fail_times=0)
+        self.assertEqual(jobs.enqueue_once('test_flaky', fail_times=0), job)
+        self.assertNotEqual(jobs.enqueue_once('test_flaky', fail_times=1),
+                            job)
+
+        jobs.work(mode='inline', once=True)
+        self.assertEqual(jobs.enqueue_once('test_flaky', fail_times=0), job)
+        Job.objects.filter(id=job.id).update(
+            finished=timezone.now() - datetime.timedelta(hours=1))
+        self.assertNotEqual(jobs.enqueue_once('test_flaky', fail_times=0),
+                            job)
+
+    def test_old_jobs_are_pruned(self):
+        old = jobs.enqueue('test_flaky', fail_times=0)
+        new = jobs.enqueue('test_flaky', fail_times=0)
+        Job.objects.filter(id=old.id).update(
+            finished=timezone.now() - datetime.timedelta(days=2))
+        call_command('prune_jobs', max_age=24 * 60 * 60)
+        self.assertEqual(list(Job.objects.all()), [new])
+
+    def test_crash_details_stay_on_job_page(self):
+        with self.assertLogs('workshops.jobs', 'WARNING'):
+            job = jobs.enqueue('test_flaky', fail_times=5)
+        request = RequestFactory().get('/')
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        response = views._job_response(request, job, 'index')
+        self.assertEqual(response['location'], job.get_absolute_url())
+        self.assertEqual([str(m) for m in request._messages],
+                         ['Sorry, your request failed.'])
+
+    def test_tracebacks_only_for_superusers(self):
+        with self.assertLogs('workshops.jobs', 'WARNING'):
+            job = jobs.enqueue('test_flaky', fail_times=5)
+        response = self.client.get(job.get_absolute_url())
+        self.assertContains(response, 'Traceback')
+
+        self.ron.set_password('ron')
+        self.ron.save()
+        self.client.logout()
+        self.client.login(username=self.ron.username, password='ron')
+        response = self.client.get(job.get_absolute_url())
+        self.assertNotContains(response, 'Traceback')
+        self.assertContains(response, 'failed unexpectedly')
+        with self.settings(DEBUG=True):
+            response = self.client.get(job.get_absolute_url())
+        self.assertContains(response, 'Traceback')
+
+    @override_settings(JOBS_EAGER=False)
+    def test_job_pages(self):
+        job = jobs.enqueue('test_flaky', person=self.admin, fail_times=0)
+        response = self.client.get(reverse('all_jobs'))
+        self.assertContains(response, job.get_absolute_url())
+
+        response = self.client.get(job.get_absolute_url())
+        self.assertContains(response, 'reloads until the job has finished')
+
+        jobs.work(mode='inline', once=True)
+        response = self.client.get(job.get_absolute_url())
+        self.assertContains(response, 'Done after 1')
+        self.assertNotContains(response, 'reloads until')
+
+    def test_export_runs_as_job(self):
+        response = self.client.get(reverse('export', args=['badges']))
+        job = Job.objects.get(kind='export')
+        self.assertRedirects(response, job.get_absolute_url())
+        self.assertEqual(job.get_result()['title'], 'Badges')
+        # reloading shows the same export
+        response = self.client.get(reverse('export', args=['badges']))
+        self.assertRedirects(response, job.get_absolute_url())
+
+        response = self.client.get(job.get_absolute_url())
+        self.assertContains(response, 'instructor')
+
+    def test_validate_event_without_url(self):
+        event = Event.objects.create(site=self.site_alpha,
+                                     slug='2015-01-01-alpha',
+                                     start=datetime.date(2015, 1, 1))
+        response = self.client.get(reverse('validate_event',
+                                           args=[event.get_ident()]))
+        job = Job.objects.get(kind='validate_event')
+        self.assertRedirects(response, job.get_absolute_url())
+
+        response = self.client.get(job.get_absolute_url())
+        self.assertContains(response, 'No valid URL in event record.')
+        self.assertContains(response, event.get_absolute_url())
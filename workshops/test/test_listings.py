@@ -0,0 +1,76 @@
+import datetime
+from unittest.mock import patch
+
+from django.core.urlresolvers import reverse
+from .. import listings
+from ..models import Event, Person, Role, Task
+from .base import TestBase
+
+
+class TestStreamedListings(TestBase):
+    '''Test cases for listings shown in full.'''
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+        role = Role.objects.create(name='instructor')
+        event = Event.objects.create(site=self.site_alpha,
+                                     slug='2015-01-01-alpha',
+                                     start=datetime.date(2015, 1, 1))
+        for person in (self.hermione, self.harry, self.ron):
+            Task.objects.create(event=event, person=person, role=role)
+
+    def _content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def _paged(self, name):
+        return self.client.get(reverse(name)).content.decode('utf-8')
+
+    def _streamed(self, name):
+        return self._content(self.client.get(reverse(name),
+                                             {'items_per_page': 'all'}))
+
+    def test_rows_render_like_model_instances(self):
+        task = Task.objects.for_listing().get(person=self.ron)
+        row = listings.TASKS.make_row(
+            Task.objects.filter(id=task.id)
+                        .values_list(*listings.TASKS.fields)[0])
+        self.assertEqual(str(row), str(task))
+        self.assertEqual(str(row.person), str(self.ron))
+        self.assertEqual(row.get_absolute_url(), task.get_absolute_url())
+
+    def test_all_persons(self):
+        # fewer than a page, so the rows are the same either way
+        paged, streamed = self._paged('all_persons'), \
+                          self._streamed('all_persons')
+        for person in Person.objects.all():
+            self.assertIn(reverse('person_details', args=[person.id]),
+                          streamed)
+        self.assertIn('Page 1 of 1', paged)
+        self.assertNotIn('Page', streamed)
+        self.assertEqual(paged.split('<table', 1)[1].split('</table>')[0],
+                         streamed.split('<table', 1)[1].split('</table>')[0])
+
+    def test_all_tasks(self):
+        content = self._streamed('all_tasks')
+        for task in Task.objects.all():
+            self.assertIn(reverse('task_details', args=[task.id]), content)
+        self.assertIn(str(self.hermione).replace('<', '&lt;')
+                                        .replace('>', '&gt;'), content)
+
+    def test_rendered_in_chunks(self):
+        with patch('workshops.listings.CHUNK_ROWS', 2):
+            chunks = list(listings.StreamedRows(listings.PERSONS,
+                                                Person.objects.all())
+                                  .chunks())
+        count = Person.objects.count()
+        self.assertEqual(len(chunks), (count + 1) // 2)
+        self.assertEqual(sum(c.count('<tr>') for c in chunks), count)
+
+    def test_nothing_to_list(self):
+        Task.objects.all().delete()
+        response = self.client.get(reverse('all_tasks'),
+                                   {'items_per_page': 'all'})
+        self.assertFalse(response.streaming)
+        self.assertContains(response, 'No tasks.')
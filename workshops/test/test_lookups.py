@@ -0,0 +1,175 @@
+import json
+
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.db import IntegrityError, transaction
+from ..lookups import roles, skills, badges, qualifications, persons
+from ..models import Event, Person, Qualification, Role
+from ..util import merge_model_objects, verify_upload_person_task
+from .base import TestBase
+
+
+class TestLookups(TestBase):
+    '''Test cases for the cached reference tables.'''
+
+    def setUp(self):
+        super().setUp()
+        self.instructor = Role.objects.create(name='instructor')
+        self.helper = Role.objects.create(name='helper')
+
+    def test_get_by_name_and_id(self):
+        self.assertEqual(roles.get(name='instructor'), self.instructor)
+        self.assertEqual(roles.get(id=self.helper.id), self.helper)
+        self.assertEqual(roles.ids('helper'), [self.helper.id])
+        self.assertEqual(badges.get(name='hero'), self.hero)
+
+    def test_loaded_once(self):
+        roles.all()
+        with self.assertNumQueries(0):
+            roles.get(name='instructor')
+            roles.ids('helper')
+            roles.all()
+
+    def test_missing_and_duplicate_names(self):
+        with self.assertRaises(Role.DoesNotExist):
+            roles.get(name='learner')
+        self.assertEqual(roles.ids('learner'), [])
+        Role.objects.create(name='helper')
+        with self.assertRaises(Role.MultipleObjectsReturned):
+            roles.get(name='helper')
+        self.assertEqual(len(roles.ids('helper')), 2)
+
+    def test_invalidated_by_signals(self):
+        self.assertEqual([s.name for s in skills.all()], ['Git', 'SQL'])
+        self.git.name = 'Mercurial'
+        self.git.save()
+        self.assertEqual([s.name for s in skills.all()], ['Mercurial', 'SQL'])
+        self.sql.delete()
+        self.assertEqual([s.name for s in skills.all()], ['Mercurial'])
+
+    def test_invalidated_by_other_process(self):
+        roles.all()
+        # another process can only reach us through the shared cache
+        Role.objects.filter(id=self.helper.id).update(name='assistant')
+        cache.set(roles.version_key, 'changed elsewhere', timeout=None)
+        self.assertEqual(roles.ids('assistant'), [self.helper.id])
+
+    def test_miss_reloads(self):
+        roles.all()
+        Role.objects.bulk_create([Role(name='learner')])
+        self.assertEqual(roles.get(name='learner').name, 'learner')
+
+    def test_repeated_miss_reloads_once(self):
+        with self.assertRaises(Role.DoesNotExist):
+            roles.get(name='learner')
+        with self.assertNumQueries(0):
+            self.assertEqual(roles.ids('learner'), [])
+            with self.assertRaises(Role.DoesNotExist):
+                roles.get(name='learner')
+        # a new version is searched again
+        Role.objects.create(name='learner')
+        self.assertEqual(roles.get(name='learner').name, 'learner')
+
+    def test_upload_verification_uses_cache(self):
+        Event.objects.create(site=self.site_alpha, slug='test-event')
+        data = [{'personal': 'Ann', 'middle': None, 'family': 'Other',
+                 'email': 'ann{0}@example.org'.format(i),
+                 'event': 'test-event', 'role': 'instructor'}
+                for i in range(5)]
+        roles.all()
+        # one event lookup and one person lookup per row, no role lookups
+        with self.assertNumQueries(10):
+            self.assertFalse(verify_upload_person_task(data))
+
+
+class TestQualificationIndex(TestBase):
+    '''Test cases for the skill bitmask index.'''
+
+    def test_person_ids(self):
+        self.assertEqual(qualifications.person_ids([self.git]),
+                         {self.hermione.id, self.ron.id})
+        self.assertEqual(qualifications.person_ids([self.git, self.sql]),
+                         {self.hermione.id})
+        self.assertEqual(qualifications.person_ids([self.sql.id]),
+                         {self.hermione.id, self.harry.id})
+        self.assertEqual(qualifications.person_ids([]),
+                         {self.hermione.id, self.harry.id, self.ron.id})
+
+    def test_loaded_once(self):
+        qualifications.person_ids([self.git])
+        with self.assertNumQueries(0):
+            qualifications.person_ids([self.sql])
+
+    def test_invalidated_by_signals(self):
+        self.assertEqual(qualifications.person_ids([self.git, self.sql]),
+                         {self.hermione.id})
+        Qualification.objects.create(person=self.ron, skill=self.sql)
+        self.assertEqual(qualifications.person_ids([self.git, self.sql]),
+                         {self.hermione.id, self.ron.id})
+        Qualification.objects.filter(person=self.hermione,
+                                     skill=self.git).delete()
+        self.assertEqual(qualifications.person_ids([self.git, self.sql]),
+                         {self.ron.id})
+
+    def test_unique(self):
+        self.assertEqual(Qualification.objects.dedupe(), 0)
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Qualification.objects.create(person=self.ron,
+                                             skill=self.git)
+
+    def test_merge_keeps_one_qualification(self):
+        merge_model_objects(self.hermione, [self.ron])
+        self.assertEqual(
+            sorted(Qualification.objects.filter(person=self.hermione)
+                                        .values_list('skill__name', flat=True)),
+            ['Git', 'SQL'])
+        self.assertEqual(qualifications.person_ids([self.git]),
+                         {self.hermione.id})
+
+
+class TestPersonIndex(TestBase):
+    '''Test cases for the trigram index of persons.'''
+
+    def _search(self, term):
+        return [p.username for p in persons.search(term)]
+
+    def test_names_email_and_github(self):
+        self.assertEqual(self._search('Granger')[0], self.hermione.username)
+        self.assertEqual(self._search('hogwarts')[0], self.harry.username)
+        self.assertEqual(self._search('benreilly')[0], self.benreilly.username)
+
+    def test_misspelled(self):
+        self.assertEqual(self._search('Hermoine Grnager')[0],
+                         self.hermione.username)
+        self.assertEqual(self._search('weasly')[0], self.ron.username)
+
+    def test_no_match(self):
+        self.assertEqual(self._search('zzzz'), [])
+        self.assertEqual(self._search(''), [])
+
+    def test_loaded_once(self):
+        persons.search('Harry')
+        with self.assertNumQueries(0):
+            persons.search('Ron')
+
+    def test_follows_changes(self):
+        self.ron.family = 'Granger'
+        self.ron.save()
+        self.assertIn(self.ron.username, self._search('Granger'))
+        self.hermione.delete()
+        self.assertEqual(self._search('Hermione'), [])
+
+    def test_login_does_not_rebuild(self):
+        persons.search('Harry')
+        self.harry.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            persons.search('Ron')
+
+    def test_search_view(self):
+        self._setUpUsersAndLogin()
+        response = self.client.get(reverse('person_search'),
+                                   {'term': 'hermione'})
+        found = json.loads(response.content.decode('utf-8'))['persons']
+        self.assertEqual(found[0]['username'], self.hermione.username)
+        self.assertEqual(found[0]['label'], str(self.hermione))
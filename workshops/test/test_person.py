@@ -1,7 +1,9 @@
 import cgi
+import datetime
+from unittest.mock import patch
 from django.core.urlresolvers import reverse
-from ..models import Person, Award
-from .base import TestBase
+from ..models import Person, Award, Event, Role, Task
+from .base import TestBase, QueryBudgetMixin
 
 
 class TestPerson(TestBase):
@@ -21,6 +23,46 @@ class TestPerson(TestBase):
         doc = self._check_status_code_and_parse(response, 200)
         self._check_person(doc, self.ironman)
 
+    def test_display_person_tasks_grouped_by_event(self):
+        instructor = Role.objects.create(name='instructor')
+        helper = Role.objects.create(name='helper')
+        first = Event.objects.create(site=self.site_alpha, slug='2014-01-01-a',
+                                     start=datetime.date(2014, 1, 1))
+        second = Event.objects.create(site=self.site_beta, slug='2014-02-02-b',
+                                      start=datetime.date(2014, 2, 2))
+        Task.objects.create(event=second, person=self.hermione, role=helper)
+        Task.objects.create(event=first, person=self.hermione, role=instructor)
+        Task.objects.create(event=second, person=self.hermione,
+                            role=instructor)
+
+        response = self.client.get(reverse('person_details',
+                                           args=[str(self.hermione.id)]))
+        doc = self._check_status_code_and_parse(response, 200)
+        groups = self._get_N(doc, ".//li[@class='tasks_event']",
+                             'Expected one group per event', expected=2)
+        self.assertEqual(groups[0].find('a').text, first.slug)
+        self._get_N(groups[1], ".//li[@class='tasks_item']",
+                    'Expected two tasks in second event', expected=2)
+
+    def test_person_summary_invalidated_by_new_award(self):
+        url = reverse('person_details', args=[str(self.harry.id)])
+        doc = self._check_status_code_and_parse(self.client.get(url), 200)
+        self._get_N(doc, ".//li[@class='awards_item']",
+                    'Expected one award', expected=1)
+
+        Award.objects.create(person=self.harry, badge=self.hero,
+                             awarded=datetime.date(2014, 6, 6))
+        doc = self._check_status_code_and_parse(self.client.get(url), 200)
+        self._get_N(doc, ".//li[@class='awards_item']",
+                    'Expected new award to show up', expected=2)
+
+    def test_login_keeps_person_summary(self):
+        with patch('workshops.signals.invalidate_person_summary') as invalidated:
+            self.harry.save(update_fields=['last_login'])
+            self.assertFalse(invalidated.called)
+            self.harry.save()
+            self.assertTrue(invalidated.called)
+
     def test_edit_person_email_when_all_fields_set(self):
         self._test_edit_person_email(self.ron)
 
@@ -41,6 +83,18 @@ class TestPerson(TestBase):
         assert errors, \
             'Expected error messages in response page'
         
+    def test_email_lower(self):
+        self.harry.email = 'Harry.Potter@Hogwarts.EDU'
+        self.harry.save()
+        self.assertEqual(
+            Person.objects.get_by_email('harry.potter@hogwarts.edu'),
+            self.harry)
+        self.ironman.email = ''
+        self.ironman.save()
+        self.assertIsNone(Person.objects.get(id=self.ironman.id).email_lower)
+        with self.assertRaises(Person.DoesNotExist):
+            Person.objects.get_by_email('harry@hogwarts.edu')
+
     def test_merge_duplicate_persons(self):
         assert self.spiderman.airport == None
         assert self.benreilly.github == 'benreilly'
@@ -82,6 +136,28 @@ class TestPerson(TestBase):
         content = response.content.decode(charset)
         assert 'You must select at least two duplicate entries' in content
 
+    def test_edit_person_keeps_password(self):
+        self.ron.set_password('secret')
+        self.ron.save()
+        url, values = self._get_initial_form('person_edit', self.ron.id)
+        self.assertNotIn('password', values)
+        values['password'] = 'plain'
+        response = self.client.post(url, values)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Person.objects.get(id=self.ron.id)
+                                      .check_password('secret'))
+
+    def test_new_person_has_unusable_password(self):
+        response = self.client.post(reverse('person_add'),
+                                    {'username': 'newbie', 'personal': 'New',
+                                     'family': 'Person',
+                                     'email': 'newbie@example.org',
+                                     'last_login': '2015-01-01 00:00',
+                                     'may_contact': 'on'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Person.objects.get(username='newbie')
+                                       .has_usable_password())
+
     def _test_edit_person_email(self, person):
         url, values = self._get_initial_form('person_edit', person.id)
         assert 'email' in values, \
@@ -98,6 +174,7 @@ class TestPerson(TestBase):
             new_person = Person.objects.get(id=person.id)
             assert new_person.email == new_email, \
                 'Incorrect edited email: got {0}, expected {1}'.format(new_person.email, new_email)
+            self.assertEqual(new_person.email_lower, new_email)
 
         # Report errors.
         else:
@@ -133,3 +210,25 @@ class TestPerson(TestBase):
         '''Get field from person display.'''
         xpath = ".//td[@id='{0}']".format(key)
         return self._get_1(doc, xpath, key)
+
+
+class TestPersonDetailsQueries(QueryBudgetMixin, TestBase):
+    '''Person details must not run a query per task or award.'''
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+
+    def test_prolific_instructor(self):
+        instructor = Role.objects.create(name='instructor')
+        for i in range(20):
+            event = Event.objects.create(site=self.site_alpha,
+                                         slug='2014-01-{0:02d}-x'.format(i + 1),
+                                         start=datetime.date(2014, 1, i + 1))
+            Task.objects.create(event=event, person=self.hermione,
+                                role=instructor)
+            Award.objects.create(person=self.hermione, badge=self.hero,
+                                 awarded=datetime.date(2014, 1, i + 1),
+                                 event=event)
+        self.assertQueryBudget(reverse('person_details',
+                                       args=[str(self.hermione.id)]))
@@ -0,0 +1,131 @@
+import datetime
+
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from ..models import (
+    Award, Badge, Event, Person, PersonStats, Role, Task, STR_LONG)
+from ..reports import instructors_never_taught
+from .base import TestBase
+
+
+class TestPersonStats(TestBase):
+    '''Test cases for materialized per-person statistics.'''
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+
+        self.instructor_role = Role.objects.create(name='instructor')
+        self.helper_role = Role.objects.create(name='helper')
+        self.early = Event.objects.create(site=self.site_alpha,
+                                          slug='2014-01-01-early',
+                                          start=datetime.date(2014, 1, 1))
+        self.late = Event.objects.create(site=self.site_beta,
+                                         slug='2014-09-09-late',
+                                         start=datetime.date(2014, 9, 9))
+
+    def _stats(self, person):
+        return PersonStats.objects.get(person=person)
+
+    def test_stats_created_with_person(self):
+        stats = self._stats(self.ironman)
+        self.assertEqual(stats.times_taught, 0)
+        self.assertEqual(stats.times_helped, 0)
+        self.assertIsNone(stats.first_taught)
+
+    def test_stats_created_for_bulk_created_person(self):
+        Person.objects.bulk_create([Person(username='bulk', personal='Bulk',
+                                           family='Created',
+                                           email='bulk@example.org')])
+        person = Person.objects.get(username='bulk')
+        self.assertFalse(PersonStats.objects.filter(person=person).exists())
+
+        badge = Badge.objects.get_or_create(name='instructor', defaults={
+            'title': 'Instructor', 'criteria': ''})[0]
+        Award.objects.create(person=person, badge=badge,
+                             awarded=datetime.date(2014, 1, 1))
+        self.assertEqual(self._stats(person).times_taught, 0)
+        self.assertIn(('Bulk Created <bulk@example.org>', ),
+                      instructors_never_taught())
+
+        Task.objects.create(event=self.early, person=person,
+                            role=self.instructor_role)
+        self.assertEqual(self._stats(person).times_taught, 1)
+
+    def test_deleted_person_gets_no_stats(self):
+        person_id = self.harry.id
+        self.harry.delete()
+        PersonStats.objects.update_for(person_id)
+        self.assertFalse(
+            PersonStats.objects.filter(person_id=person_id).exists())
+
+    def test_stats_follow_tasks(self):
+        Task.objects.create(event=self.early, person=self.harry,
+                            role=self.instructor_role)
+        Task.objects.create(event=self.late, person=self.harry,
+                            role=self.instructor_role)
+        Task.objects.create(event=self.late, person=self.harry,
+                            role=self.helper_role)
+        stats = self._stats(self.harry)
+        self.assertEqual(stats.times_taught, 2)
+        self.assertEqual(stats.times_helped, 1)
+        self.assertEqual(stats.first_taught, self.early.start)
+        self.assertEqual(stats.last_taught, self.late.start)
+
+        Task.objects.filter(event=self.early).delete()
+        stats = self._stats(self.harry)
+        self.assertEqual(stats.times_taught, 1)
+        self.assertEqual(stats.first_taught, self.late.start)
+
+    def test_stats_follow_reassigned_task(self):
+        task = Task.objects.create(event=self.early, person=self.harry,
+                                   role=self.instructor_role)
+        task.person = self.ron
+        task.save()
+        self.assertEqual(self._stats(self.harry).times_taught, 0)
+        self.assertEqual(self._stats(self.ron).times_taught, 1)
+
+    def test_stats_follow_event_dates(self):
+        Task.objects.create(event=self.early, person=self.harry,
+                            role=self.instructor_role)
+        self.early.start = datetime.date(2013, 5, 5)
+        self.early.save()
+        self.assertEqual(self._stats(self.harry).first_taught,
+                         datetime.date(2013, 5, 5))
+
+    def test_stats_follow_awards(self):
+        self.assertEqual(self._stats(self.harry).badges, 'instructor')
+        Award.objects.create(person=self.harry, badge=self.hero,
+                             awarded=datetime.date(2014, 2, 2))
+        self.assertEqual(self._stats(self.harry).badges, 'hero, instructor')
+
+    def test_many_badges_fit(self):
+        names = ['badge-with-a-long-name-number-{0:02d}'.format(i)
+                 for i in range(10)]
+        for name in names:
+            badge = Badge.objects.create(name=name, title=name,
+                                         criteria='Collected them all')
+            Award.objects.create(person=self.harry, badge=badge,
+                                 awarded=datetime.date(2014, 2, 2))
+        badges = self._stats(self.harry).badges
+        self.assertGreater(len(badges), STR_LONG)
+        self.assertEqual(badges, ', '.join(names + ['instructor']))
+
+    def test_rebuild(self):
+        Task.objects.create(event=self.early, person=self.hermione,
+                            role=self.instructor_role)
+        PersonStats.objects.update(times_taught=99)
+        call_command('rebuild_person_stats')
+        self.assertEqual(self._stats(self.hermione).times_taught, 1)
+        self.assertEqual(self._stats(self.harry).times_taught, 0)
+
+    def test_instructors_page_shows_times_taught(self):
+        Task.objects.create(event=self.early, person=self.hermione,
+                            role=self.instructor_role)
+        response = self.client.post(reverse('instructors'),
+                                    {'airport' : self.airport_0_0.iata,
+                                     'wanted' : 1})
+        doc = self._check_status_code_and_parse(response, 200)
+        node = self._get_1(doc, ".//td[@id='instructor_num_taught_0']",
+                           'Expected times taught for first instructor')
+        self.assertEqual(node.text, '1')
@@ -0,0 +1,103 @@
+import datetime
+import json
+
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+from ..middleware import QueryBudgetExceeded, fingerprint
+from ..models import Award, Badge, Event, Role, Tag, Task
+from .base import TestBase, QueryBudgetMixin
+
+
+class TestQueryBudgets(QueryBudgetMixin, TestBase):
+    '''Check that views run a bounded number of queries.
+
+    Enough rows are created that a query per row would blow the budget.
+    '''
+
+    ROWS = 12
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+
+        instructor = Role.objects.create(name='instructor')
+        tag = Tag.objects.create(name='SWC', details='Software Carpentry')
+        for i in range(self.ROWS):
+            event = Event.objects.create(
+                site=self.site_alpha, slug='2014-01-{0:02d}-alpha'.format(i + 1),
+                start=datetime.date(2014, 1, i + 1),
+                end=datetime.date(2014, 1, i + 2))
+            event.tags.add(tag)
+            Task.objects.create(event=event, person=self.hermione,
+                                role=instructor)
+            Award.objects.create(person=self.hermione, badge=self.hero,
+                                 awarded=datetime.date(2014, 1, i + 1),
+                                 event=event)
+
+    def test_all_events(self):
+        self.assertQueryBudget(reverse('all_events'))
+
+    def test_all_badges(self):
+        for i in range(self.ROWS):
+            Badge.objects.create(name='badge-{0}'.format(i),
+                                 title='Badge {0}'.format(i), criteria='')
+        self.assertQueryBudget(reverse('all_badges'))
+
+    def test_all_tasks(self):
+        self.assertQueryBudget(reverse('all_tasks'))
+
+    def test_event_details(self):
+        event = Event.objects.first()
+        for person in (self.harry, self.ron, self.spiderman, self.ironman):
+            Task.objects.create(event=event, person=person,
+                                role=Role.objects.get(name='instructor'))
+        self.assertQueryBudget(reverse('event_details',
+                                       args=[event.get_ident()]))
+
+    def test_all_persons(self):
+        self.assertQueryBudget(reverse('all_persons'))
+
+    def test_instructors(self):
+        self.assertQueryBudget(reverse('instructors'), method='post',
+                               data={'airport': self.airport_0_0.iata,
+                                     'wanted': 10})
+
+
+class TestQueryProfilerMiddleware(TestBase):
+    '''Test cases for per-request SQL profiling.'''
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+
+    def test_fingerprint_ignores_values(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 5 AND name = 'x'"),
+            fingerprint("SELECT *  FROM t WHERE id = 17 AND name = 'it''s'"))
+        self.assertEqual(fingerprint('SELECT 1 FROM t WHERE id IN (1, 2, 3)'),
+                         'SELECT ? FROM t WHERE id IN (...)')
+
+    @override_settings(QUERY_PROFILING=True)
+    def test_structured_log_line(self):
+        with self.assertLogs('workshops.queries', 'INFO') as logs:
+            self.client.get(reverse('index'))
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['view'], 'index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertIn('sql_ms', record)
+        self.assertIn('view_ms', record)
+
+    @override_settings(QUERY_PROFILING=True, QUERY_BUDGET_ENFORCE=True,
+                       QUERY_BUDGETS={'index': 0})
+    def test_budget_enforced(self):
+        with self.assertLogs('workshops.queries', 'WARNING'):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('index'))
+
+    @override_settings(QUERY_PROFILING=True, QUERY_BUDGET_ENFORCE=False,
+                       QUERY_BUDGETS={'index': 0})
+    def test_budget_only_logged_when_not_enforced(self):
+        with self.assertLogs('workshops.queries', 'WARNING'):
+            response = self.client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,94 @@
+import datetime
+
+from django.core.urlresolvers import reverse
+from ..models import Event, Role, Site, Task
+from ..reports import get_report, get_data_version
+from .base import TestBase
+
+
+class TestReports(TestBase):
+    '''Test cases for statistical reports.'''
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+
+        self.instructor_role = Role.objects.create(name='instructor')
+        self.learner_role = Role.objects.create(name='learner')
+
+        self.events = []
+        for (i, start) in enumerate([datetime.date(2013, 3, 1),
+                                     datetime.date(2013, 3, 1),
+                                     datetime.date(2014, 6, 1)]):
+            self.events.append(Event.objects.create(
+                site=self.site_alpha, slug='2013-03-0{0}-alpha'.format(i),
+                start=start, attendance=10 * (i + 1)))
+
+        for event in self.events:
+            Task.objects.create(event=event, person=self.hermione,
+                                role=self.instructor_role)
+        Task.objects.create(event=self.events[0], person=self.harry,
+                            role=self.instructor_role)
+        Task.objects.create(event=self.events[0], person=self.spiderman,
+                            role=self.learner_role)
+
+    def test_cumulative_workshops(self):
+        rows = get_report('cumulative')
+        self.assertEqual(rows, [(datetime.date(2013, 3, 1), 2),
+                                (datetime.date(2014, 6, 1), 3)])
+
+    def test_enrolment(self):
+        rows = get_report('enrolment')
+        self.assertEqual(rows, [(self.events[0].slug, 10, 1)])
+
+    def test_workshops_per_instructor(self):
+        rows = get_report('taught')
+        self.assertEqual(rows[0],
+                         (3, 'Hermione Granger <hermione@granger.co.uk>'))
+        self.assertEqual(rows[1], (1, 'Harry Potter <harry@hogwarts.edu>'))
+
+    def test_instructors_by_times_taught(self):
+        self.assertEqual(get_report('taught-histogram'), [(3, 1), (1, 1)])
+
+    def test_instructors_never_taught(self):
+        rows = get_report('never-taught')
+        self.assertEqual(rows, [('Ron Weasley <rweasley@ministry.gov.uk>', )])
+
+    def test_members(self):
+        rows = get_report('members')
+        self.assertEqual(rows, [('Hermione Granger <hermione@granger.co.uk>', )])
+
+    def test_report_recomputed_when_data_changes(self):
+        version = get_data_version()
+        assert get_report('never-taught')
+        Task.objects.create(event=self.events[1], person=self.ron,
+                            role=self.instructor_role)
+        self.assertNotEqual(version, get_data_version())
+        self.assertEqual(get_report('never-taught'), [])
+
+    def test_login_keeps_data_version(self):
+        version = get_data_version()
+        self.client.logout()
+        self.assertTrue(self.client.login(username='admin', password='admin'))
+        self.assertEqual(version, get_data_version())
+        self.harry.family = 'Granger'
+        self.harry.save()
+        self.assertNotEqual(version, get_data_version())
+
+    def test_report_page(self):
+        response = self.client.get(reverse('report_details',
+                                           args=['cumulative']))
+        doc = self._check_status_code_and_parse(response, 200)
+        self._get_N(doc, ".//tr[@class='report_row']",
+                    'Expected one row per start date', expected=2)
+
+    def test_report_csv(self):
+        response = self.client.get(reverse('report_csv', args=['cumulative']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['content-type'], 'text/csv')
+        lines = response.content.decode('utf-8').splitlines()
+        self.assertEqual(lines, ['date,total', '2013-03-01,2', '2014-06-01,3'])
+
+    def test_unknown_report(self):
+        response = self.client.get(reverse('report_details', args=['nope']))
+        self.assertEqual(response.status_code, 404)
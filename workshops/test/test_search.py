@@ -56,3 +56,13 @@ class TestSearchSite(TestBase):
         texts = set([n.text for n in nodes])
         assert texts == {'alpha.edu', 'beta.com'}, \
             'Wrong names {0} in search result'.format(texts)
+
+    def test_search_for_site_by_notes(self):
+        response = self.client.post(reverse('search'),
+                                    {'term' : 'Brazil',
+                                     'in_sites' : 'on'})
+        doc = self._check_status_code_and_parse(response, 200)
+        node = self._get_1(doc, ".//a[@class='searchresult']",
+                           'Expected exactly one search result')
+        assert node.text=='beta.com', \
+            'Wrong name "{0}" in search result'.format(node.text)
@@ -1,4 +1,5 @@
-from ..models import Site
+from django.core.urlresolvers import reverse
+from ..models import Event, Site, NOTES_PREVIEW
 from .base import TestBase
 
 
@@ -17,3 +18,33 @@ class TestSiteNotes(TestBase):
                  country='United-States')
         assert s.notes == '', \
             'Site created without notes should have empty notes'
+
+
+class TestListingColumns(TestBase):
+    '''Test cases for the columns loaded by listings.'''
+
+    def setUp(self):
+        super().setUp()
+        self._setUpUsersAndLogin()
+        self.site_beta.notes = 'Long ' * 1000
+        self.site_beta.save()
+        Event.objects.create(site=self.site_beta, slug='2015-01-01-beta',
+                             notes='Long ' * 1000)
+
+    def test_site_notes_are_previewed(self):
+        site = Site.objects.for_listing().get(id=self.site_beta.id)
+        self.assertEqual(site.notes_preview, ('Long ' * 9)[:NOTES_PREVIEW + 1])
+        with self.assertNumQueries(1):      # only loaded on demand
+            self.assertEqual(site.notes, 'Long ' * 1000)
+
+    def test_event_notes_are_deferred(self):
+        event = Event.objects.for_listing().get()
+        with self.assertNumQueries(0):
+            self.assertEqual(event.site.domain, 'beta.com')
+        with self.assertNumQueries(1):
+            self.assertEqual(event.notes, 'Long ' * 1000)
+
+    def test_all_sites_shows_preview(self):
+        response = self.client.get(reverse('all_sites'))
+        self.assertContains(response, 'Long Long')
+        self.assertNotContains(response, 'Long ' * 10)
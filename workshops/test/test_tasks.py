@@ -59,3 +59,19 @@ class TestTask(TestBase):
         response = self.client.get(reverse('task_edit',
                                    kwargs=url_kwargs))
         assert response.context['task'].pk == correct_task.pk
+
+    def test_task_form_takes_username(self):
+        task = self.fixtures['test_task_1']
+        response = self.client.get(reverse('task_edit',
+                                           kwargs={'task_id': task.id}))
+        self.assertContains(response, 'value="person1"')
+        self.assertContains(response, 'class="autocomplete"')
+
+        response = self.client.post(reverse('task_edit',
+                                            kwargs={'task_id': task.id}),
+                                    {'event': task.event.id,
+                                     'person': 'person2',
+                                     'role': task.role.id})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Task.objects.get(id=task.id).person.username,
+                         'person2')
@@ -0,0 +1,21 @@
+from django.core.management import call_command
+from django.test import TestCase
+from ..template_warmup import find_templates, warm_templates
+
+
+class TestTemplateWarmup(TestCase):
+    '''Test cases for compiling templates ahead of time.'''
+
+    def test_find_templates(self):
+        names = list(find_templates())
+        self.assertIn('base.html', names)
+        self.assertIn('workshops/all_events.html', names)
+        self.assertEqual(len(names), len(set(names)))
+
+    def test_all_templates_compile(self):
+        compiled, errors = warm_templates()
+        self.assertEqual(errors, {})
+        self.assertIn('workshops/_page.html', compiled)
+
+    def test_command(self):
+        call_command('warm_templates')
@@ -1,16 +1,24 @@
 # coding: utf-8
 import cgi
-from datetime import datetime
+import json
+from datetime import datetime, timedelta
 from io import StringIO
 from importlib import import_module
 
 from django.conf import settings
+from django.core.exceptions import MultipleObjectsReturned
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.contrib.sessions.serializers import JSONSerializer
 from django.test import TestCase
 from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from ..models import Site, Event, Role, Person, Task
-from ..util import upload_person_task_csv, verify_upload_person_task, merge_model_objects
+from ..models import Site, Event, Role, Person, StagedUpload, Task
+from ..util import (upload_person_task_csv, verify_upload_person_task,
+                    create_uploaded_persons_tasks, merge_model_objects)
 
 from .base import TestBase
 
@@ -154,6 +162,49 @@ class VerifyUploadPersonTask(CSVBulkUploadTestBase):
             has_errors = verify_upload_person_task(bad_data)
             self.assertFalse(has_errors)
 
+    def test_verify_email_uses_lowercased_column(self):
+        data = self.make_data()
+        data[0].update(email='Harry@Hogwarts.edu', personal='Harry',
+                       middle=None, family='Potter')
+        with CaptureQueriesContext(connection) as queries:
+            verify_upload_person_task(data)
+        lookups = [q['sql'] for q in queries
+                   if 'FROM "workshops_person"' in q['sql']]
+        self.assertEqual(len(lookups), 1)
+        self.assertIn('"email_lower" = ', lookups[0])
+
+    def test_create_reuses_person_with_email_in_other_case(self):
+        data = self.make_data()
+        data[0].update(email='HARRY@hogwarts.edu', personal='Harry',
+                       middle=None, family='Potter')
+        self.assertFalse(verify_upload_person_task(data))
+        persons, tasks = create_uploaded_persons_tasks(data)
+        self.assertEqual(persons, [])
+        self.assertEqual(tasks[0].person, self.harry)
+
+    def _ambiguous_email_data(self):
+        for (name, email) in (('Dup', 'Dup@x.org'), ('dup', 'dup@x.org')):
+            Person.objects.create(username=name, personal=name,
+                                  family='Licate', email=email)
+        data = self.make_data()
+        data[0].update(email='DUP@x.org', personal='Dup', middle=None,
+                       family='Licate')
+        return data
+
+    def test_verify_reports_ambiguous_email(self):
+        data = self._ambiguous_email_data()
+        self.assertTrue(verify_upload_person_task(data))
+        self.assertIn('Ambiguous email', data[0]['errors'][0])
+
+    def test_create_refuses_ambiguous_email(self):
+        data = self._ambiguous_email_data()
+        count = Person.objects.count()
+        with self.assertRaisesRegex(MultipleObjectsReturned,
+                                    'DUP@x.org'):
+            create_uploaded_persons_tasks(data)
+        self.assertEqual(Person.objects.count(), count)
+        self.assertFalse(Task.objects.filter(event__slug='foobar').exists())
+
     def test_verify_name_matching_existing_user(self):
         bad_data = self.make_data()
         bad_data[0]['email'] = 'harry@hogwarts.edu'
@@ -189,6 +240,17 @@ class BulkUploadUsersViewTestCase(CSVBulkUploadTestBase):
         super().setUp()
         Role.objects.create(name='Helper')
 
+    def _stage(self, data):
+        '''Stage upload data as if it had just been uploaded.'''
+        token = StagedUpload.objects.stage(self.admin, data)
+        # self.client is authenticated user so we have access to the session
+        store = self.client.session
+        store['bulk-add-people'] = token
+        store.save()
+        # with signed cookie sessions, saving changes the cookie
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = store.session_key
+        return token
+
     def test_event_name_dropped(self):
         """
         Test for regression:
@@ -197,10 +259,7 @@ class BulkUploadUsersViewTestCase(CSVBulkUploadTestBase):
         """
         data = self.make_data()
 
-        # self.client is authenticated user so we have access to the session
-        store = self.client.session
-        store['bulk-add-people'] = data
-        store.save()
+        self._stage(data)
 
         # send exactly what's in 'data', except for the 'event' field: leave
         # this one empty
@@ -233,10 +292,7 @@ Harry,,Potter,harry@hogwarts.edu,foobar,Helper
 """
         data, _ = upload_person_task_csv(StringIO(csv))
 
-        # self.client is authenticated user so we have access to the session
-        store = self.client.session
-        store['bulk-add-people'] = data
-        store.save()
+        self._stage(data)
 
         # send exactly what's in 'data'
         payload = {
@@ -281,10 +337,7 @@ Harry,,Potter,harry@hogwarts.edu,foobar,Instructor
 """
         data, _ = upload_person_task_csv(StringIO(csv))
 
-        # self.client is authenticated user so we have access to the session
-        store = self.client.session
-        store['bulk-add-people'] = data
-        store.save()
+        self._stage(data)
 
         # send exactly what's in 'data'
         payload = {
@@ -368,3 +421,43 @@ class MergeModelObjects(TestCase):
         assertRaises(TypeError, merge_model_objects("a string", "a string"))
         person = Person.objects.get(username='p1')
         assert person.personal == 'p1'
+
+
+class StagedUploadTestCase(CSVBulkUploadTestBase):
+    '''Test cases for staging bulk upload data outside the session.'''
+
+    def test_round_trip(self):
+        data = self.make_data()
+        token = StagedUpload.objects.stage(self.admin, data)
+        self.assertEqual(StagedUpload.objects.load(self.admin, token), data)
+        self.assertIsNone(StagedUpload.objects.load(self.harry, token))
+        self.assertIsNone(StagedUpload.objects.load(self.admin, 'nonsense'))
+
+    def test_payload_compressed(self):
+        data = self.make_data() * 200
+        token = StagedUpload.objects.stage(self.admin, data)
+        upload = StagedUpload.objects.get(token=token)
+        self.assertLess(len(upload.payload), len(json.dumps(data)) / 10)
+
+    def test_session_holds_only_token(self):
+        upload = SimpleUploadedFile('upload.csv',
+                                    self.make_csv_data().encode('utf-8'))
+        rv = self.client.post(reverse('person_bulk_add'), {'file': upload})
+        self.assertRedirects(rv, reverse('person_bulk_add_confirmation'))
+        token = self.client.session['bulk-add-people']
+        self.assertEqual(StagedUpload.objects.load(self.admin, token)[0]
+                                             ['email'], 'notin@db.com')
+
+        self.client.post(reverse('person_bulk_add_confirmation'),
+                         {'cancel': 'Cancel'})
+        self.assertFalse(StagedUpload.objects.exists())
+        self.assertNotIn('bulk-add-people', self.client.session)
+
+    def test_sweep(self):
+        old = StagedUpload.objects.stage(self.admin, [])
+        StagedUpload.objects.stage(self.admin, [])
+        StagedUpload.objects.filter(token=old).update(
+            updated=timezone.now() - timedelta(days=2))
+        call_command('sweep_sessions')
+        self.assertFalse(StagedUpload.objects.filter(token=old).exists())
+        self.assertEqual(StagedUpload.objects.count(), 1)
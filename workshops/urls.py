@@ -5,16 +5,19 @@ urlpatterns = [
     url(r'^$', views.index, name='index'),
 
     url(r'^sites/?$', views.all_sites, name='all_sites'),
+    url(r'^sites/search/?$', views.site_search, name='site_search'),
     url(r'^site/(?P<site_domain>[\w\.-]+)/?$', views.site_details, name='site_details'),
     url(r'^site/(?P<site_domain>[\w\.-]+)/edit$', views.SiteUpdate.as_view(), name='site_edit'),
     url(r'^sites/add/$', views.SiteCreate.as_view(), name='site_add'),
 
     url(r'^airports/?$', views.all_airports, name='all_airports'),
+    url(r'^airports/search/?$', views.airport_search, name='airport_search'),
     url(r'^airport/(?P<airport_iata>\w+)/?$', views.airport_details, name='airport_details'),
     url(r'^airport/(?P<airport_iata>\w+)/edit$', views.AirportUpdate.as_view(), name='airport_edit'),
     url(r'^airports/add/$', views.AirportCreate.as_view(), name='airport_add'),
 
     url(r'^persons/?$', views.all_persons, name='all_persons'),
+    url(r'^persons/search/?$', views.person_search, name='person_search'),
     url(r'^person/(?P<person_id>[\w\.-]+)/?$', views.person_details, name='person_details'),
     url(r'^person/(?P<person_id>[\w\.-]+)/edit$', views.PersonUpdate.as_view(), name='person_edit'),
     url(r'^persons/add/$', views.PersonCreate.as_view(), name='person_add'),
@@ -24,10 +27,13 @@ urlpatterns = [
     url(r'^persons/find_duplicates$',views.person_find_duplicates, name='person_find_duplicates'),
 
     url(r'^events/?$', views.all_events, name='all_events'),
+    url(r'^events/search/?$', views.event_search, name='event_search'),
     url(r'^event/(?P<event_ident>[\w-]+)/?$', views.event_details, name='event_details'),
     url(r'^event/(?P<event_ident>[\w-]+)/edit$', views.EventUpdate.as_view(), name='event_edit'),
     url(r'^events/add/$', views.EventCreate.as_view(), name='event_add'),
     url(r'^event/(?P<event_ident>[\w-]+)/validate/?$', views.validate_event, name='validate_event'),
+    url(r'^event/(?P<event_ident>[\w-]+)/staff/?$', views.event_staff, name='event_staff'),
+    url(r'^event/(?P<event_ident>[\w-]+)/candidates/refresh$', views.event_candidates_refresh, name='event_candidates_refresh'),
 
     url(r'^tasks/?$', views.all_tasks, name='all_tasks'),
     url(r'^task/(?P<task_id>\d+)/?$', views.task_details, name='task_details'),
@@ -44,4 +50,11 @@ urlpatterns = [
     url(r'^debrief/?$', views.debrief, name='debrief'),
 
     url(r'^export/(?P<name>[\w\.-]+)/?$', views.export, name='export'),
+
+    url(r'^reports/?$', views.all_reports, name='all_reports'),
+    url(r'^report/(?P<name>[\w-]+)/?$', views.report_details, name='report_details'),
+    url(r'^report/(?P<name>[\w-]+)/csv$', views.report_csv, name='report_csv'),
+
+    url(r'^jobs/?$', views.all_jobs, name='all_jobs'),
+    url(r'^job/(?P<job_id>\d+)/?$', views.job_details, name='job_details'),
 ]
@@ -2,11 +2,13 @@
 from math import pi, sin, cos, acos
 import csv
 
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import (
+    MultipleObjectsReturned, ObjectDoesNotExist)
 from django.db import IntegrityError, transaction
-from django.db.models import get_models, Model
+from django.db.models import get_models, Model, OneToOneField
 from django.contrib.contenttypes.generic import GenericForeignKey
 
+from .lookups import roles
 from .models import Event, Role, Person, Task
 
 
@@ -50,8 +52,8 @@ def upload_person_task_csv(stream):
     The input `stream` should be a file-like object that returns
     Unicode data.
 
-    "Serializability" is required because we put this data into session.  See
-    https://docs.djangoproject.com/en/1.7/topics/http/sessions/ for details.
+    "Serializability" is required because this data is stored as JSON until
+    the upload is confirmed (see `StagedUpload`).
 
     Also return a list of fields from Person.PERSON_UPLOAD_FIELDS for which
     no data was given.
@@ -98,9 +100,10 @@ def verify_upload_person_task(data):
                               .format(event))
 
         role = item.get('role', None)
+        role_obj = None
         if role:
             try:
-                Role.objects.get(name=role)
+                role_obj = roles.get(name=role)
             except Role.DoesNotExist:
                 errors.append(u'Role with name {0} does not exist.'
                               .format(role))
@@ -121,7 +124,7 @@ def verify_upload_person_task(data):
             # personal names match, too
 
             try:
-                person = Person.objects.get(email__iexact=email)
+                person = Person.objects.get_by_email(email)
 
                 assert person.personal == personal
                 assert person.middle == middle
@@ -131,6 +134,12 @@ def verify_upload_person_task(data):
                 # in this case we need to add the user
                 pass
 
+            except Person.MultipleObjectsReturned:
+                # older records may differ only in the case of their emails
+                errors.append("Ambiguous email {0}: more than one person has"
+                              " it (ignoring case); merge them first"
+                              .format(email))
+
             except AssertionError:
                 errors.append(
                     "Personal, middle or family name of existing user don't"
@@ -147,7 +156,7 @@ def verify_upload_person_task(data):
             else:
                 # check for duplicate Task
                 try:
-                    Task.objects.get(event__slug=event, role__name=role,
+                    Task.objects.get(event__slug=event, role=role_obj,
                                      person=person)
                 except Task.DoesNotExist:
                     pass
@@ -184,12 +193,13 @@ def create_uploaded_persons_tasks(data):
                 fields['username'] = create_username(row['personal'],
                                                      row['family'])
                 if fields['email']:
-                    # we should use existing Person or create one
-                    p, created = Person.objects.get_or_create(
-                        email=fields['email'], defaults=fields
-                    )
-
-                    if created:
+                    # we should use existing Person or create one (but never
+                    # pick one of several with the same email)
+                    try:
+                        p = Person.objects.get_by_email(fields['email'])
+                    except Person.DoesNotExist:
+                        p = Person(**fields)
+                        p.save()
                         persons_created.append(p)
 
                 else:
@@ -200,7 +210,7 @@ def create_uploaded_persons_tasks(data):
 
                 if row['event'] and row['role']:
                     e = Event.objects.get(slug=row['event'])
-                    r = Role.objects.get(name=row['role'])
+                    r = roles.get(name=row['role'])
                     t = Task(person=p, event=e, role=r)
                     t.save()
                     tasks_created.append(t)
@@ -211,6 +221,10 @@ def create_uploaded_persons_tasks(data):
             except ObjectDoesNotExist as e:
                 raise ObjectDoesNotExist('{0} (for {1})'.format(str(e), row))
 
+            except MultipleObjectsReturned as e:
+                raise MultipleObjectsReturned('{0} (for {1})'
+                                              .format(str(e), row))
+
     return persons_created, tasks_created
 
 
@@ -296,6 +310,10 @@ def merge_model_objects(primary_object, alias_objects=[], keep_old=False):
     for alias_object in alias_objects:
         # Migrate all foreign key references from alias object to primary object.
         for related_object in alias_object._meta.get_all_related_objects():
+            # One-to-one rows (e.g. PersonStats) belong to exactly one
+            # object and can't be moved; they go away with the alias.
+            if isinstance(related_object.field, OneToOneField):
+                continue
             # The variable name on the alias_object model.
             alias_varname = related_object.get_accessor_name()
             # The variable name on the related model.
@@ -303,7 +321,16 @@ def merge_model_objects(primary_object, alias_objects=[], keep_old=False):
             related_objects = getattr(alias_object, alias_varname)
             for obj in related_objects.all():
                 setattr(obj, obj_varname, primary_object)
-                obj.save()
+                if obj._meta.unique_together:
+                    # the primary object may already have an equivalent
+                    # row (e.g. the same qualification), which is kept
+                    try:
+                        with transaction.atomic():
+                            obj.save()
+                    except IntegrityError:
+                        obj.delete()
+                else:
+                    obj.save()
 
         # Migrate all many to many references from alias object to primary object.
         for related_many_object in alias_object._meta.get_all_related_many_to_many_objects():
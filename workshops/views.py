@@ -4,15 +4,12 @@ import io
 import re
 import yaml
 
-import requests
-
 from django.contrib import messages
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.core.urlresolvers import reverse
-from django.core.exceptions import ObjectDoesNotExist
 from django.conf import settings
-from django.http import Http404, HttpResponse
-from django.db import IntegrityError, transaction
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db import transaction
 from django.db.models import Count, Q, Model
 from django.shortcuts import redirect, render, get_object_or_404
 from django.views.generic.base import ContextMixin
@@ -26,22 +23,35 @@ from workshops.models import \
     Award, \
     Badge, \
     Event, \
+    InstructorCandidate, \
+    Job, \
     Person, \
     Role, \
     Site, \
-    Skill, \
+    SiteAirport, \
+    StagedUpload, \
     Task
-from workshops.check import check_file
-from workshops.forms import SearchForm, DebriefForm, InstructorsForm, PersonBulkAddForm
+from workshops.caching import fragment_context, get_person_summary
+from workshops.debrief import instructor_tasks
+from workshops.distances import airport_distances
+from workshops.lookups import airports, persons, qualifications, roles, skills
+from workshops.jobs import EXPORTS, JOBS, enqueue, enqueue_once
+from workshops import listings
+from workshops.reports import REPORTS, get_report
+from workshops.forms import (
+    SearchForm, DebriefForm, InstructorsForm, PersonBulkAddForm, TaskForm,
+    EventForm, PersonForm)
 from workshops.util import (
-    earth_distance, upload_person_task_csv,  verify_upload_person_task,
-    create_uploaded_persons_tasks, merge_model_objects, InternalError
+    earth_distance, upload_person_task_csv,  verify_upload_person_task
 )
 
 #------------------------------------------------------------
 
 ITEMS_PER_PAGE = 25
 
+# Session key holding the token of staged bulk upload data.
+BULK_ADD_SESSION_KEY = 'bulk-add-people'
+
 #------------------------------------------------------------
 
 
@@ -105,8 +115,8 @@ class LoginRequiredMixin(object):
 @login_required
 def index(request):
     '''Home page.'''
-    upcoming_events = Event.objects.upcoming_events()
-    unpublished_events = Event.objects.unpublished_events()
+    upcoming_events = Event.objects.for_listing().upcoming_events()
+    unpublished_events = Event.objects.for_listing().unpublished_events()
     context = {'title': None,
                'upcoming_events': upcoming_events,
                'unpublished_events': unpublished_events}
@@ -114,19 +124,22 @@ def index(request):
 
 #------------------------------------------------------------
 
-SITE_FIELDS = ['domain', 'fullname', 'country', 'notes']
+SITE_FIELDS = ['domain', 'fullname', 'country', 'latitude', 'longitude',
+               'notes']
+SITE_SEARCH_LEN = 10       # how many sites to suggest
 
 
 @login_required
 def all_sites(request):
     '''List all sites.'''
 
-    all_sites = Site.objects.order_by('domain')
+    all_sites = Site.objects.for_listing().order_by('domain')
     sites = _get_pagination_items(request, all_sites)
     user_can_add = request.user.has_perm('edit')
     context = {'title' : 'All Sites',
                'all_sites' : sites,
                'user_can_add' : user_can_add}
+    context.update(fragment_context('all_sites'))
     return render(request, 'workshops/all_sites.html', context)
 
 
@@ -134,13 +147,30 @@ def all_sites(request):
 def site_details(request, site_domain):
     '''List details of a particular site.'''
     site = Site.objects.get(domain=site_domain)
-    events = Event.objects.filter(site=site)
+    events = Event.objects.for_listing().filter(site=site) \
+                                        .prefetch_related('tags')
     context = {'title' : 'Site {0}'.format(site),
                'site' : site,
                'events' : events}
+    context.update(fragment_context('site_details'))
     return render(request, 'workshops/site.html', context)
 
 
+@login_required
+def site_search(request):
+    '''Sites whose domain or name contains the "term" parameter (JSON).'''
+    term = request.GET.get('term', '').strip()
+    found = []
+    if term:
+        found = Site.objects.for_listing() \
+                            .filter(Q(domain__icontains=term) |
+                                    Q(fullname__icontains=term)) \
+                            .order_by('domain')[:SITE_SEARCH_LEN]
+    return JsonResponse({'sites': [
+        {'domain': s.domain, 'fullname': s.fullname, 'label': s.fullname}
+        for s in found]})
+
+
 class SiteCreate(LoginRequiredMixin, CreateViewContext):
     model = Site
     fields = SITE_FIELDS
@@ -155,6 +185,7 @@ class SiteUpdate(LoginRequiredMixin, UpdateViewContext):
 #------------------------------------------------------------
 
 AIRPORT_FIELDS = ['iata', 'fullname', 'country', 'latitude', 'longitude']
+AIRPORT_SEARCH_LEN = 10    # how many airports to suggest
 
 
 @login_required
@@ -165,6 +196,7 @@ def all_airports(request):
     context = {'title' : 'All Airports',
                'all_airports' : all_airports,
                'user_can_add' : user_can_add}
+    context.update(fragment_context('all_airports'))
     return render(request, 'workshops/all_airports.html', context)
 
 
@@ -174,9 +206,20 @@ def airport_details(request, airport_iata):
     airport = Airport.objects.get(iata=airport_iata)
     context = {'title' : 'Airport {0}'.format(airport),
                'airport' : airport}
+    context.update(fragment_context('airport_details'))
     return render(request, 'workshops/airport.html', context)
 
 
+@login_required
+def airport_search(request):
+    '''Airports whose code or name starts with the "term" parameter (JSON).'''
+    found = airports.search(request.GET.get('term', ''),
+                            limit=AIRPORT_SEARCH_LEN)
+    return JsonResponse({'airports': [
+        {'iata': a.iata, 'fullname': a.fullname, 'country': a.country,
+         'label': str(a)} for a in found]})
+
+
 class AirportCreate(LoginRequiredMixin, CreateViewContext):
     model = Airport
     fields = AIRPORT_FIELDS
@@ -191,11 +234,7 @@ class AirportUpdate(LoginRequiredMixin, UpdateViewContext):
 #------------------------------------------------------------
 
 
-PERSON_FIELDS = [
-        field.name for field in Person._meta.fields
-    ] + [
-        'user_permissions',
-    ]
+PERSON_SEARCH_LEN = 10     # how many persons to suggest
 
 
 @login_required
@@ -203,22 +242,32 @@ def all_persons(request):
     '''List all persons.'''
 
     all_persons = Person.objects.order_by('family', 'personal')
-    persons = _get_pagination_items(request, all_persons)
+    persons = _get_pagination_items(request, all_persons, listings.PERSONS)
     context = {'title' : 'All Persons',
                'all_persons' : persons}
-    return render(request, 'workshops/all_persons.html', context)
+    return listings.render(request, 'workshops/all_persons.html', context)
+
+
+@login_required
+def person_search(request):
+    '''Persons best matching the "term" parameter, misspellings and all
+    (JSON).'''
+    found = persons.search(request.GET.get('term', ''),
+                           limit=PERSON_SEARCH_LEN)
+    return JsonResponse({'persons': [
+        {'id': p.id, 'username': p.username, 'email': p.email,
+         'label': str(p)} for p in found]})
 
 
 @login_required
 def person_details(request, person_id):
     '''List details of a particular person.'''
-    person = Person.objects.get(id=person_id)
-    awards = Award.objects.filter(person__id=person_id)
-    tasks = Task.objects.filter(person__id=person_id)
+    person = Person.objects.select_related('airport').get(id=person_id)
+    summary = get_person_summary(person)
     context = {'title' : 'Person {0}'.format(person),
                'person' : person,
-               'awards' : awards,
-               'tasks' : tasks}
+               'awards' : summary['awards'],
+               'task_events' : summary['events']}
     return render(request, 'workshops/person.html', context)
 
 
@@ -262,10 +311,11 @@ def person_bulk_add(request):
                     msg = msg_template.format(', '.join(empty_fields))
                     messages.add_message(request, messages.ERROR, msg)
                 else:
-                    # instead of insta-saving, put everything into session
-                    # then redirect to confirmation page which in turn saves
-                    # the data
-                    request.session['bulk-add-people'] = persons_tasks
+                    # instead of insta-saving, stage everything (the session
+                    # only keeps the token) then redirect to confirmation
+                    # page which in turn saves the data
+                    request.session[BULK_ADD_SESSION_KEY] = \
+                        StagedUpload.objects.stage(request.user, persons_tasks)
                     return redirect('person_bulk_add_confirmation')
 
     else:
@@ -279,12 +329,20 @@ def person_bulk_add(request):
     return render(request, 'workshops/person_bulk_add_form.html', context)
 
 
+def _discard_bulk_add(request, token):
+    StagedUpload.objects.discard(request.user, token)
+    request.session.pop(BULK_ADD_SESSION_KEY, None)
+
+
 @login_required
 def person_bulk_add_confirmation(request):
     """
-    This view allows for manipulating and saving session-stored upload data.
+    This view allows for manipulating and saving staged upload data.
     """
-    persons_tasks = request.session.get('bulk-add-people')
+    token = request.session.get(BULK_ADD_SESSION_KEY)
+    persons_tasks = None
+    if token:
+        persons_tasks = StagedUpload.objects.load(request.user, token)
 
     # if the session is empty, add message and redirect
     if not persons_tasks:
@@ -316,8 +374,8 @@ def person_bulk_add_confirmation(request):
             persons_tasks[k]['role'] = role
             persons_tasks[k]['errors'] = None  # reset here
 
-        # save updated data to the session
-        request.session['bulk-add-people'] = persons_tasks
+        # save updated data
+        StagedUpload.objects.replace(request.user, token, persons_tasks)
 
         # check if user wants to verify or save, or cancel
 
@@ -337,34 +395,29 @@ def person_bulk_add_confirmation(request):
         # there must be "confirm" and no "cancel" in POST in order to save
         elif (request.POST.get('confirm', None) and
               not request.POST.get('cancel', None)):
-            try:
-                # verification now makes something more than database
-                # constraints so we should call it first
-                verify_upload_person_task(persons_tasks)
-                persons_created, tasks_created = \
-                    create_uploaded_persons_tasks(persons_tasks)
-            except (IntegrityError, ObjectDoesNotExist, InternalError) as e:
+            # verification now makes something more than database
+            # constraints so we should call it first
+            if verify_upload_person_task(persons_tasks):
+                StagedUpload.objects.replace(request.user, token,
+                                             persons_tasks)
                 messages.add_message(request, messages.ERROR,
-                                     "Error saving data to the database: {}. "
                                      "Please make sure to fix all errors "
-                                     "listed below.".format(e))
-                verify_upload_person_task(persons_tasks)
+                                     "listed below.")
                 context = {'title': 'Confirm uploaded data',
                            'persons_tasks': persons_tasks}
                 return render(request,
                               'workshops/person_bulk_add_results.html',
                               context, status=400)
 
-            else:
-                request.session['bulk-add-people'] = None
-                messages.add_message(request, messages.SUCCESS,
-                                     "Successfully uploaded {0} persons and {1} tasks."
-                                     .format(len(persons_created), len(tasks_created)))
-                return redirect('person_bulk_add')
+            # saving can take a while, so it is done in the background
+            job = enqueue('bulk_upload', person=request.user,
+                          person_id=request.user.id, token=token)
+            request.session.pop(BULK_ADD_SESSION_KEY, None)
+            return _job_response(request, job, 'person_bulk_add')
 
         else:
             # any "cancel" or no "confirm" in POST cancels the upload
-            request.session['bulk-add-people'] = None
+            _discard_bulk_add(request, token)
             return redirect('person_bulk_add')
 
     else:
@@ -427,48 +480,56 @@ def person_find_duplicates(request):
                        'button_style': 'success'}
             return render(request, 'workshops/dupes.html', context)
         else:
+            merges = []
             for key, group in groups.items():
                 try:
                     primary_id = int(request.POST["{0}_primary".format(key)])
-                    primary = None
-                    for person in group:
-                        if person.id == primary_id:
-                            primary = person
-                            group.remove(primary)
-                    if not primary:
-                        messages.error(request,
-                                       'Primary not valid: {0} not in group'.format(primary_id))
-                        return redirect('person_find_duplicates')
-                    merge_model_objects(primary, group)
-                except TypeError as e:
+                except (KeyError, ValueError) as e:
                     messages.error(request,
                                    'Merge failed, nothing was changed: {}'.format(e))
                     return redirect('person_find_duplicates')
-            messages.success(request, 'Merge success')
-            return redirect('person_find_duplicates')
+                aliases = [person.id for person in group
+                           if person.id != primary_id]
+                if len(aliases) == len(group):
+                    messages.error(request,
+                                   'Primary not valid: {0} not in group'.format(primary_id))
+                    return redirect('person_find_duplicates')
+                merges.append((primary_id, aliases))
+            job = enqueue('merge_persons', person=request.user, groups=merges)
+            return _job_response(request, job, 'person_find_duplicates')
 
 
 class PersonCreate(LoginRequiredMixin, CreateViewContext):
     model = Person
-    fields = PERSON_FIELDS
+    form_class = PersonForm
 
 
 class PersonUpdate(LoginRequiredMixin, UpdateViewContext):
     model = Person
-    fields = PERSON_FIELDS
+    form_class = PersonForm
     pk_url_kwarg = 'person_id'
 
 
 #------------------------------------------------------------
 
+EVENT_SEARCH_LEN = 10      # how many events to suggest
+
+
 @login_required
 def all_events(request):
     '''List all events.'''
 
-    all_events = Event.objects.all()
+    all_events = Event.objects.for_listing().prefetch_related('tags')
     events = _get_pagination_items(request, all_events)
+    num_instructors = dict(
+        Task.objects.filter(event__in=[e.id for e in events],
+                            role__in=roles.ids('instructor'))
+                    .values('event')
+                    .annotate(num=Count('id'))
+                    .order_by()
+                    .values_list('event', 'num'))
     for e in events:
-        e.num_instructors = e.task_set.filter(role__name='instructor').count()
+        e.num_instructors = num_instructors.get(e.id, 0)
     context = {'title' : 'All Events',
                'all_events' : events}
     return render(request, 'workshops/all_events.html', context)
@@ -479,67 +540,122 @@ def event_details(request, event_ident):
     '''List details of a particular event.'''
 
     event = Event.get_by_ident(event_ident)
-    tasks = Task.objects.filter(event__id=event.id).order_by('role__name')
+    tasks = Task.objects.for_listing().filter(event__id=event.id) \
+                                      .order_by('role__name')
+    candidates = InstructorCandidate.objects.filter(event=event) \
+                                            .select_related('person__airport')
     context = {'title' : 'Event {0}'.format(event),
                'event' : event,
-               'tasks' : tasks}
+               'tasks' : tasks,
+               'candidates' : candidates}
     return render(request, 'workshops/event.html', context)
 
 
+@login_required
+def event_search(request):
+    '''Events whose slug contains the "term" parameter, or with that ID,
+    newest first (JSON).'''
+    term = request.GET.get('term', '').strip()
+    found = []
+    if term:
+        matches = Q(slug__icontains=term)
+        if term.isdigit():
+            matches |= Q(id=term)
+        found = Event.objects.for_listing().filter(matches)[:EVENT_SEARCH_LEN]
+    return JsonResponse({'events': [
+        {'ident': e.get_ident(), 'site': e.site.domain, 'label': str(e)}
+        for e in found]})
+
+
+@login_required
+@require_http_methods(["POST"])
+def event_candidates_refresh(request, event_ident):
+    '''Recompute the event's instructor candidates in the background.'''
+    event = Event.get_by_ident(event_ident)
+    job = enqueue_once('refresh_candidates', person=request.user,
+                       event_id=event.id)
+    return _job_response(request, job, event.get_absolute_url())
+
+
+@login_required
+def event_staff(request, event_ident):
+    '''List qualified instructors near the event's site, nearest first.
+
+    Only people based at one of the site's precomputed nearest airports
+    are considered (see `SiteAirport`).
+    '''
+
+    event = Event.get_by_ident(event_ident)
+    nearest = list(SiteAirport.objects.filter(site=event.site_id)
+                                      .select_related('airport'))
+    distances = {n.airport_id: n.distance for n in nearest}
+
+    wanted = request.GET.getlist('skill')
+    wanted_skills = [s for s in skills.all() if s.name in wanted]
+    qualified = qualifications.person_ids(wanted_skills)
+    persons = Person.objects.filter(airport__in=list(distances)) \
+                            .select_related('airport', 'stats')
+    persons = sorted(((distances[p.airport_id], p)
+                      for p in persons if p.id in qualified),
+                     key=lambda distance_person: (
+                         distance_person[0],
+                         distance_person[1].family,
+                         distance_person[1].personal,
+                         distance_person[1].middle or ''))
+
+    context = {'title' : 'Staff {0}'.format(event),
+               'event' : event,
+               'located' : event.site.latitude is not None and
+                           event.site.longitude is not None,
+               'nearest' : nearest,
+               'skills' : [(s.name, s.name in wanted) for s in skills.all()],
+               'persons' : persons}
+    return render(request, 'workshops/event_staff.html', context)
+
+
 @login_required
 def validate_event(request, event_ident):
-    '''Check the event's home page *or* the specified URL (for testing).'''
-    page_url, error_messages = None, []
+    '''Check the event's home page *or* the specified URL (for testing).
+
+    Fetching the page can be slow, so this is done by a background job.
+    '''
     event = Event.get_by_ident(event_ident)
     github_url = request.GET.get('url', None) # for manual override
-    if github_url is None:
-        github_url = event.url
-    if github_url is not None:
-        page_url = github_url.replace('github.com', 'raw.githubusercontent.com').rstrip('/') + '/gh-pages/index.html'
-        response = requests.get(page_url)
-        if response.status_code != 200:
-            error_messages.append('Request for {0} returned status code {1}'.format(page_url, response.status_code))
-        else:
-            valid, error_messages = check_file(page_url, response.text)
-    context = {'title' : 'Validate Event {0}'.format(event),
-               'event' : event,
-               'page' : page_url,
-               'error_messages' : error_messages}
-    return render(request, 'workshops/validate_event.html', context)
+    job = enqueue_once('validate_event', person=request.user,
+                       event_id=event.id, url=github_url)
+    return redirect(job)
 
 
 class EventCreate(LoginRequiredMixin, CreateViewContext):
     model = Event
-    fields = '__all__'
+    form_class = EventForm
 
 
 class EventUpdate(LoginRequiredMixin, UpdateViewContext):
     model = Event
-    fields = '__all__'
+    form_class = EventForm
     pk_url_kwarg = 'event_ident'
 
 #------------------------------------------------------------
 
-TASK_FIELDS = ['event', 'person', 'role']
-
-
 @login_required
 def all_tasks(request):
     '''List all tasks.'''
 
-    all_tasks = Task.objects.order_by('event', 'person', 'role')
-    tasks = _get_pagination_items(request, all_tasks)
+    all_tasks = Task.objects.for_listing() \
+                            .order_by('event', 'person', 'role')
+    tasks = _get_pagination_items(request, all_tasks, listings.TASKS)
     user_can_add = request.user.has_perm('edit')
     context = {'title' : 'All Tasks',
                'all_tasks' : tasks,
                'user_can_add' : user_can_add}
-    return render(request, 'workshops/all_tasks.html', context)
+    return listings.render(request, 'workshops/all_tasks.html', context)
 
 
 @login_required
 def task_details(request, task_id):
     '''List details of a particular task.'''
-    task = Task.objects.get(pk=task_id)
+    task = Task.objects.for_listing().get(pk=task_id)
     context = {'title' : 'Task {0}'.format(task),
                'task' : task}
     return render(request, 'workshops/task.html', context)
@@ -547,12 +663,12 @@ def task_details(request, task_id):
 
 class TaskCreate(LoginRequiredMixin, CreateViewContext):
     model = Task
-    fields = TASK_FIELDS
+    form_class = TaskForm
 
 
 class TaskUpdate(LoginRequiredMixin, UpdateViewContext):
     model = Task
-    fields = TASK_FIELDS
+    form_class = TaskForm
     pk_url_kwarg = 'task_id'
 
 
@@ -562,9 +678,8 @@ class TaskUpdate(LoginRequiredMixin, UpdateViewContext):
 def all_badges(request):
     '''List all badges.'''
 
-    all_badges = Badge.objects.order_by('name')
-    for b in all_badges:
-        b.num_awarded = Award.objects.filter(badge_id=b.id).count()
+    all_badges = Badge.objects.order_by('name') \
+                              .annotate(num_awarded=Count('award'))
     context = {'title' : 'All Badges',
                'all_badges' : all_badges}
     return render(request, 'workshops/all_badges.html', context)
@@ -595,22 +710,30 @@ def instructors(request):
         form = InstructorsForm(request.POST)
         if form.is_valid():
 
-            # Filter by skills.
-            persons = Person.objects.filter(airport__isnull=False)
-            for s in Skill.objects.all():
-                if form.cleaned_data[s.name]:
-                    persons = persons.filter(qualification__skill=s)
-
-            # Add metadata which we will eventually filter by
-            for p in persons:
-                p.num_taught = \
-                    p.task_set.filter(role__name='instructor').count()
-
-            # Sort by location.
-            loc = (form.cleaned_data['latitude'],
-                   form.cleaned_data['longitude'])
-            persons = [(earth_distance(loc, (p.airport.latitude, p.airport.longitude)), p)
-                       for p in persons]
+            # Filter by skills, using the skill bitmasks rather than one
+            # join on Qualification per skill.
+            persons = Person.objects.filter(airport__isnull=False) \
+                                    .select_related('airport', 'stats')
+            wanted_skills = [s for s in skills.all()
+                             if form.cleaned_data[s.name]]
+            if wanted_skills:
+                qualified = qualifications.person_ids(wanted_skills)
+                persons = [p for p in persons if p.id in qualified]
+
+            # Sort by location, using precomputed distances from the
+            # airport if there are any.
+            persons = list(persons)
+            airport = form.cleaned_data['airport']
+            distances = None
+            if airport is not None:
+                distances = airport_distances.between(
+                    airport.id, [p.airport_id for p in persons])
+            if distances is None:
+                loc = (form.cleaned_data['latitude'],
+                       form.cleaned_data['longitude'])
+                distances = [earth_distance(loc, (p.airport.latitude, p.airport.longitude))
+                             for p in persons]
+            persons = list(zip(distances, persons))
             persons.sort(
                 key=lambda distance_person: (
                     distance_person[0],
@@ -645,12 +768,12 @@ def search(request):
         if form.is_valid():
             term = form.cleaned_data['term']
             if form.cleaned_data['in_sites']:
-                sites = Site.objects.filter(
+                sites = Site.objects.for_listing().filter(
                     Q(domain__contains=term) |
                     Q(fullname__contains=term) |
                     Q(notes__contains=term))
             if form.cleaned_data['in_events']:
-                events = Event.objects.filter(
+                events = Event.objects.for_listing().filter(
                     Q(slug__contains=term) |
                     Q(notes__contains=term))
             if form.cleaned_data['in_persons']:
@@ -676,26 +799,61 @@ def search(request):
 
 #------------------------------------------------------------
 
+DEBRIEF_CSV_FIELDS = (
+    ('event', 'event__slug'),
+    ('start', 'event__start'),
+    ('end', 'event__end'),
+    ('personal', 'person__personal'),
+    ('middle', 'person__middle'),
+    ('family', 'person__family'),
+    ('email', 'person__email'),
+)
+
+
+class _Echo(object):
+    '''File-like object whose write() hands back what it was given.
+
+    Lets csv.writer produce lines for a streaming response; see
+    https://docs.djangoproject.com/en/1.7/howto/outputting-csv/#streaming-large-csv-files
+    '''
+
+    def write(self, value):
+        return value
+
+
+def _debrief_csv(tasks):
+    '''Stream debrief rows as CSV without loading them all at once.'''
+    writer = csv.writer(_Echo())
+    rows = tasks.values_list(*[f for (_, f) in DEBRIEF_CSV_FIELDS]).iterator()
+
+    def lines():
+        yield writer.writerow([name for (name, _) in DEBRIEF_CSV_FIELDS])
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename=debrief.csv'
+    return response
+
+
 @login_required
 def debrief(request):
     '''Show who taught between begin_date and end_date.'''
 
+    tasks = None
+
     if request.method == 'POST':
         form = DebriefForm(request.POST)
         if form.is_valid():
-            tasks = Task.objects.filter(
-                    event__end__gte=form.cleaned_data['begin_date'],
-                    event__start__lte=form.cleaned_data['end_date'],
-                    role__name='instructor',
-                    person__may_contact=True,
-                    ).order_by('event', 'person', 'role')
-        else:
-            pass # FIXME: error message
+            tasks = instructor_tasks(form.cleaned_data['begin_date'],
+                                     form.cleaned_data['end_date'])
+            if request.POST.get('csv', None):
+                return _debrief_csv(tasks)
+        # otherwise the form shows what is wrong with the dates
 
     # if a GET (or any other method) we'll create a blank form
     else:
         form = DebriefForm()
-        tasks = None
 
     context = {'title' : 'Debrief',
                'form' : form,
@@ -704,45 +862,106 @@ def debrief(request):
 
 #------------------------------------------------------------
 
-def _export_badges():
-    '''Collect badge data as YAML.'''
-    result = {}
-    for badge in Badge.objects.all():
-        persons = Person.objects.filter(award__badge_id=badge.id)
-        result[badge.name] = [
-            {"user": p.username, "name": p.get_full_name()} for p in persons
-        ]
-    return result
+@login_required
+def export(request, name):
+    '''Export data as YAML for inclusion in main web site.'''
+    if name not in EXPORTS:
+        context = {'title' : 'Error', # FIXME - need an error message
+                   'data' : None}
+        return render(request, 'workshops/export.html', context)
+    return redirect(enqueue_once('export', person=request.user, name=name))
 
+#------------------------------------------------------------
 
-def _export_instructors():
-    '''Collect instructor airport locations as YAML.'''
-    # Exclude airports with no instructors, and add the number of instructors per airport
-    airports = Airport.objects.exclude(person=None).annotate(num_persons=Count('person'))
-    return [{'airport' : str(a.fullname),
-             'latlng' : '{0},{1}'.format(a.latitude, a.longitude),
-             'count'  : a.num_persons}
-            for a in airports]
 
+def _job_response(request, job, done_url):
+    '''Redirect after queueing `job`.
 
-@login_required
-def export(request, name):
-    '''Export data as YAML for inclusion in main web site.'''
-    data = None
-    if name == 'badges':
-        title, data = 'Badges', _export_badges()
-    elif name == 'instructors':
-        title, data = 'Instructor Locations', _export_instructors()
+    If the job has already finished (e.g. it was run eagerly), report the
+    outcome and go to `done_url`; otherwise, or if it crashed (the details
+    are not for users), go to the job's status page.
+    '''
+    if job.status == Job.DONE:
+        messages.success(request, job.get_result()['message'])
+    elif job.status == Job.FAILED and job.crashed:
+        messages.error(request, 'Sorry, your request failed.')
+        return redirect(job)
+    elif job.status == Job.FAILED:
+        messages.error(request, job.error)
     else:
-        title, data = 'Error', None # FIXME - need an error message
-    context = {'title' : title,
-               'data' : data}
-    return render(request, 'workshops/export.html', context)
+        messages.info(request, 'Your request has been queued.')
+        return redirect(job)
+    return redirect(done_url)
+
+
+@login_required
+def all_jobs(request):
+    '''List background jobs, most recent first.'''
+    all_jobs = Job.objects.select_related('person').order_by('-id')
+    jobs = _get_pagination_items(request, all_jobs)
+    context = {'title' : 'All Jobs',
+               'all_jobs' : jobs}
+    return render(request, 'workshops/all_jobs.html', context)
+
+
+@login_required
+def job_details(request, job_id):
+    '''Show the status and result of a background job.'''
+    job = get_object_or_404(Job, id=job_id)
+    job_type = JOBS.get(job.kind)
+    context = {'title' : 'Job {0}'.format(job.id),
+               'job' : job,
+               'result' : job.get_result(),
+               'result_template' : job_type.template if job_type else None,
+               # tracebacks show paths, SQL and arguments
+               'show_traceback' : request.user.is_superuser or settings.DEBUG}
+    return render(request, 'workshops/job.html', context)
+
+#------------------------------------------------------------
+
+@login_required
+def all_reports(request):
+    '''List available statistical reports.'''
+    context = {'title' : 'All Reports',
+               'reports' : REPORTS}
+    return render(request, 'workshops/all_reports.html', context)
+
+
+@login_required
+def report_details(request, name):
+    '''Show a single statistical report.'''
+    if name not in REPORTS:
+        raise Http404('No such report: {0}'.format(name))
+    report = REPORTS[name]
+    context = {'title' : report.title,
+               'name' : name,
+               'header' : report.header,
+               'rows' : get_report(name)}
+    return render(request, 'workshops/report.html', context)
+
+
+@login_required
+def report_csv(request, name):
+    '''Download a single statistical report as CSV.'''
+    if name not in REPORTS:
+        raise Http404('No such report: {0}'.format(name))
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = \
+        'attachment; filename={0}.csv'.format(name)
+
+    writer = csv.writer(response)
+    writer.writerow(REPORTS[name].header)
+    writer.writerows(get_report(name))
+    return response
 
 #------------------------------------------------------------
 
-def _get_pagination_items(request, all_objects):
-    '''Select paginated items.'''
+def _get_pagination_items(request, all_objects, listing=None):
+    '''Select paginated items.
+
+    If everything is asked for and a `listing` (see workshops/listings.py)
+    is given, the items are streamed rather than loaded.
+    '''
 
     # Get parameters.
     items = request.GET.get('items_per_page', ITEMS_PER_PAGE)
@@ -756,7 +975,9 @@ def _get_pagination_items(request, all_objects):
     page = request.GET.get('page')
 
     # Show everything.
-    if items == 'all':
+    if items == 'all' and listing is not None:
+        result = listings.StreamedRows(listing, all_objects)
+    elif items == 'all':
         result = all_objects
 
     # Show selected items.